@@ -0,0 +1,97 @@
+"""
+Benchmark da composição corporal em lote (`bodycomp.py`).
+
+Gera uma lista sintética de alunos (CSV, semente fixa) e mede cada etapa
+do lote: parsing, estimativa vetorizada e serialização em NDJSON e CSV.
+Para comparação, o mesmo cálculo linha a linha em Python puro é medido
+em uma amostra e extrapolado.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_body_batch [--rows 1000000]
+"""
+
+import argparse
+import math
+import time
+
+import numpy as np
+
+import bodycomp
+
+
+def make_csv(rows: int, seed: int = 1) -> bytes:
+    rng = np.random.default_rng(seed)
+    columns = [
+        np.arange(rows),
+        rng.integers(16, 80, rows),
+        rng.choice(["M", "F"], rows),
+        rng.integers(150, 200, rows),
+        rng.integers(45, 130, rows),
+        rng.integers(60, 120, rows),
+        rng.integers(30, 45, rows),
+        rng.integers(85, 125, rows),
+    ]
+    lines = map(",".join, zip(*(column.astype(str).tolist() for column in columns)))
+    return ("id,age,sex,height,weight,waist,neck,hip\n" + "\n".join(lines) + "\n").encode()
+
+
+def scalar_row(age, male, height, weight, waist, neck, hip) -> tuple:
+    """Mesmas fórmulas de `bodycomp.estimate`, uma pessoa por vez."""
+    bmi = weight / (height / 100) ** 2
+    if age <= 15:
+        deurenberg = 1.51 * bmi - 0.70 * age - 3.6 * male + 1.4
+    else:
+        deurenberg = 1.20 * bmi + 0.23 * age - 10.8 * male - 5.4
+    if male:
+        navy = 495 / (1.0324 - 0.19077 * math.log10(waist - neck) + 0.15456 * math.log10(height)) - 450
+    else:
+        navy = 495 / (1.29579 - 0.35004 * math.log10(waist + hip - neck) + 0.22100 * math.log10(height)) - 450
+    category = sum(bmi >= bound for bound in bodycomp.BMI_BOUNDS)
+    return round(bmi, 1), round(deurenberg, 1), round(navy, 1), bodycomp.GOALS[category]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--scalar-sample", type=int, default=100_000)
+    args = parser.parse_args()
+
+    data = make_csv(args.rows)
+    print(f"{args.rows} linhas, {len(data) / 1e6:.1f} MB de CSV")
+
+    columns, parse_s = timed(lambda: bodycomp.parse_columns(data, args.rows))
+    result, estimate_s = timed(lambda: bodycomp.estimate(columns))
+    ndjson_bytes, ndjson_s = timed(lambda: sum(len(c) for c in bodycomp.iter_ndjson(result)))
+    csv_bytes, csv_s = timed(lambda: sum(len(c) for c in bodycomp.iter_csv(result)))
+
+    sample = min(args.scalar_sample, args.rows)
+    rows = list(zip(*(
+        columns[name][:sample].tolist() for name in ("age", "height", "weight", "waist", "neck", "hip")
+    )))
+    males = (columns["sex"][:sample] == "M").tolist()
+    _, scalar_s = timed(lambda: [
+        scalar_row(age, male, height, weight, waist, neck, hip)
+        for (age, height, weight, waist, neck, hip), male in zip(rows, males)
+    ])
+    scalar_s *= args.rows / sample
+
+    print(f"{'etapa':>22} {'s':>7} {'linhas/s':>12}")
+    for name, seconds in (
+        ("parsing (CSV)", parse_s),
+        ("estimativa (NumPy)", estimate_s),
+        ("estimativa (Python)*", scalar_s),
+        (f"NDJSON ({ndjson_bytes / 1e6:.0f} MB)", ndjson_s),
+        (f"CSV ({csv_bytes / 1e6:.0f} MB)", csv_s),
+    ):
+        print(f"{name:>22} {seconds:>7.2f} {args.rows / seconds:>12,.0f}")
+    print(f"* extrapolado de {sample} linhas; estimativa vetorizada {scalar_s / estimate_s:.0f}x mais rápida")
+
+
+if __name__ == "__main__":
+    main()
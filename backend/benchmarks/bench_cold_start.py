@@ -0,0 +1,130 @@
+"""
+Benchmark de partida a frio do backend (escala a zero).
+
+Cada rodada usa um processo Python novo e mede:
+- `import main`: custo de importação do módulo (sem criar a aplicação)
+- `create_app()`: montagem da aplicação e dos componentes
+- se o SDK da OpenAI foi importado até aí (deve ficar para a 1ª chamada)
+- tempo até o primeiro `GET /health` 200 com uvicorn, do spawn do processo
+
+Reporta a mediana das rodadas, em modo simulação e com chave configurada.
+Com `--max-import-ms`, sai com código 1 se a mediana de `import main`
+passar do limite (para detectar regressões em CI).
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_cold_start [--runs 5] [--max-import-ms 1500]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.loadtest import BACKEND_DIR, free_port
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+main.create_app()
+created = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "create_app_ms": (created - imported) * 1000,
+    "openai_loaded": "openai" in sys.modules,
+}))
+"""
+
+
+def base_env(tmp: str, with_key: bool) -> dict:
+    return {
+        **os.environ,
+        "OPENAI_API_KEY": "sk-fake-cold-start" if with_key else "",
+        # Porta fechada: nenhuma chamada real; o aquecimento fica desligado
+        "OPENAI_BASE_URL": "http://127.0.0.1:9/v1",
+        "OPENAI_WARM_CONNECTIONS": "0",
+        "JOB_DB_PATH": os.path.join(tmp, "jobs.db"),
+        "RESULT_CACHE_PATH": "",
+        "APP_ENV": "benchmark",
+    }
+
+
+def probe(env: dict) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def first_health_ms(env: dict, timeout: float = 30) -> float:
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+            "--log-level", "warning", "--no-access-log",
+        ],
+        cwd=BACKEND_DIR, env=env,
+    )
+    try:
+        deadline = start + timeout
+        while time.perf_counter() < deadline:
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                    return (time.perf_counter() - start) * 1000
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.01)
+        raise RuntimeError("Backend não respondeu ao /health")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def measure(runs: int, with_key: bool) -> dict:
+    samples = {"import_ms": [], "create_app_ms": [], "first_health_ms": []}
+    openai_loaded = False
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = base_env(tmp, with_key)
+            result = probe(env)
+            openai_loaded |= result["openai_loaded"]
+            samples["import_ms"].append(result["import_ms"])
+            samples["create_app_ms"].append(result["create_app_ms"])
+            samples["first_health_ms"].append(first_health_ms(env))
+    summary = {name: statistics.median(values) for name, values in samples.items()}
+    summary["openai_loaded"] = openai_loaded
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import-ms", type=float, default=0, help="0 = sem limite")
+    args = parser.parse_args()
+
+    print(f"{'modo':>9} {'import ms':>10} {'create_app ms':>14} {'1º /health ms':>14} {'openai':>7}")
+    worst_import = 0.0
+    for mode, with_key in (("simulado", False), ("com chave", True)):
+        result = measure(args.runs, with_key)
+        worst_import = max(worst_import, result["import_ms"])
+        print(
+            f"{mode:>9} {result['import_ms']:>10.1f} {result['create_app_ms']:>14.1f}"
+            f" {result['first_health_ms']:>14.1f} {'sim' if result['openai_loaded'] else 'não':>7}"
+        )
+
+    if args.max_import_ms and worst_import > args.max_import_ms:
+        print(f"Regressão: import main levou {worst_import:.0f} ms (limite {args.max_import_ms:.0f} ms)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
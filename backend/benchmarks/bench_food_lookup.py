@@ -0,0 +1,63 @@
+"""
+Benchmark da tabela local de alimentos (`foods.py`).
+
+Mede a carga da tabela, o custo de cada caminho de busca (exato, plural,
+prefixo e trigramas) e o custo por refeição descrita em texto, do texto
+bruto até os totais.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_food_lookup [--iterations 20000]
+"""
+
+import argparse
+import time
+
+from foods import FoodTable, MealParser
+
+LOOKUPS = (
+    ("exato", "frango"),
+    ("plural", "bananas"),
+    ("prefixo", "feij"),
+    ("trigramas", "brocolis cozdo"),
+    ("sem acento", "pao frances"),
+    ("ausente", "lasanha"),
+)
+MEALS = (
+    "arroz, feijão e frango 150g",
+    "2 ovos e 1 fatia de pão integral",
+    "150g de frango grelhado; meia xícara de arroz integral, salada",
+    "1 copo de leite + 1 scoop de whey + banana",
+)
+
+
+def per_call_us(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    table = FoodTable.from_file()
+    print(f"tabela: {len(table)} alimentos, {len(table.keys)} chaves, carga em {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    print(f"{'caminho':>12} {'texto':>18} {'µs':>6}  resultado")
+    for path, text in LOOKUPS:
+        match = table.lookup(text)
+        outcome = f"{table.names[match[0]]} ({match[1]:.2f})" if match else "-"
+        print(f"{path:>12} {text:>18} {per_call_us(lambda: table.lookup(text), args.iterations):>6.1f}  {outcome}")
+
+    meals = MealParser(table)
+    print(f"\n{'refeição':>62} {'µs':>6} {'kcal':>5}")
+    for text in MEALS:
+        calories = meals.parse(text)["total_calories"]
+        print(f"{text:>62} {per_call_us(lambda: meals.parse(text), args.iterations):>6.1f} {calories:>5}")
+
+
+if __name__ == "__main__":
+    main()
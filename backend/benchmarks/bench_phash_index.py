@@ -0,0 +1,80 @@
+"""
+Benchmark do índice de quase duplicatas (phash.NearDuplicateIndex).
+
+Mede o custo médio de consulta conforme o índice cresce até 1M de hashes.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_phash_index [--sizes 1000,10000,100000,1000000]
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+
+from phash import NearDuplicateIndex
+
+
+def flip_bits(value: int, count: int) -> int:
+    for bit in random.sample(range(64), count):
+        value ^= 1 << bit
+    return value
+
+
+def run(size: int, max_distance: int, queries: int, measure_memory: bool) -> dict:
+    random.seed(size)
+    index = NearDuplicateIndex(max_distance=max_distance, max_entries=size, ttl=3600)
+    hashes = [random.getrandbits(64) for _ in range(size)]
+
+    if measure_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    for value in hashes:
+        index.add(value, {})
+    build_seconds = time.perf_counter() - start
+    memory_mb = 0.0
+    if measure_memory:
+        memory_mb = tracemalloc.get_traced_memory()[0] / 1e6
+        tracemalloc.stop()
+
+    near = [flip_bits(random.choice(hashes), max_distance) for _ in range(queries)]
+    far = [random.getrandbits(64) for _ in range(queries)]
+
+    start = time.perf_counter()
+    found = sum(index.lookup(value) is not None for value in near)
+    near_us = (time.perf_counter() - start) / queries * 1e6
+
+    start = time.perf_counter()
+    for value in far:
+        index.lookup(value)
+    far_us = (time.perf_counter() - start) / queries * 1e6
+
+    return {
+        "size": size,
+        "build_s": round(build_seconds, 2),
+        "memory_mb": round(memory_mb, 1),
+        "hit_lookup_us": round(near_us, 1),
+        "miss_lookup_us": round(far_us, 1),
+        "recall": round(found / queries, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000")
+    parser.add_argument("--max-distance", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--memory", action="store_true", help="medir memória (mais lento)")
+    args = parser.parse_args()
+
+    print(f"{'entradas':>10} {'build(s)':>9} {'mem(MB)':>8} {'hit(us)':>8} {'miss(us)':>9} {'recall':>7}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        r = run(size, args.max_distance, args.queries, args.memory)
+        print(
+            f"{r['size']:>10} {r['build_s']:>9} {r['memory_mb']:>8} "
+            f"{r['hit_lookup_us']:>8} {r['miss_lookup_us']:>9} {r['recall']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark de parsing e serialização das respostas da IA.
+
+Compara, por resposta:
+- parsing: remoção de cercas ``` + json.loads + checagem manual de campos
+  (caminho antigo) vs. `schemas.parse_model` (validação única no pydantic-core)
+- serialização: `JSONResponse` (json da stdlib) vs. `ORJSONResponse`
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_serialization [--iterations 20000]
+"""
+
+import argparse
+import json
+import time
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from benchmarks.fake_openai import BODY_RESULT, MEAL_RESULT, WORKOUT_RESULT
+from schemas import BodyAnalysis, MealAnalysis, WorkoutPlan, parse_model
+
+CASES = {
+    "body": (BodyAnalysis, BODY_RESULT),
+    "meal": (MealAnalysis, MEAL_RESULT),
+    "workout": (WorkoutPlan, WORKOUT_RESULT),
+}
+
+
+def legacy_parse(text: str, required: tuple) -> dict:
+    """Caminho anterior: limpa cercas de código, json.loads e confere as chaves."""
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1].rsplit("```", 1)[0]
+    result = json.loads(text)
+    if not all(key in result for key in required):
+        raise ValueError("resposta incompleta")
+    return result
+
+
+def per_call_us(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'endpoint':>9} {'loads µs':>9} {'schema µs':>10} {'json µs':>8} {'orjson µs':>10}")
+    for name, (model, result) in CASES.items():
+        text = "```json\n" + json.dumps(result, ensure_ascii=False) + "\n```"
+        required = tuple(model.model_fields)
+        loads = per_call_us(lambda: legacy_parse(text, required), args.iterations)
+        schema = per_call_us(lambda: parse_model(model, text), args.iterations)
+        stdlib = per_call_us(lambda: JSONResponse(result), args.iterations)
+        fast = per_call_us(lambda: ORJSONResponse(result), args.iterations)
+        print(f"{name:>9} {loads:>9.1f} {schema:>10.1f} {stdlib:>8.1f} {fast:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark de memória do caminho upload → data URL base64.
+
+Compara o caminho antigo (`await image.read()` + `b64encode(...).decode()`
++ f-string) com `uploads.read_upload` + `uploads.encode_data_url`, com N
+uploads concorrentes de 10 MB. Reporta o pico de memória (tracemalloc).
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_upload_memory [--concurrency 8] [--size-mb 10]
+"""
+
+import argparse
+import asyncio
+import base64
+import os
+import tempfile
+import time
+import tracemalloc
+
+from fastapi import UploadFile
+
+from uploads import encode_data_url, read_upload
+
+
+def make_upload(payload: bytes) -> UploadFile:
+    # Igual ao Starlette: arquivo temporário em disco acima de 1 MB
+    spool = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    spool.write(payload)
+    spool.seek(0)
+    return UploadFile(spool, size=len(payload), filename="meal.jpg")
+
+
+async def legacy_path(upload: UploadFile, mime_type: str) -> int:
+    image_data = await upload.read()
+    base64_image = base64.b64encode(image_data).decode("utf-8")
+    url = f"data:{mime_type};base64,{base64_image}"
+    await asyncio.sleep(0)  # simula o await da chamada à API com tudo vivo
+    return len(url)
+
+
+async def streaming_path(upload: UploadFile, mime_type: str) -> int:
+    image_data = await read_upload(upload, 64 * 1024 * 1024)
+    url = encode_data_url(image_data, mime_type)
+    await asyncio.sleep(0)
+    return len(url)
+
+
+async def measure(path, payload: bytes, concurrency: int) -> tuple[float, float]:
+    uploads = [make_upload(payload) for _ in range(concurrency)]
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    await asyncio.gather(*(path(upload, "image/jpeg") for upload in uploads))
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    for upload in uploads:
+        await upload.close()
+    return peak / 1e6, elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--size-mb", type=int, default=10)
+    args = parser.parse_args()
+
+    payload = os.urandom(args.size_mb * 1024 * 1024)
+    assert await legacy_path(make_upload(payload), "image/jpeg") == await streaming_path(
+        make_upload(payload), "image/jpeg"
+    )
+
+    print(f"{args.concurrency} uploads concorrentes de {args.size_mb} MB")
+    for name, path in (("antigo", legacy_path), ("streaming", streaming_path)):
+        peak_mb, elapsed = await measure(path, payload, args.concurrency)
+        per_request = peak_mb / args.concurrency / args.size_mb
+        print(
+            f"{name:>10}: pico {peak_mb:8.1f} MB "
+            f"({per_request:.2f}x o tamanho da imagem por requisição), {elapsed * 1000:.0f} ms"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,75 @@
+"""
+Benchmark do cache de treinos gerados (`cache.VariantCache`).
+
+Simula pedidos em texto livre que chegariam à IA (locais e limitações
+fora do vocabulário do motor de regras, escritos de formas diferentes) e
+compara a taxa de acerto com chave exata (texto como veio) e com a chave
+canônica (`WorkoutEngine.canonical_key`), para 1 e 3 variantes por chave.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_workout_cache [--requests 1000]
+"""
+
+import argparse
+import random
+import time
+
+from cache import VariantCache
+from catalog import WorkoutEngine
+
+LOCATIONS = (
+    ("piscina", "Piscina", "na piscina", "PISCINA", "piscína"),
+    ("hotel", "Hotel", "no hotel", "quarto de hotel"),
+    ("escritorio", "Escritório", "no escritório"),
+    ("praia", "Praia", "na praia"),
+)
+LIMITATIONS = (
+    ("", "nenhuma", "Nenhuma", "sem limitações"),
+    ("joelho", "dor no joelho", "Dor no joelho esquerdo", "lesão no joelho direito"),
+    ("lombar", "dor lombar", "hérnia de disco", "Lombar, dor leve"),
+    ("ombro e joelho", "joelho, ombro", "Dor no ombro e no joelho"),
+)
+
+
+def requests(count: int, seed: int = 1) -> list[tuple[str, str]]:
+    rng = random.Random(seed)
+    # Poucos pedidos concentram a maior parte do tráfego
+    weights = [1 / (rank + 1) for rank in range(len(LOCATIONS) * len(LIMITATIONS))]
+    intents = [(loc, lim) for loc in LOCATIONS for lim in LIMITATIONS]
+    picks = rng.choices(intents, weights, k=count)
+    return [(rng.choice(loc), rng.choice(lim)) for loc, lim in picks]
+
+
+def simulate(stream, key_fn, variants: int) -> tuple[dict, float]:
+    cache = VariantCache(max_entries=1024, ttl=86400, variants=variants)
+    start = time.perf_counter()
+    for location, limitations in stream:
+        key = key_fn(location, limitations)
+        if cache.get(key) is None:
+            cache.add(key, {"title": "plano"})
+    return cache.stats(), (time.perf_counter() - start) / len(stream) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=1000)
+    args = parser.parse_args()
+
+    engine = WorkoutEngine.from_file()
+    stream = requests(args.requests)
+    print(f"{args.requests} pedidos, {len(set(stream))} textos distintos")
+    print(f"{'chave':>10} {'variantes':>9} {'acertos':>8} {'chamadas evitadas':>18} {'chaves':>7} {'µs':>6}")
+    for name, key_fn in (
+        ("exata", lambda location, limitations: (location, limitations)),
+        ("canônica", engine.canonical_key),
+    ):
+        for variants in (1, 3):
+            stats, per_request = simulate(stream, key_fn, variants)
+            print(
+                f"{name:>10} {variants:>9} {stats['hit_rate']:>8.1%} "
+                f"{stats['upstream_calls_saved']:>18} {stats['keys']:>7} {per_request:>6.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
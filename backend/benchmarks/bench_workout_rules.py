@@ -0,0 +1,51 @@
+"""
+Benchmark do motor de regras de treino (`catalog.py`).
+
+Mede, por pedido típico, o custo de `WorkoutEngine.plan`: normalização,
+conversão em tags e montagem do plano com os índices em bitmask. A
+primeira chamada de cada combinação calcula a seleção; as demais a
+reutilizam.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_workout_rules [--iterations 50000]
+"""
+
+import argparse
+import time
+
+from catalog import WorkoutEngine
+
+REQUESTS = (
+    ("Casa", ""),
+    ("Academia", "Dor no joelho"),
+    ("academia", "hérnia de disco, ombro direito"),
+    ("Em casa com halteres", "nenhuma"),
+    ("Parque", "tendinite no punho"),
+    ("Piscina", "gestante"),
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=50000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    engine = WorkoutEngine.from_file()
+    print(f"catálogo: {len(engine.exercises)} exercícios, carga em {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    print(f"{'local':>22} {'limitações':>32} {'1ª µs':>7} {'µs':>6}  resultado")
+    for location, limitations in REQUESTS:
+        start = time.perf_counter()
+        plan = engine.plan(location, limitations)
+        first = (time.perf_counter() - start) * 1e6
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            engine.plan(location, limitations)
+        per_call = (time.perf_counter() - start) / args.iterations * 1e6
+        outcome = f"{len(plan['exercises'])} exercícios" if plan else "IA"
+        print(f"{location:>22} {limitations:>32} {first:>7.1f} {per_call:>6.1f}  {outcome}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Servidor local que imita o endpoint `chat.completions` da OpenAI.
+
+Permite medir throughput e latência do backend sem gastar com a API real.
+Responde com JSON plausível para análise corporal, de refeição e treino
+(inclusive em streaming), com latência log-normal e taxas configuráveis de
+erro e de JSON malformado.
+
+Uso (a partir de backend/):
+    python -m benchmarks.fake_openai --port 9000 --median-ms 1200 --p99-ms 6000 \\
+        --error-rate 0.02 --malformed-rate 0.01
+
+E no backend:
+    OPENAI_API_KEY=sk-fake OPENAI_BASE_URL=http://127.0.0.1:9000/v1 uvicorn main:app
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+BODY_RESULT = {
+    "estimated_fat_percentage": 21,
+    "estimated_biotype": "Mesomorfo",
+    "suggested_goal": "Recomposição Corporal",
+    "feedback": "Boa base muscular. Foque em treinos de força e alimentação equilibrada.",
+}
+MEAL_RESULT = {
+    "total_calories": 620,
+    "macros": {"protein": 38, "carbs": 70, "fat": 18},
+    "feedback": "Refeição equilibrada. Inclua mais vegetais para aumentar as fibras.",
+    "meal_type": "Almoço - Frango Grelhado com Arroz e Feijão",
+}
+WORKOUT_RESULT = {
+    "title": "Treino A - Inferiores e Core",
+    "focus": "Força e Estabilidade",
+    "exercises": [
+        {"name": "Agachamento Livre", "sets": 3, "reps": "8-12", "tips": "Core ativado."},
+        {"name": "Stiff", "sets": 3, "reps": "10-12", "tips": "Joelhos levemente flexionados."},
+        {"name": "Afundo", "sets": 3, "reps": "10-12 por perna", "tips": "Tronco reto."},
+        {"name": "Prancha", "sets": 3, "reps": "30-60s", "tips": "Corpo alinhado."},
+    ],
+    "feedback": "Treino focado em fortalecer a parte inferior e core.",
+}
+
+
+class FakeConfig:
+    def __init__(
+        self,
+        median_ms: float = 1200,
+        p99_ms: float = 6000,
+        error_rate: float = 0.0,
+        malformed_rate: float = 0.0,
+        stream_chunk: int = 12,
+        seed: int | None = None,
+    ):
+        self.median = median_ms / 1000
+        # Log-normal: p99 = mediana * exp(2.326 * sigma)
+        self.sigma = math.log(max(p99_ms, median_ms) / median_ms) / 2.326 if median_ms else 0
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.stream_chunk = stream_chunk
+        self.random = random.Random(seed)
+
+    def latency(self) -> float:
+        if not self.median:
+            return 0.0
+        return self.median * math.exp(self.random.gauss(0, self.sigma))
+
+
+def prompt_text(messages: list[dict]) -> str:
+    parts = []
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            parts.append(content)
+        elif isinstance(content, list):
+            parts.extend(p.get("text", "") for p in content if p.get("type") == "text")
+    return "\n".join(parts)
+
+
+def pick_result(text: str) -> dict:
+    # O prompt de treino também cita "peso corporal": testar o treino primeiro
+    if "plano de treino" in text:
+        return WORKOUT_RESULT
+    if "refeição" in text:
+        return MEAL_RESULT
+    return BODY_RESULT
+
+
+def usage_for(text: str, completion: str) -> dict:
+    prompt_tokens = len(text) // 4 + 85
+    completion_tokens = len(completion) // 4
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "prompt_tokens_details": {"cached_tokens": 0},
+    }
+
+
+def create_fake_app(config: FakeConfig) -> FastAPI:
+    app = FastAPI(title="Fake OpenAI")
+    app.state.requests = 0
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        await asyncio.sleep(config.latency())
+
+        if config.random.random() < config.error_rate:
+            status = config.random.choice([429, 500, 503])
+            return JSONResponse(
+                status_code=status,
+                content={"error": {"message": "fake upstream error", "type": "server_error"}},
+            )
+
+        text = prompt_text(body.get("messages", []))
+        completion = json.dumps(pick_result(text), ensure_ascii=False)
+        if config.random.random() < config.malformed_rate:
+            completion = completion[: len(completion) // 2]
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        model = body.get("model", "gpt-4o")
+
+        if body.get("stream"):
+            return StreamingResponse(
+                stream_chunks(completion_id, created, model, completion, config),
+                media_type="text/event-stream",
+            )
+
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": completion},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": usage_for(text, completion),
+        }
+
+    @app.get("/stats")
+    def stats():
+        return {"requests": app.state.requests}
+
+    return app
+
+
+async def stream_chunks(completion_id, created, model, completion, config: FakeConfig):
+    def chunk(delta: dict, finish_reason=None) -> str:
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+    yield chunk({"role": "assistant", "content": ""})
+    for start in range(0, len(completion), config.stream_chunk):
+        await asyncio.sleep(0.005)
+        yield chunk({"content": completion[start:start + config.stream_chunk]})
+    yield chunk({}, finish_reason="stop")
+    yield "data: [DONE]\n\n"
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--median-ms", type=float, default=float(os.getenv("FAKE_MEDIAN_MS", "1200")))
+    parser.add_argument("--p99-ms", type=float, default=float(os.getenv("FAKE_P99_MS", "6000")))
+    parser.add_argument("--error-rate", type=float, default=float(os.getenv("FAKE_ERROR_RATE", "0")))
+    parser.add_argument("--malformed-rate", type=float, default=float(os.getenv("FAKE_MALFORMED_RATE", "0")))
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    config = FakeConfig(
+        median_ms=args.median_ms,
+        p99_ms=args.p99_ms,
+        error_rate=args.error_rate,
+        malformed_rate=args.malformed_rate,
+        seed=args.seed,
+    )
+    uvicorn.run(create_fake_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+"""
+Teste de carga do backend contra o servidor fake da OpenAI.
+
+Sobe `benchmarks.fake_openai` e o backend (uvicorn) como subprocessos,
+dispara requisições em malha aberta na taxa alvo para cada endpoint e
+reporta p50/p95/p99, throughput, erros e pico de RSS do backend, além
+das respostas servidas por fallback local em cada fase (lidas de
+`/metrics`): um 200 de fallback não mediu a chamada à IA. O
+resultado é salvo em JSON (com o commit atual) para comparação entre
+commits.
+
+Uso (a partir de backend/):
+    python -m benchmarks.loadtest --rps 20 --duration 30
+    python -m benchmarks.loadtest --url http://127.0.0.1:8000 --server-pid 1234
+    python -m benchmarks.loadtest --compare results/antes.json results/depois.json
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+ENDPOINTS = ("body", "meal", "workout")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def rss_mb(pid: int) -> float:
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def make_images(count: int) -> list[bytes]:
+    """Fotos distintas (evitam acertos de cache); JPEG 1600x1200 se houver Pillow."""
+    try:
+        from PIL import Image, ImageDraw
+    except ImportError:
+        return [os.urandom(500_000) for _ in range(count)]
+
+    rng = random.Random(42)
+    images = []
+    for _ in range(count):
+        image = Image.new("RGB", (1600, 1200), tuple(rng.randrange(256) for _ in range(3)))
+        draw = ImageDraw.Draw(image)
+        for _ in range(30):
+            x, y = rng.randrange(1600), rng.randrange(1200)
+            draw.ellipse(
+                (x, y, x + rng.randrange(50, 600), y + rng.randrange(50, 600)),
+                fill=tuple(rng.randrange(256) for _ in range(3)),
+            )
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=90)
+        images.append(buffer.getvalue())
+    return images
+
+
+def build_request(endpoint: str, images: list[bytes], i: int) -> dict:
+    image = images[i % len(images)]
+    if endpoint == "body":
+        return {
+            "url": "/analyze-body/",
+            "data": {"age": "30", "height": "175", "weight": str(60 + i % 40)},
+            "files": {"image": ("body.jpg", image, "image/jpeg")},
+        }
+    if endpoint == "meal":
+        return {"url": "/analyze-meal/", "files": {"image": ("meal.jpg", image, "image/jpeg")}}
+    return {
+        "url": "/generate-workout/",
+        "data": {"training_location": "academia", "limitations": f"nenhuma {i}"},
+    }
+
+
+def percentile(values: list[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def run_phase(
+    client: httpx.AsyncClient, endpoint: str, rps: float, duration: float,
+    images: list[bytes], server_pid: int | None,
+) -> dict:
+    total = int(rps * duration)
+    latencies: list[float] = []
+    statuses: dict[str, int] = {}
+    peak_rss = 0.0
+    done = asyncio.Event()
+
+    async def sample_rss():
+        nonlocal peak_rss
+        while not done.is_set():
+            peak_rss = max(peak_rss, rss_mb(server_pid))
+            await asyncio.sleep(0.1)
+
+    async def one(i: int, at: float):
+        await asyncio.sleep(max(0.0, at - time.perf_counter()))
+        request = build_request(endpoint, images, i)
+        start = time.perf_counter()
+        try:
+            response = await client.post(request["url"], data=request.get("data"), files=request.get("files"))
+            key = str(response.status_code)
+        except httpx.HTTPError as e:
+            key = type(e).__name__
+        latencies.append(time.perf_counter() - start)
+        statuses[key] = statuses.get(key, 0) + 1
+
+    fallbacks_before = await fallback_counts(client, endpoint)
+    sampler = asyncio.create_task(sample_rss()) if server_pid else None
+    start = time.perf_counter()
+    # Malha aberta: as requisições saem na taxa alvo, independente das respostas
+    await asyncio.gather(*(one(i, start + i / rps) for i in range(total)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    if sampler:
+        await sampler
+    fallbacks_after = await fallback_counts(client, endpoint)
+    fallbacks = {
+        cause: int(count - fallbacks_before.get(cause, 0))
+        for cause, count in fallbacks_after.items()
+        if count > fallbacks_before.get(cause, 0)
+    }
+
+    ok = statuses.get("200", 0)
+    return {
+        "requests": total,
+        "target_rps": rps,
+        "throughput_rps": round(ok / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "max_ms": round(max(latencies, default=0) * 1000, 1),
+        "statuses": statuses,
+        "fallbacks": fallbacks,
+        "peak_rss_mb": round(peak_rss, 1),
+    }
+
+
+async def fallback_counts(client: httpx.AsyncClient, endpoint: str) -> dict[str, float]:
+    """Contadores de `fitscan_fallbacks_total` do endpoint, por causa."""
+    counts = {}
+    prefix = f'fitscan_fallbacks_total{{endpoint="{endpoint}",cause="'
+    for line in (await client.get("/metrics")).text.splitlines():
+        if line.startswith(prefix):
+            labels, value = line.rsplit(" ", 1)
+            counts[labels[len(prefix):-2]] = float(value)
+    return counts
+
+
+def wait_ready(url: str, timeout: float = 30) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Servidor não respondeu em {url}")
+
+
+def start_servers(args) -> tuple[str, list[subprocess.Popen]]:
+    fake_port, backend_port = free_port(), free_port()
+    fake = subprocess.Popen(
+        [
+            sys.executable, "-m", "benchmarks.fake_openai", "--port", str(fake_port),
+            "--median-ms", str(args.median_ms), "--p99-ms", str(args.p99_ms),
+            "--error-rate", str(args.error_rate), "--malformed-rate", str(args.malformed_rate),
+            "--seed", "1",
+        ],
+        cwd=BACKEND_DIR,
+    )
+    env = {
+        **os.environ,
+        "OPENAI_API_KEY": "sk-fake-benchmark",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{fake_port}/v1",
+        "RATE_LIMIT_PER_MINUTE": "1000000",
+        # Todo o tráfego vem de 127.0.0.1: com orçamento, a fase viraria fallback
+        "TOKEN_BUDGET": "0",
+        "APP_ENV": "benchmark",
+    }
+    if not args.with_cache:
+        env.update(
+            RESULT_CACHE_SIZE="0", RESULT_CACHE_PATH="", NEAR_DUPLICATE_DISTANCE="-1",
+            WORKOUT_CACHE_SIZE="0",
+        )
+    backend = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "main:app", "--port", str(backend_port),
+            "--log-level", "warning", "--no-access-log",
+        ],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+    wait_ready(f"http://127.0.0.1:{fake_port}/stats")
+    url = f"http://127.0.0.1:{backend_port}"
+    wait_ready(f"{url}/health")
+    return url, [backend, fake]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_results(results: dict) -> None:
+    print(f"\ncommit {results['commit']} | {results['config']}")
+    print(f"{'endpoint':>9} {'req':>6} {'rps':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'rss MB':>7}  status")
+    for endpoint, r in results["endpoints"].items():
+        print(
+            f"{endpoint:>9} {r['requests']:>6} {r['throughput_rps']:>7} {r['p50_ms']:>8} "
+            f"{r['p95_ms']:>8} {r['p99_ms']:>8} {r['peak_rss_mb']:>7}  {r['statuses']}"
+        )
+    for endpoint, r in results["endpoints"].items():
+        fallbacks = r.get("fallbacks")
+        if fallbacks:
+            total = sum(fallbacks.values())
+            print(
+                f"⚠️  {endpoint}: {total} de {r['requests']} respostas vieram de fallback "
+                f"{fallbacks} - latências não refletem a chamada à IA"
+            )
+
+
+def compare(before_path: str, after_path: str) -> None:
+    before = json.loads(Path(before_path).read_text())
+    after = json.loads(Path(after_path).read_text())
+    print(f"{before['commit']} → {after['commit']}")
+    for endpoint, new in after["endpoints"].items():
+        old = before["endpoints"].get(endpoint)
+        if not old:
+            continue
+        deltas = []
+        for metric in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms", "peak_rss_mb"):
+            if old[metric]:
+                change = (new[metric] - old[metric]) / old[metric] * 100
+                deltas.append(f"{metric} {old[metric]} → {new[metric]} ({change:+.1f}%)")
+        print(f"  {endpoint}: " + "; ".join(deltas))
+
+
+async def main_async(args) -> None:
+    processes = []
+    url, server_pid = args.url, args.server_pid
+    if not url:
+        url, processes = start_servers(args)
+        server_pid = processes[0].pid
+
+    try:
+        images = make_images(args.images)
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+        async with httpx.AsyncClient(base_url=url, timeout=120, limits=limits) as client:
+            results = {
+                "commit": git_commit(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "config": {
+                    "rps": args.rps,
+                    "duration": args.duration,
+                    "median_ms": args.median_ms,
+                    "p99_ms": args.p99_ms,
+                    "error_rate": args.error_rate,
+                    "malformed_rate": args.malformed_rate,
+                    "with_cache": args.with_cache,
+                },
+                "endpoints": {},
+            }
+            for endpoint in args.endpoints.split(","):
+                results["endpoints"][endpoint] = await run_phase(
+                    client, endpoint, args.rps, args.duration, images, server_pid
+                )
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+    print_results(results)
+    output = Path(args.output) if args.output else (
+        RESULTS_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}-{results['commit']}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"\nResultados salvos em {output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rps", type=float, default=10)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS))
+    parser.add_argument("--images", type=int, default=20, help="fotos distintas usadas nos uploads")
+    parser.add_argument("--median-ms", type=float, default=1200)
+    parser.add_argument("--p99-ms", type=float, default=6000)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--with-cache", action="store_true", help="mantém caches de resultado ativos")
+    parser.add_argument("--url", help="backend já em execução (não sobe servidores)")
+    parser.add_argument("--server-pid", type=int, help="PID do backend para medir RSS (com --url)")
+    parser.add_argument("--output", help="arquivo JSON de saída")
+    parser.add_argument("--compare", nargs=2, metavar=("ANTES", "DEPOIS"))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+    else:
+        asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""
+Composição corporal em lote, vetorizada com NumPy.
+
+Recebe colunas (CSV com cabeçalho ou JSON colunar) com idade, sexo,
+altura e peso, e opcionalmente cintura, pescoço e quadril (cm). Em uma
+única passada sobre os arrays calcula:
+
+- IMC
+- % de gordura por Deurenberg (1991; fórmula infantil até 15 anos)
+- % de gordura pela Marinha dos EUA (Hodgdon & Beckett), quando há
+  cintura e pescoço (e quadril, para mulheres)
+- biotipo e meta, pelas mesmas faixas de IMC da análise individual,
+  com correção para IMC alto e gordura baixa (massa muscular)
+
+Linhas fora das faixas aceitas ficam com `error` preenchido e sem
+estimativas; o lote não é rejeitado por causa delas.
+"""
+
+import csv
+import io
+import math
+from operator import methodcaller
+from typing import Iterator
+
+import numpy as np
+import orjson
+
+from catalog import normalize
+
+REQUIRED = ("age", "sex", "height", "weight")
+OPTIONAL = ("waist", "neck", "hip")
+NUMERIC = ("age", "height", "weight", *OPTIONAL)
+
+# Mesmos limites da análise individual
+AGE_RANGE = (10, 120)
+HEIGHT_RANGE = (100, 250)
+WEIGHT_RANGE = (30, 300)
+
+BIOTYPES = np.array(["Ectomorfo", "Mesomorfo", "Endomorfo", "Endomorfo"])
+GOALS = np.array([
+    "Ganho de Massa Muscular (Bulking)",
+    "Recomposição Corporal",
+    "Emagrecimento com Preservação de Massa",
+    "Emagrecimento e Saúde Articular",
+])
+BMI_BOUNDS = (18.5, 25, 30)
+
+OUTPUT_COLUMNS = (
+    "id", "bmi", "fat_deurenberg", "fat_navy", "estimated_fat_percentage", "method",
+    "estimated_biotype", "suggested_goal", "error",
+)
+
+# Tokens inteiros, já normalizados (minúsculas, sem acentos); o resto é rejeitado
+SEX_CODES = {
+    "m": 1, "masc": 1, "masculino": 1, "homem": 1, "male": 1, "1": 1,
+    "f": 0, "fem": 0, "feminino": 0, "mulher": 0, "female": 0, "0": 0,
+}
+
+
+class BatchError(ValueError):
+    """Entrada ilegível (formato, colunas ou tamanho); a mensagem vai para o cliente."""
+
+
+def _parse_floats(values: list, name: str) -> np.ndarray:
+    """Textos → float64; vazio ou None vira NaN (linha inválida ou medida ausente).
+
+    `float()` do Python é mais rápido que `astype(float64)` sobre arrays de
+    texto do NumPy, que domina o custo em lotes grandes.
+    """
+    try:
+        # Caminho rápido: coluna sem vazios
+        return np.array(list(map(float, values)), dtype=np.float64)
+    except (TypeError, ValueError):
+        pass
+    nan = math.nan
+    try:
+        return np.fromiter(
+            (nan if value is None or value == "" else float(value) for value in values),
+            np.float64, len(values),
+        )
+    except (TypeError, ValueError):
+        raise BatchError(f"Coluna '{name}' contém valores não numéricos.")
+
+
+def _to_float(values: np.ndarray, name: str) -> np.ndarray:
+    if values.dtype.kind in "fiub":
+        return values.astype(np.float64)
+    return _parse_floats(values.tolist(), name)
+
+
+def _sex_codes(values: np.ndarray) -> np.ndarray:
+    """'M'/'masculino'/'homem'/'1' → 1, 'F'/'feminino'/'mulher'/'0' → 0, outros → -1.
+
+    Cada valor distinto é normalizado uma única vez: a coluna costuma ter
+    poucas grafias diferentes, mesmo em lotes grandes.
+    """
+    raw = values.tolist()
+    codes = {value: SEX_CODES.get(normalize(str(value)), -1) for value in set(raw)}
+    return np.fromiter(map(codes.__getitem__, raw), np.int8, len(raw))
+
+
+def parse_csv(data: bytes, max_rows: int) -> dict[str, np.ndarray]:
+    """CSV com cabeçalho (vírgula ou ponto e vírgula, sem aspas) → colunas.
+
+    Um único `split` sobre o texto inteiro e fatias com passo pelo número
+    de colunas: sem objeto por linha. Colunas numéricas viram float64.
+    """
+    text = data.decode("utf-8-sig")
+    header, _, body = text.partition("\n")
+    separator = ";" if header.count(";") > header.count(",") else ","
+    names = [name.strip().lower() for name in header.split(separator)]
+    lines = list(filter(None, body.splitlines()))
+    if len(lines) > max_rows:
+        raise BatchError(f"Envie no máximo {max_rows} linhas por lote.")
+    width = len(names)
+    if lines and set(map(methodcaller("count", separator), lines)) != {width - 1}:
+        raise BatchError("Todas as linhas devem ter o mesmo número de colunas do cabeçalho.")
+    cells = separator.join(lines).split(separator) if lines else []
+    columns = {}
+    for i, name in enumerate(names):
+        # float() já ignora espaços; colunas de texto são aparadas no NumPy
+        values = cells[i::width]
+        if name in NUMERIC:
+            columns[name] = _parse_floats(values, name)
+        else:
+            columns[name] = np.char.strip(np.array(values, dtype=str))
+    return columns
+
+
+def parse_json(data: bytes, max_rows: int) -> dict[str, np.ndarray]:
+    """JSON colunar: {"age": [...], "sex": [...], ...}."""
+    try:
+        payload = orjson.loads(data)
+    except orjson.JSONDecodeError:
+        raise BatchError("JSON inválido.")
+    if not isinstance(payload, dict) or not all(isinstance(v, list) for v in payload.values()):
+        raise BatchError('Envie um objeto com uma lista por coluna, ex: {"age": [30, 41]}.')
+    lengths = {len(values) for values in payload.values()}
+    if len(lengths) > 1:
+        raise BatchError("Todas as colunas devem ter o mesmo tamanho.")
+    if lengths and lengths.pop() > max_rows:
+        raise BatchError(f"Envie no máximo {max_rows} linhas por lote.")
+    columns = {}
+    for name, values in payload.items():
+        name = name.lower()
+        if name in NUMERIC:
+            columns[name] = _parse_floats(values, name)
+        else:
+            columns[name] = np.array(["" if v is None else str(v) for v in values], dtype=str)
+    return columns
+
+
+def parse_columns(data: bytes, max_rows: int) -> dict[str, np.ndarray]:
+    """Detecta o formato pelo primeiro caractere: `{` é JSON, o resto é CSV."""
+    if data.lstrip()[:1] == b"{":
+        return parse_json(data, max_rows)
+    return parse_csv(data, max_rows)
+
+
+def estimate(columns: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+    """Calcula todas as estimativas do lote; retorna colunas de mesmo tamanho."""
+    missing = [name for name in REQUIRED if name not in columns]
+    if missing:
+        raise BatchError(f"Colunas obrigatórias ausentes: {', '.join(missing)}.")
+    size = len(columns["age"])
+
+    age = _to_float(columns["age"], "age")
+    height = _to_float(columns["height"], "height")
+    weight = _to_float(columns["weight"], "weight")
+    male = _sex_codes(columns["sex"])
+    waist, neck, hip = (
+        _to_float(columns[name], name) if name in columns else np.full(size, np.nan)
+        for name in OPTIONAL
+    )
+
+    # Validação por linha: a primeira regra violada vira a mensagem de erro
+    error = np.select(
+        [
+            ~((age >= AGE_RANGE[0]) & (age <= AGE_RANGE[1])),
+            male < 0,
+            ~((height >= HEIGHT_RANGE[0]) & (height <= HEIGHT_RANGE[1])),
+            ~((weight >= WEIGHT_RANGE[0]) & (weight <= WEIGHT_RANGE[1])),
+        ],
+        [
+            "Idade deve estar entre 10 e 120 anos.",
+            "Sexo inválido: use M/F, masculino/feminino ou homem/mulher.",
+            "Altura deve estar entre 100 e 250 cm.",
+            "Peso deve estar entre 30 e 300 kg.",
+        ],
+        default="",
+    )
+    valid = error == ""
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        bmi = weight / (height / 100) ** 2
+        sex = male.astype(np.float64)
+        deurenberg = np.where(
+            age <= 15,
+            1.51 * bmi - 0.70 * age - 3.6 * sex + 1.4,
+            1.20 * bmi + 0.23 * age - 10.8 * sex - 5.4,
+        )
+        log_height = np.log10(height)
+        navy = np.where(
+            male == 1,
+            495 / (1.0324 - 0.19077 * np.log10(waist - neck) + 0.15456 * log_height) - 450,
+            495 / (1.29579 - 0.35004 * np.log10(waist + hip - neck) + 0.22100 * log_height) - 450,
+        )
+    # Medidas ausentes ou incoerentes (cintura <= pescoço) deixam a Marinha em NaN
+    navy[~((navy > 2) & (navy < 75))] = np.nan
+    has_navy = ~np.isnan(navy)
+    fat = np.clip(np.where(has_navy, navy, deurenberg), 3, 60)
+
+    category = np.digitize(bmi, BMI_BOUNDS)
+    # IMC de sobrepeso com gordura baixa é massa muscular, não excesso de gordura
+    lean = (category == 2) & (fat < np.where(male == 1, 20, 30))
+    category[lean] = 1
+
+    bmi[~valid] = np.nan
+    deurenberg[~valid] = np.nan
+    navy[~valid] = np.nan
+    fat[~valid] = np.nan
+
+    ids = columns["id"] if "id" in columns else np.arange(size).astype(str)
+    return {
+        "id": ids,
+        "bmi": np.round(bmi, 1),
+        "fat_deurenberg": np.round(deurenberg, 1),
+        "fat_navy": np.round(navy, 1),
+        "estimated_fat_percentage": np.round(fat, 1),
+        "method": np.where(valid, np.where(has_navy, "navy", "deurenberg"), ""),
+        "estimated_biotype": np.where(valid, BIOTYPES[category], ""),
+        "suggested_goal": np.where(valid, GOALS[category], ""),
+        "error": error,
+    }
+
+
+def _lists(result: dict[str, np.ndarray], start: int, stop: int) -> list[list]:
+    """Fatia do resultado como listas Python (NaN e texto vazio → None)."""
+    columns = []
+    for name in OUTPUT_COLUMNS:
+        values = result[name][start:stop]
+        missing = np.isnan(values) if values.dtype.kind == "f" else values == ""
+        columns.append(np.where(missing, None, values).tolist() if missing.any() else values.tolist())
+    return columns
+
+
+def iter_ndjson(result: dict[str, np.ndarray], chunk_rows: int = 10000) -> Iterator[bytes]:
+    """Uma linha JSON por pessoa (campos ausentes como null), em blocos de `chunk_rows`.
+
+    A última linha traz o resumo do lote (`summary`), como em `/analyze-meals/`.
+    """
+    size = len(result["id"])
+    dumps = orjson.dumps
+    for start in range(0, size, chunk_rows):
+        rows = zip(*_lists(result, start, start + chunk_rows))
+        yield b"\n".join(dumps(dict(zip(OUTPUT_COLUMNS, row))) for row in rows) + b"\n"
+    yield dumps({"summary": summarize(result)}) + b"\n"
+
+
+def iter_csv(result: dict[str, np.ndarray], chunk_rows: int = 10000) -> Iterator[bytes]:
+    """CSV com cabeçalho, em blocos de `chunk_rows` linhas."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(OUTPUT_COLUMNS)
+    # Cabeçalho sai mesmo em lote vazio
+    yield buffer.getvalue().encode()
+    buffer.seek(0)
+    buffer.truncate()
+    size = len(result["id"])
+    for start in range(0, size, chunk_rows):
+        writer.writerows(zip(*_lists(result, start, start + chunk_rows)))
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def summarize(result: dict[str, np.ndarray]) -> dict:
+    valid = result["error"] == ""
+    biotypes, counts = np.unique(result["estimated_biotype"][valid], return_counts=True)
+    return {
+        "count": len(valid),
+        "valid": int(valid.sum()),
+        "invalid": int((~valid).sum()),
+        "mean_bmi": round(float(np.nanmean(result["bmi"])), 1) if valid.any() else None,
+        "mean_fat_percentage": (
+            round(float(np.nanmean(result["estimated_fat_percentage"])), 1) if valid.any() else None
+        ),
+        "biotypes": dict(zip(biotypes.tolist(), counts.tolist())),
+    }
@@ -0,0 +1,274 @@
+"""
+Cache de resultados das análises com IA.
+
+Chaveado pelo digest SHA-256 dos bytes da imagem + campos relevantes do
+formulário. Camada em memória (LRU + TTL) e camada opcional em disco
+(SQLite) que sobrevive a reinícios do processo.
+
+`VariantCache` guarda até N respostas por chave (treinos gerados), para
+que pedidos equivalentes recebam planos variados sem nova chamada à IA.
+"""
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+
+def make_cache_key(namespace: str, data: bytes, **fields: Any) -> str:
+    """Gera a chave de cache a partir da imagem e dos campos do formulário."""
+    digest = hashlib.sha256()
+    digest.update(namespace.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(data)
+    for name in sorted(fields):
+        digest.update(f"\0{name}={fields[name]}".encode("utf-8"))
+    return f"{namespace}:{digest.hexdigest()}"
+
+
+class MemoryTier:
+    """Camada em memória com despejo LRU e expiração por TTL."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> dict | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: dict, ttl: float | None = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+
+class SQLiteTier:
+    """Camada persistente em SQLite (sobrevive a reinícios).
+
+    A cada `purge_every` gravações, remove as linhas expiradas e, acima de
+    `max_entries`, as mais próximas de expirar (as mais antigas, já que o
+    TTL é o mesmo para todas): o arquivo não cresce sem limite.
+    """
+
+    def __init__(self, path: str, ttl: float, max_entries: int = 100000, purge_every: int = 256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.purge_every = purge_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_expires_at ON results (expires_at)")
+        self._conn.commit()
+        self.expirations = 0
+        self.evictions = 0
+        # Linhas deixadas por execuções anteriores
+        self.purge()
+
+    def get(self, key: str) -> tuple[dict, float] | None:
+        """Retorna (valor, TTL restante) ou None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            remaining = expires_at - time.time()
+            if remaining <= 0:
+                self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                self._conn.commit()
+                self.expirations += 1
+                return None
+        return json.loads(value), remaining
+
+    def set(self, key: str, value: dict) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), time.time() + self.ttl),
+            )
+            self._conn.commit()
+        self._writes += 1
+        if self._writes % self.purge_every == 0:
+            self.purge()
+
+    def purge(self) -> int:
+        """Remove expiradas e o excesso acima de `max_entries`; devolve as linhas removidas."""
+        with self._lock:
+            expired = self._conn.execute(
+                "DELETE FROM results WHERE expires_at <= ?", (time.time(),)
+            ).rowcount
+            excess = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0] - self.max_entries
+            evicted = 0
+            if excess > 0:
+                evicted = self._conn.execute(
+                    "DELETE FROM results WHERE key IN"
+                    " (SELECT key FROM results ORDER BY expires_at LIMIT ?)",
+                    (excess,),
+                ).rowcount
+            self._conn.commit()
+        self.expirations += expired
+        self.evictions += evicted
+        return expired + evicted
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+class ResultCache:
+    """Cache em duas camadas: memória (LRU + TTL) e disco opcional."""
+
+    def __init__(
+        self, max_entries: int = 512, ttl: float = 3600, disk_path: str = "",
+        disk_max_entries: int = 100000,
+    ):
+        self.memory = MemoryTier(max_entries, ttl)
+        self.disk = SQLiteTier(disk_path, ttl, disk_max_entries) if disk_path else None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.stores = 0
+
+    async def get(self, key: str) -> dict | None:
+        value = self.memory.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        if self.disk is not None:
+            found = await asyncio.to_thread(self.disk.get, key)
+            if found is not None:
+                value, remaining = found
+                self.memory.set(key, value, ttl=remaining)
+                self.hits += 1
+                self.disk_hits += 1
+                return value
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: dict) -> None:
+        self.memory.set(key, value)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, key, value)
+        self.stores += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "bypasses": self.bypasses,
+            "stores": self.stores,
+            "evictions": self.memory.evictions + (self.disk.evictions if self.disk else 0),
+            "disk_evictions": self.disk.evictions if self.disk else 0,
+            "expirations": self.memory.expirations
+            + (self.disk.expirations if self.disk else 0),
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self.memory),
+            "disk_enabled": self.disk is not None,
+        }
+
+
+class VariantCache:
+    """Até `variants` respostas por chave, com despejo LRU e expiração por TTL.
+
+    Enquanto a chave tiver menos variantes que o limite, `get` responde
+    falta e a nova resposta gerada é acrescentada; cheia, as variantes são
+    servidas em rodízio.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 86400, variants: int = 3):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.variants = max(1, variants)
+        # chave -> [próxima variante a servir, [(expira em, resposta), ...]]
+        self._entries: OrderedDict[Any, list] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Any) -> dict | None:
+        entry = self._entries.get(key)
+        if entry is not None:
+            now = time.monotonic()
+            fresh = [item for item in entry[1] if item[0] > now]
+            self.expirations += len(entry[1]) - len(fresh)
+            entry[1] = fresh
+            if len(fresh) >= self.variants:
+                self._entries.move_to_end(key)
+                index = entry[0] % len(fresh)
+                entry[0] = index + 1
+                self.hits += 1
+                return fresh[index][1]
+        self.misses += 1
+        return None
+
+    def add(self, key: Any, value: dict) -> None:
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = [0, []]
+        if len(entry[1]) < self.variants:
+            entry[1].append((time.monotonic() + self.ttl, value))
+            self.stores += 1
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            # Cada acerto é uma geração de treino a menos na OpenAI
+            "upstream_calls_saved": self.hits,
+            "keys": len(self._entries),
+            "variants": self.variants,
+        }
+
+
+def should_bypass(cache_control: str | None) -> tuple[bool, bool]:
+    """Interpreta o header Cache-Control: retorna (pular leitura, pular escrita)."""
+    directives = {d.strip().lower() for d in (cache_control or "").split(",")}
+    no_store = "no-store" in directives
+    return ("no-cache" in directives or no_store), no_store
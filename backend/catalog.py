@@ -0,0 +1,190 @@
+"""
+Catálogo local de exercícios e motor de regras para planos de treino.
+
+O catálogo (`data/exercises.json`) marca cada exercício com grupo
+muscular, equipamento e contraindicações (joelho, lombar, ombro...). Na
+carga, são pré-calculados índices em bitmask: grupo → exercícios,
+equipamento → exercícios que o exigem e limitação → exercícios
+contraindicados. Montar um plano é só AND/OR de inteiros e a escolha do
+primeiro exercício elegível de cada grupo, na ordem do catálogo.
+
+Local e limitações são normalizados (minúsculas, sem acentos nem
+pontuação) e convertidos em tags pelo vocabulário do catálogo. Pedidos
+com alguma palavra fora do vocabulário são considerados incomuns e ficam
+para a IA (`plan` devolve None).
+"""
+
+import json
+import re
+import unicodedata
+from pathlib import Path
+
+CATALOG_PATH = Path(__file__).resolve().parent / "data" / "exercises.json"
+
+MIN_EXERCISES = 4
+MAX_EXERCISES = 6
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(text: str) -> str:
+    """Minúsculas, sem acentos e sem pontuação: "Dor no Joelho!" → "dor no joelho"."""
+    decomposed = unicodedata.normalize("NFKD", (text or "").lower())
+    ascii_text = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(_NON_WORD.sub(" ", ascii_text).split())
+
+
+def _lowest_bit(mask: int) -> int:
+    return (mask & -mask).bit_length() - 1
+
+
+class WorkoutEngine:
+    def __init__(self, catalog: dict):
+        self.exercises = catalog["exercises"]
+        self.groups = catalog["groups"]
+        self.location_equipment = {
+            name: frozenset(items) for name, items in catalog["equipment"].items()
+        }
+        self.location_words = catalog["location_words"]
+        self.equipment_words = catalog["equipment_words"]
+        self.location_fillers = frozenset(catalog["location_fillers"])
+        self.limitation_words = catalog["limitation_words"]
+        self.limitation_fillers = frozenset(catalog["limitation_fillers"])
+        self.limitation_labels = catalog["limitation_labels"]
+
+        # Índices: bit i = i-ésimo exercício do catálogo (ordem = prioridade)
+        self.by_group: dict[str, int] = {group: 0 for group in self.groups}
+        self.requires: dict[str, int] = {}
+        self.contraindicated: dict[str, int] = {}
+        for i, exercise in enumerate(self.exercises):
+            bit = 1 << i
+            self.by_group[exercise["group"]] |= bit
+            for item in exercise["equipment"]:
+                self.requires[item] = self.requires.get(item, 0) | bit
+            for tag in exercise["contraindications"]:
+                self.contraindicated[tag] = self.contraindicated.get(tag, 0) | bit
+        self.all_mask = (1 << len(self.exercises)) - 1
+        # Seleção por (equipamentos, limitações): poucas combinações na prática
+        self._selections: dict[tuple, tuple[int, ...]] = {}
+
+        self.served = 0
+        self.declined = 0
+
+    @classmethod
+    def from_file(cls, path: str | Path = CATALOG_PATH) -> "WorkoutEngine":
+        with open(path, encoding="utf-8") as catalog:
+            return cls(json.load(catalog))
+
+    def parse(self, training_location: str, limitations: str) -> tuple:
+        """Converte o pedido em (local, equipamentos, limitações, palavras desconhecidas)."""
+        location = None
+        equipment = set()
+        unknown = []
+        for word in normalize(training_location).split():
+            if word in self.location_words:
+                # Academia prevalece se o texto citar mais de um local
+                if location != "gym":
+                    location = self.location_words[word]
+            elif word in self.equipment_words:
+                equipment.add(self.equipment_words[word])
+            elif word not in self.location_fillers:
+                unknown.append(word)
+        if location is not None:
+            equipment |= self.location_equipment[location]
+
+        tags = set()
+        for word in normalize(limitations).split():
+            if word in self.limitation_words:
+                tags.add(self.limitation_words[word])
+            elif word not in self.limitation_fillers:
+                unknown.append(word)
+        return location, frozenset(equipment), frozenset(tags), tuple(unknown)
+
+    def canonical_key(self, training_location: str, limitations: str) -> tuple:
+        """Pedido canônico: sinônimos viram tags ordenadas ("Em casa" == "casa").
+
+        Palavras fora do vocabulário entram normalizadas, sem repetição e em
+        ordem, para que variações de escrita do mesmo pedido coincidam.
+        """
+        location, equipment, tags, unknown = self.parse(training_location, limitations)
+        return location, tuple(sorted(equipment)), tuple(sorted(tags)), tuple(sorted(set(unknown)))
+
+    def plan(self, training_location: str, limitations: str) -> dict | None:
+        """Plano pelas regras, ou None se o pedido for incomum (fica para a IA)."""
+        location, equipment, tags, unknown = self.parse(training_location, limitations)
+        if location is None or unknown:
+            self.declined += 1
+            return None
+        selection = self._select(equipment, tags)
+        if len(selection) < MIN_EXERCISES:
+            self.declined += 1
+            return None
+        self.served += 1
+        return self._build(location, equipment, tags, selection)
+
+    def build(self, training_location: str, limitations: str) -> dict:
+        """Sempre monta um plano, ignorando palavras desconhecidas (modo simulação)."""
+        location, equipment, tags, _ = self.parse(training_location, limitations)
+        location = location or "gym"
+        equipment |= self.location_equipment[location]
+        return self._build(location, equipment, tags, self._select(equipment, tags))
+
+    def _select(self, equipment: frozenset, tags: frozenset) -> tuple[int, ...]:
+        selection = self._selections.get((equipment, tags))
+        if selection is None:
+            selection = self._selections[(equipment, tags)] = self._compute_selection(equipment, tags)
+        return selection
+
+    def _compute_selection(self, equipment: frozenset, tags: frozenset) -> tuple[int, ...]:
+        eligible = self.all_mask
+        for item, mask in self.requires.items():
+            if item not in equipment:
+                eligible &= ~mask
+        for tag in tags:
+            eligible &= ~self.contraindicated.get(tag, 0)
+
+        selection = []
+        for group in self.groups:
+            candidates = eligible & self.by_group[group]
+            if candidates:
+                selection.append(_lowest_bit(candidates))
+        return tuple(selection[:MAX_EXERCISES])
+
+    def _build(
+        self, location: str, equipment: frozenset, tags: frozenset, selection: tuple[int, ...]
+    ) -> dict:
+        exercises = [
+            {
+                "name": self.exercises[i]["name"],
+                "sets": self.exercises[i]["sets"],
+                "reps": self.exercises[i]["reps"],
+                "tips": self.exercises[i]["tips"],
+            }
+            for i in selection
+        ]
+        feedback = "Treino de corpo inteiro, equilibrado entre membros inferiores, superiores e core. "
+        if tags:
+            labels = ", ".join(sorted(self.limitation_labels[tag] for tag in tags))
+            feedback += f"Exercícios escolhidos para proteger: {labels}. "
+        if location != "gym":
+            if equipment != self.location_equipment[location]:
+                feedback += "Adaptado ao local e aos equipamentos informados."
+            elif location == "home":
+                feedback += "Adaptado para casa, usando peso corporal."
+            else:
+                feedback += "Adaptado para treino ao ar livre, com peso corporal e barra."
+        return {
+            "title": "Treino A - Corpo Inteiro",
+            "focus": "Força e Hipertrofia" if location == "gym" else "Força e Estabilidade",
+            "exercises": exercises,
+            "feedback": feedback.strip(),
+        }
+
+    def stats(self) -> dict:
+        total = self.served + self.declined
+        return {
+            "exercises": len(self.exercises),
+            "served": self.served,
+            "declined": self.declined,
+            "hit_rate": round(self.served / total, 3) if total else 0.0,
+        }
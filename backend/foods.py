@@ -0,0 +1,295 @@
+"""
+Tabela local de composição de alimentos e busca por texto.
+
+`data/foods.csv` segue o formato da TACO (valores por 100 g: kcal,
+proteína, carboidratos e gordura), com porção típica, peso por unidade
+e apelidos. Os nutrientes ficam em colunas `array('f')`; nomes e apelidos
+normalizados (`catalog.normalize`) alimentam três índices:
+
+- exato: chave → alimento
+- prefixo: chaves ordenadas + bisect ("fei" → feijão)
+- trigramas: trigrama → chaves que o contêm, para erros de digitação
+  (similaridade de Dice sobre os trigramas)
+
+`MealParser` divide um texto como "arroz, feijão e frango 150g" em itens,
+lê quantidade e unidade de cada um e soma calorias e macros.
+"""
+
+import csv
+import math
+import re
+import unicodedata
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+
+from catalog import normalize
+
+FOODS_PATH = Path(__file__).resolve().parent / "data" / "foods.csv"
+
+# Similaridade mínima (Dice sobre trigramas) para aceitar um alimento aproximado
+MIN_SIMILARITY = 0.5
+
+# Medidas caseiras em gramas; "unidade" e "fatia" usam o peso do alimento quando há
+UNIT_GRAMS = {
+    "g": 1, "kg": 1000, "ml": 1, "l": 1000,
+    "colher_sopa": 15, "colher_cha": 5, "xicara": 160, "concha": 140,
+    "copo": 200, "lata": 350, "scoop": 30, "pedaco": 50, "fatia": 25,
+}
+UNIT_WORDS = {
+    "g": "g", "gr": "g", "grama": "g", "gramas": "g",
+    "kg": "kg", "quilo": "kg", "quilos": "kg",
+    "ml": "ml", "l": "l", "litro": "l", "litros": "l",
+    "colher": "colher_sopa", "colheres": "colher_sopa",
+    "xicara": "xicara", "xicaras": "xicara", "concha": "concha", "conchas": "concha",
+    "copo": "copo", "copos": "copo", "lata": "lata", "latas": "lata",
+    "scoop": "scoop", "scoops": "scoop", "dosador": "scoop", "dosadores": "scoop",
+    "pedaco": "pedaco", "pedacos": "pedaco", "fatia": "fatia", "fatias": "fatia",
+    "unidade": "unidade", "unidades": "unidade", "un": "unidade",
+    "porcao": "porcao", "porcoes": "porcao", "prato": "porcao", "pratos": "porcao",
+}
+NUMBER_WORDS = {
+    "meio": 0.5, "meia": 0.5, "um": 1, "uma": 1, "dois": 2, "duas": 2,
+    "tres": 3, "quatro": 4, "cinco": 5,
+}
+# Acima disso o item é tratado como não reconhecido (erro de digitação, não refeição)
+MAX_ITEM_GRAMS = 5000
+# Sem unidade, quantidades pequenas são unidades ("2 ovos") e as demais, gramas ("frango 150")
+MAX_IMPLICIT_UNITS = 20
+
+# Vírgula entre dígitos é decimal ("1,5 kg"), não separador de itens
+_SEPARATORS = re.compile(r"(?<!\d),|,(?!\d)|[;+\n]|\be\b|\bcom\b")
+# Palavras terminam em \b ("uma" não é "um" + "a"); dígitos podem vir colados à unidade ("150g")
+_WORDS = "|".join(sorted(NUMBER_WORDS, key=len, reverse=True))
+_AMOUNT = rf"(\d+(?:[.,]\d+)?(?:/\d+)?|(?:{_WORDS})\b)"
+_UNIT = r"(colher(?:es)? de (?:sopa|cha)|[a-z]+)"
+_LEADING = re.compile(rf"^{_AMOUNT}\s*(?:{_UNIT}\b)?\s*(?:(?:de|da|do|das|dos)\s+)?(.*)$")
+_TRAILING = re.compile(rf"^(.*?)\s+{_AMOUNT}\s*(?:{_UNIT})?$")
+
+
+def _fold(text: str) -> str:
+    """Minúsculas e sem acentos, preservando dígitos e pontuação das quantidades."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def _trigrams(key: str) -> set[str]:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _amount(text: str) -> float:
+    """Quantidade do item; ValueError se não for um número positivo e finito."""
+    if text in NUMBER_WORDS:
+        return NUMBER_WORDS[text]
+    try:
+        if "/" in text:
+            numerator, denominator = text.split("/")
+            value = float(numerator.replace(",", ".")) / float(denominator)
+        else:
+            value = float(text.replace(",", "."))
+    except ZeroDivisionError:
+        raise ValueError(f"Quantidade inválida: {text}")
+    # Dígitos demais viram inf no float
+    if not 0 < value < math.inf:
+        raise ValueError(f"Quantidade inválida: {text}")
+    return value
+
+
+class FoodTable:
+    def __init__(self, rows: list[dict]):
+        self.names: list[str] = []
+        self.kcal = array("f")
+        self.protein = array("f")
+        self.carbs = array("f")
+        self.fat = array("f")
+        self.portion = array("f")
+        self.unit = array("f")
+
+        # Chave normalizada (nome ou apelido) → alimento
+        self.exact: dict[str, int] = {}
+        for food_id, row in enumerate(rows):
+            self.names.append(row["name"])
+            self.kcal.append(float(row["kcal"]))
+            self.protein.append(float(row["protein"]))
+            self.carbs.append(float(row["carbs"]))
+            self.fat.append(float(row["fat"]))
+            self.portion.append(float(row["portion_g"]))
+            self.unit.append(float(row["unit_g"] or 0))
+            for key in (row["name"], *filter(None, (row.get("aliases") or "").split("|"))):
+                self.exact.setdefault(normalize(key), food_id)
+
+        self.keys = sorted(self.exact)
+        self.key_foods = array("H", (self.exact[key] for key in self.keys))
+        self.trigram_index: dict[str, array] = {}
+        self.key_trigrams = [_trigrams(key) for key in self.keys]
+        for key_id, grams in enumerate(self.key_trigrams):
+            for gram in grams:
+                self.trigram_index.setdefault(gram, array("H")).append(key_id)
+
+    @classmethod
+    def from_file(cls, path: str | Path = FOODS_PATH) -> "FoodTable":
+        with open(path, encoding="utf-8", newline="") as foods:
+            return cls(list(csv.DictReader(foods)))
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def lookup(self, text: str) -> tuple[int, float] | None:
+        """Alimento mais próximo do texto: (id, similaridade), ou None."""
+        key = normalize(text)
+        if not key:
+            return None
+        if key in self.exact:
+            return self.exact[key], 1.0
+        # Plural simples: "ovos" → "ovo", "bananas pratas" → "banana prata"
+        singular = " ".join(word[:-1] if len(word) > 3 and word.endswith("s") else word for word in key.split())
+        if singular in self.exact:
+            return self.exact[singular], 1.0
+
+        # Prefixo: a chave mais curta que começa com o texto digitado
+        position = bisect_left(self.keys, key)
+        if position < len(self.keys) and self.keys[position].startswith(key) and len(key) >= 3:
+            best = min(
+                (k for k in self.keys[position:position + 16] if k.startswith(key)), key=len
+            )
+            return self.exact[best], len(key) / len(best)
+
+        # Trigramas: conta trigramas em comum por chave e aplica Dice
+        grams = _trigrams(key)
+        shared: dict[int, int] = {}
+        for gram in grams:
+            for key_id in self.trigram_index.get(gram, ()):
+                shared[key_id] = shared.get(key_id, 0) + 1
+        best_id, best_score = -1, 0.0
+        for key_id, count in shared.items():
+            score = 2 * count / (len(grams) + len(self.key_trigrams[key_id]))
+            if score > best_score or (score == best_score and len(self.keys[key_id]) < len(self.keys[best_id])):
+                best_id, best_score = key_id, score
+        if best_score < MIN_SIMILARITY:
+            return None
+        return self.key_foods[best_id], best_score
+
+    def grams_for(self, food_id: int, amount: float | None, unit: str | None) -> float:
+        """Converte quantidade + unidade em gramas; sem quantidade, a porção típica."""
+        if amount is None:
+            return self.portion[food_id]
+        if unit is None:
+            if amount > MAX_IMPLICIT_UNITS:
+                return amount
+            unit = "unidade"
+        if unit == "porcao":
+            return amount * self.portion[food_id]
+        if unit in ("unidade", "fatia") and self.unit[food_id]:
+            return amount * self.unit[food_id]
+        if unit == "unidade":
+            return amount * self.portion[food_id]
+        return amount * UNIT_GRAMS[unit]
+
+
+class MealParser:
+    def __init__(self, table: FoodTable):
+        self.table = table
+        self.requests = 0
+        self.items = 0
+        self.unmatched = 0
+
+    @staticmethod
+    def split_quantity(item: str) -> tuple[float | None, str | None, str]:
+        """"150g de frango" / "frango 150 g" → (150, "g", "frango")."""
+        for pattern, groups in ((_LEADING, (1, 2, 3)), (_TRAILING, (2, 3, 1))):
+            match = pattern.match(item)
+            if match is None:
+                continue
+            amount, unit_text, rest = (match.group(i) for i in groups)
+            if unit_text is None:
+                unit = None
+            elif unit_text.startswith("colher"):
+                unit = "colher_cha" if unit_text.endswith("cha") else "colher_sopa"
+            elif unit_text in UNIT_WORDS:
+                unit = UNIT_WORDS[unit_text]
+            elif pattern is _LEADING:
+                # Não é unidade ("2 ovos"): a palavra faz parte do alimento
+                unit, rest = None, f"{unit_text} {rest}"
+            else:
+                continue
+            if rest.strip():
+                return _amount(amount), unit, rest.strip()
+        return None, None, item.strip()
+
+    def parse(self, text: str) -> dict:
+        """Itens reconhecidos, totais no formato de `MealAnalysis` e os não reconhecidos."""
+        self.requests += 1
+        items, unmatched = [], []
+        totals = [0.0, 0.0, 0.0, 0.0]
+        for raw in _SEPARATORS.split(_fold(text)):
+            raw = " ".join(raw.split())
+            if not raw:
+                continue
+            self.items += 1
+            try:
+                amount, unit, name = self.split_quantity(raw)
+            except ValueError:
+                match = None
+            else:
+                match = self.table.lookup(name)
+            if match is not None:
+                food_id = match[0]
+                grams = self.table.grams_for(food_id, amount, unit)
+            if match is None or not grams <= MAX_ITEM_GRAMS:
+                self.unmatched += 1
+                unmatched.append(raw)
+                continue
+            factor = grams / 100
+            values = (
+                self.table.kcal[food_id] * factor, self.table.protein[food_id] * factor,
+                self.table.carbs[food_id] * factor, self.table.fat[food_id] * factor,
+            )
+            for i, value in enumerate(values):
+                totals[i] += value
+            items.append({
+                "input": raw,
+                "food": self.table.names[food_id],
+                "grams": round(grams),
+                "calories": round(values[0]),
+                "macros": {
+                    "protein": round(values[1]), "carbs": round(values[2]), "fat": round(values[3]),
+                },
+            })
+
+        calories, protein, carbs, fat = (round(value) for value in totals)
+        return {
+            "total_calories": calories,
+            "macros": {"protein": protein, "carbs": carbs, "fat": fat},
+            "feedback": self.feedback(calories, protein, carbs, fat, unmatched),
+            "meal_type": "Refeição - " + ", ".join(item["food"] for item in items),
+            "items": items,
+            "unmatched": unmatched,
+        }
+
+    @staticmethod
+    def feedback(calories: int, protein: int, carbs: int, fat: int, unmatched: list[str]) -> str:
+        parts = []
+        energy = protein * 4 + carbs * 4 + fat * 9
+        if energy:
+            if protein * 4 / energy < 0.15:
+                parts.append("Pouca proteína: inclua uma fonte magra como frango, ovos ou peixe.")
+            elif protein * 4 / energy >= 0.30:
+                parts.append("Ótima fonte de proteína!")
+            if fat * 9 / energy > 0.40:
+                parts.append("Refeição rica em gordura; prefira preparos grelhados ou cozidos.")
+            if not parts:
+                parts.append("Refeição equilibrada entre proteínas, carboidratos e gorduras.")
+        if calories > 1000:
+            parts.append("Valor calórico alto para uma única refeição.")
+        if unmatched:
+            parts.append(f"Não reconhecemos: {', '.join(unmatched)}.")
+        return " ".join(parts)
+
+    def stats(self) -> dict:
+        return {
+            "foods": len(self.table),
+            "requests": self.requests,
+            "items": self.items,
+            "unmatched": self.unmatched,
+        }
@@ -0,0 +1,214 @@
+"""
+Governança das chamadas à OpenAI.
+
+- Limite de concorrência global e por endpoint, com fila de espera limitada
+- Prazo por tentativa e novas tentativas com backoff exponencial + jitter,
+  apenas para erros transitórios (timeout, conexão, 429, 5xx)
+- Circuit breaker: após falhas consecutivas, as chamadas são recusadas de
+  imediato (`UpstreamUnavailable`) e os endpoints usam o fallback local
+"""
+
+import asyncio
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_NAMES = {"APIConnectionError", "APITimeoutError"}
+
+
+class UpstreamUnavailable(Exception):
+    """Chamada recusada sem tocar na OpenAI (circuito aberto ou fila cheia)."""
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Erros transitórios; classificados sem importar o SDK da OpenAI."""
+    if isinstance(exc, asyncio.TimeoutError):
+        return True
+    if type(exc).__name__ in RETRYABLE_NAMES:
+        return True
+    return getattr(exc, "status_code", None) in RETRYABLE_STATUS
+
+
+class ConcurrencyLimiter:
+    """Semáforo com fila de espera limitada."""
+
+    def __init__(self, limit: int, max_queue: int):
+        self.limit = limit
+        self.max_queue = max_queue
+        self._semaphore = asyncio.Semaphore(limit)
+        self.waiting = 0
+        self.in_flight = 0
+        self.rejected = 0
+
+    @asynccontextmanager
+    async def acquire(self, timeout: float):
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise UpstreamUnavailable("fila de chamadas cheia")
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise UpstreamUnavailable("tempo de espera na fila esgotado") from None
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "rejected": self.rejected,
+        }
+
+
+class CircuitBreaker:
+    """Fechado → aberto após `failure_threshold` falhas seguidas; meio-aberto após `cooldown`."""
+
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 30):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.times_opened = 0
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probe_in_flight:
+            # Uma única chamada de teste decide se o circuito fecha
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def release_probe(self) -> None:
+        """Libera a chamada de teste sem concluir nada (ex: cancelamento)."""
+        self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._probe_in_flight or self.failures >= self.failure_threshold:
+            if self.opened_at is None or self._probe_in_flight:
+                self.times_opened += 1
+            self.opened_at = time.monotonic()
+        self._probe_in_flight = False
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "times_opened": self.times_opened,
+        }
+
+
+class Governor:
+    def __init__(
+        self,
+        max_concurrency: int = 16,
+        endpoint_concurrency: int = 8,
+        max_queue: int = 32,
+        queue_timeout: float = 5,
+        timeout: float = 30,
+        retries: int = 2,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 4,
+        breaker: CircuitBreaker | None = None,
+    ):
+        self.endpoint_concurrency = endpoint_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.breaker = breaker or CircuitBreaker()
+        self.global_limiter = ConcurrencyLimiter(max_concurrency, max_queue)
+        self._endpoints: dict[str, ConcurrencyLimiter] = {}
+        self.timeouts = 0
+        self.retried = 0
+        self.short_circuited = 0
+
+    def _endpoint(self, name: str) -> ConcurrencyLimiter:
+        limiter = self._endpoints.get(name)
+        if limiter is None:
+            limiter = self._endpoints[name] = ConcurrencyLimiter(
+                self.endpoint_concurrency, self.max_queue
+            )
+        return limiter
+
+    def backoff(self, attempt: int) -> float:
+        """Backoff exponencial com jitter total."""
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    @asynccontextmanager
+    async def slot(self, endpoint: str):
+        """Reserva uma vaga para a chamada e registra o resultado no circuit breaker."""
+        if not self.breaker.allow():
+            self.short_circuited += 1
+            raise UpstreamUnavailable("circuito aberto")
+        try:
+            async with self._endpoint(endpoint).acquire(self.queue_timeout):
+                async with self.global_limiter.acquire(self.queue_timeout):
+                    yield
+        except (UpstreamUnavailable, asyncio.CancelledError, GeneratorExit):
+            self.breaker.release_probe()
+            raise
+        except Exception as e:
+            if is_retryable(e):
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            raise
+        else:
+            self.breaker.record_success()
+
+    async def call(self, endpoint: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Executa `fn` com prazo, novas tentativas e proteção do circuit breaker."""
+        async with self.slot(endpoint):
+            attempt = 0
+            while True:
+                try:
+                    return await asyncio.wait_for(fn(), self.timeout)
+                except Exception as e:
+                    if isinstance(e, asyncio.TimeoutError):
+                        self.timeouts += 1
+                    if not is_retryable(e) or attempt >= self.retries:
+                        raise
+                    self.retried += 1
+                    await asyncio.sleep(self.backoff(attempt))
+                    attempt += 1
+
+    def stats(self) -> dict:
+        return {
+            "breaker": self.breaker.stats(),
+            "global": self.global_limiter.stats(),
+            "endpoints": {name: limiter.stats() for name, limiter in self._endpoints.items()},
+            "timeouts": self.timeouts,
+            "retries": self.retried,
+            "short_circuited": self.short_circuited,
+        }
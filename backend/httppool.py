@@ -0,0 +1,118 @@
+"""
+Cliente HTTP compartilhado do SDK da OpenAI.
+
+Um único `httpx.AsyncClient` com limites de pool explícitos, expiração de
+keep-alive e HTTP/2 quando o pacote `h2` está instalado. O transporte é
+instrumentado pela extensão `trace` do httpcore: cada requisição que abre
+conexão TCP conta como conexão nova, as demais como reuso. Conexões de
+aquecimento são abertas na inicialização, antes de o servidor aceitar
+requisições.
+"""
+
+import asyncio
+import logging
+
+import httpx
+
+try:
+    import h2  # noqa: F401
+    HAS_H2 = True
+except ImportError:
+    HAS_H2 = False
+
+logger = logging.getLogger("fitscan")
+
+
+class PooledTransport(httpx.AsyncBaseTransport):
+    """Transporte httpx com contadores de reuso e saturação do pool."""
+
+    def __init__(self, max_connections: int, **kwargs):
+        self.max_connections = max_connections
+        self._transport = httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=kwargs.pop("max_keepalive_connections"),
+                keepalive_expiry=kwargs.pop("keepalive_expiry"),
+            ),
+            **kwargs,
+        )
+        self.requests = 0
+        self.new_connections = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.saturated = 0
+
+    async def _trace(self, event: str, info: dict) -> None:
+        if event == "connection.connect_tcp.complete":
+            self.new_connections += 1
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        if self.in_flight >= self.max_connections:
+            # Todas as conexões ocupadas: a requisição espera vaga no pool
+            self.saturated += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        request.extensions = {**request.extensions, "trace": self._trace}
+        try:
+            return await self._transport.handle_async_request(request)
+        finally:
+            self.in_flight -= 1
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+    def stats(self) -> dict:
+        # `_pool` é o AsyncConnectionPool do httpcore; só leitura, para o /health
+        connections = getattr(getattr(self._transport, "_pool", None), "connections", [])
+        reused = self.requests - self.new_connections
+        return {
+            "max_connections": self.max_connections,
+            "open_connections": len(connections),
+            "idle_connections": sum(1 for conn in connections if conn.is_idle()),
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "saturated": self.saturated,
+            "requests": self.requests,
+            "new_connections": self.new_connections,
+            "reuse_ratio": round(reused / self.requests, 3) if self.requests else 0.0,
+        }
+
+
+def build_http_client(
+    max_connections: int = 16,
+    max_keepalive_connections: int = 16,
+    keepalive_expiry: float = 60,
+    http2: bool = True,
+    timeout: float = 30,
+    connect_timeout: float = 5,
+) -> tuple[httpx.AsyncClient, PooledTransport]:
+    """Cria o cliente compartilhado; HTTP/2 só é ativado se `h2` estiver instalado."""
+    transport = PooledTransport(
+        max_connections,
+        max_keepalive_connections=max_keepalive_connections,
+        keepalive_expiry=keepalive_expiry,
+        http2=http2 and HAS_H2,
+    )
+    client = httpx.AsyncClient(
+        transport=transport,
+        timeout=httpx.Timeout(timeout, connect=connect_timeout),
+    )
+    return client, transport
+
+
+async def warm_up(client: httpx.AsyncClient, url: str, connections: int, http2: bool) -> int:
+    """Abre conexões (TCP + TLS) com o servidor antes do primeiro usuário.
+
+    Qualquer resposta HTTP serve: o objetivo é deixar a conexão no pool.
+    Com HTTP/2 uma única conexão multiplexa as chamadas. Retorna quantas
+    conexões responderam.
+    """
+    count = 1 if http2 else connections
+    results = await asyncio.gather(
+        *(client.head(url) for _ in range(count)), return_exceptions=True
+    )
+    failures = [r for r in results if isinstance(r, Exception)]
+    if failures:
+        logger.warning(f"Aquecimento de conexões falhou ({len(failures)}/{count}): {failures[0]!r}")
+    return count - len(failures)
@@ -0,0 +1,293 @@
+"""
+Fila persistente de análises assíncronas.
+
+O envio grava o job em SQLite e devolve o id na hora; um pool de tarefas
+asyncio consome a fila. Cada execução reivindica o job com um token e um
+prazo (lease) por update condicional, então dois workers (ou dois
+processos do uvicorn com o mesmo arquivo) nunca executam o mesmo job ao
+mesmo tempo, e a conclusão só é aceita do dono do token. Jobs que
+estavam em execução quando o processo caiu voltam para a fila quando o
+lease vence. Jobs concluídos expiram após o TTL.
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Awaitable, Callable
+
+logger = logging.getLogger("fitscan")
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+Handler = Callable[[bytes, dict], Awaitable[dict]]
+
+
+class JobStore:
+    """Tabela de jobs em SQLite; acesso síncrono, serializado por lock."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self.open()
+
+    def open(self) -> None:
+        """Abre a conexão (de novo, se `close` já foi chamado)."""
+        with self._lock:
+            if self._conn is not None:
+                return
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL,"
+                " payload BLOB, params TEXT NOT NULL, result TEXT, error TEXT,"
+                " token TEXT, lease_until REAL, attempts INTEGER NOT NULL DEFAULT 0,"
+                " created_at REAL NOT NULL, updated_at REAL NOT NULL, expires_at REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+            self._conn.commit()
+
+    def insert(self, kind: str, payload: bytes, params: dict) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, status, payload, params, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, QUEUED, payload, json.dumps(params), now, now),
+            )
+            self._conn.commit()
+        return job_id
+
+    def claim(self, lease: float, max_attempts: int, ttl: float) -> tuple | None:
+        """Reivindica o job mais antigo disponível: (id, kind, payload, params, token)."""
+        now = time.time()
+        with self._lock:
+            while True:
+                row = self._conn.execute(
+                    "SELECT id, kind, payload, params, status, token, attempts FROM jobs"
+                    " WHERE status = ? OR (status = ? AND lease_until <= ?)"
+                    " ORDER BY created_at LIMIT 1",
+                    (QUEUED, RUNNING, now),
+                ).fetchone()
+                if row is None:
+                    return None
+                job_id, kind, payload, params, status, old_token, attempts = row
+                if attempts >= max_attempts:
+                    # Derrubou o processo repetidas vezes: não tentar de novo
+                    self._finish(job_id, old_token, FAILED, None, "tentativas esgotadas", now + ttl)
+                    continue
+                token = uuid.uuid4().hex
+                # Update condicional: só um reivindicador vence, mesmo entre processos
+                cursor = self._conn.execute(
+                    "UPDATE jobs SET status = ?, token = ?, lease_until = ?,"
+                    " attempts = attempts + 1, updated_at = ?"
+                    " WHERE id = ? AND status = ? AND token IS ?",
+                    (RUNNING, token, now + lease, now, job_id, status, old_token),
+                )
+                self._conn.commit()
+                if cursor.rowcount == 1:
+                    return job_id, kind, payload, json.loads(params), token
+
+    def _finish(self, job_id, token, status, result, error, expires_at) -> bool:
+        cursor = self._conn.execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, payload = NULL,"
+            " lease_until = NULL, updated_at = ?, expires_at = ?"
+            " WHERE id = ? AND token IS ?",
+            (
+                status, None if result is None else json.dumps(result, ensure_ascii=False),
+                error, time.time(), expires_at, job_id, token,
+            ),
+        )
+        self._conn.commit()
+        return cursor.rowcount == 1
+
+    def finish(self, job_id: str, token: str, status: str, result, error, ttl: float) -> bool:
+        """Grava o resultado; recusado se outro worker reivindicou o job (lease vencido)."""
+        with self._lock:
+            return self._finish(job_id, token, status, result, error, time.time() + ttl)
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT kind, status, result, error, created_at, updated_at, expires_at"
+                " FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        kind, status, result, error, created_at, updated_at, expires_at = row
+        if expires_at is not None and expires_at <= time.time():
+            return None
+        job = {
+            "job_id": job_id, "kind": kind, "status": status,
+            "created_at": created_at, "updated_at": updated_at,
+        }
+        if result is not None:
+            job["result"] = json.loads(result)
+        if error is not None:
+            job["error"] = error
+        return job
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE expires_at <= ?", (time.time(),)
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+    def counts(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+            ).fetchall()
+        return dict(rows)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class JobQueue:
+    def __init__(
+        self,
+        path: str,
+        workers: int = 2,
+        ttl: float = 3600,
+        lease: float = 120,
+        max_attempts: int = 3,
+        poll_interval: float = 1.0,
+    ):
+        self.store = JobStore(path)
+        self.workers = workers
+        self.ttl = ttl
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self._handlers: dict[str, Handler] = {}
+        self._tasks: list[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+        # Long-poll dentro do processo; outros processos são vistos por polling
+        self._finished: dict[str, asyncio.Event] = {}
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.purged = 0
+        self.errors = 0
+
+    def register(self, kind: str, handler: Handler) -> None:
+        self._handlers[kind] = handler
+
+    async def submit(self, kind: str, payload: bytes, params: dict) -> str:
+        if kind not in self._handlers:
+            raise ValueError(f"Tipo de job desconhecido: {kind}")
+        job_id = await asyncio.to_thread(self.store.insert, kind, bytes(payload), params)
+        self.submitted += 1
+        self._wakeup.set()
+        return job_id
+
+    async def get(self, job_id: str, wait: float = 0) -> dict | None:
+        """Estado do job; com `wait`, aguarda a conclusão por até `wait` segundos."""
+        deadline = time.monotonic() + wait
+        while True:
+            job = await asyncio.to_thread(self.store.get, job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job["status"] in (DONE, FAILED):
+                self._finished.pop(job_id, None)
+                return job
+            if remaining <= 0:
+                return job
+            event = self._finished.setdefault(job_id, asyncio.Event())
+            try:
+                await asyncio.wait_for(event.wait(), min(remaining, self.poll_interval))
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        # Um novo lifespan da mesma aplicação reabre o que o anterior fechou;
+        # eventos do asyncio ficam presos ao loop em que foram usados
+        self.store.open()
+        self._wakeup = asyncio.Event()
+        self._finished = {}
+        self._tasks = [
+            asyncio.create_task(self._worker(i), name=f"job-worker-{i}")
+            for i in range(self.workers)
+        ]
+        self._tasks.append(asyncio.create_task(self._janitor(), name="job-janitor"))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.store.close()
+
+    async def _worker(self, number: int) -> None:
+        while True:
+            try:
+                job = await asyncio.to_thread(
+                    self.store.claim, self.lease, self.max_attempts, self.ttl
+                )
+                if job is None:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                await self._run(*job)
+            except Exception as e:
+                # Ex: "database is locked"; o worker não pode morrer com jobs na fila
+                self.errors += 1
+                logger.error(f"Worker de jobs {number} falhou: {e!r}")
+                await asyncio.sleep(self.poll_interval)
+
+    async def _run(self, job_id: str, kind: str, payload: bytes, params: dict, token: str) -> None:
+        try:
+            result = await self._handlers[kind](payload, params)
+        except asyncio.CancelledError:
+            # Desligamento: o job volta para a fila quando o lease vencer
+            raise
+        except Exception as e:
+            logger.error(f"Job {job_id} ({kind}) falhou: {e}")
+            status, result, error = FAILED, None, "Erro ao processar a análise."
+            self.failed += 1
+        else:
+            status, error = DONE, None
+            self.completed += 1
+
+        if not await asyncio.to_thread(
+            self.store.finish, job_id, token, status, result, error, self.ttl
+        ):
+            logger.warning(f"Job {job_id} reivindicado por outro worker; resultado descartado")
+        event = self._finished.pop(job_id, None)
+        if event is not None:
+            event.set()
+
+    async def _janitor(self) -> None:
+        while True:
+            await asyncio.sleep(max(60.0, self.ttl / 10))
+            try:
+                self.purged += await asyncio.to_thread(self.store.purge_expired)
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Limpeza de jobs expirados falhou: {e!r}")
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "by_status": self.store.counts(),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "purged": self.purged,
+            "errors": self.errors,
+        }
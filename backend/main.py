@@ -3,109 +3,352 @@ FitScan API - Backend de Produção
 Personal Trainer e Nutricionista de Bolso com IA
 
 Integra OpenAI Vision API para análise real de imagens.
+A aplicação é montada por `create_app(settings)`; `main:app` cria a padrão
+a partir das variáveis de ambiente.
 Fallback para análise baseada em IMC quando a chave não está configurada.
 """
 
 import asyncio
-import base64
-import json
+import importlib
 import logging
-import os
 import random
 import time
-from collections import defaultdict
+from contextlib import asynccontextmanager
 from typing import Annotated
 
-from dotenv import load_dotenv
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Request
+import orjson
+from fastapi import APIRouter, FastAPI, File, UploadFile, Form, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-
-# Carregar variáveis de ambiente
-load_dotenv()
-
-# Configuração de logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import ValidationError
+
+from cache import ResultCache, VariantCache, make_cache_key, should_bypass
+from catalog import WorkoutEngine
+from foods import FoodTable, MealParser
+from governor import CircuitBreaker, Governor, UpstreamUnavailable
+from httppool import HAS_H2, PooledTransport, build_http_client, warm_up
+from imaging import ImagePipeline
+from jobs import JobQueue
+from metrics import (
+    IN_FLIGHT, REGISTRY, REQUEST_SECONDS, record_fallback, record_usage,
+    request_timings, server_timing, stage,
 )
+from phash import HAS_PIL, NearDuplicateIndex
+from prompts import BODY_PROMPT, MEAL_PROMPT, TEMPLATES, Prompt, WORKOUT_PROMPT
+from ratelimit import TokenBudget, build_rate_limiter, build_token_budget, current_client
+from routing import ModelRouter
+from settings import Settings
+from schemas import (
+    BODY_RESPONSE_FORMAT, MEAL_RESPONSE_FORMAT, WORKOUT_RESPONSE_FORMAT,
+    BodyAnalysis, MealAnalysis, WorkoutPlan, parse_model,
+)
+from singleflight import SingleFlight
+from streaming import ExerciseStreamParser
+from uploads import encode_data_url, read_upload
+
 logger = logging.getLogger("fitscan")
 
-# Configuração
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
-APP_ENV = os.getenv("APP_ENV", "development")
-ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "*").split(",")
-RATE_LIMIT_PER_MINUTE = int(os.getenv("RATE_LIMIT_PER_MINUTE", "30"))
-
-# Verificar se temos a chave da OpenAI
-HAS_OPENAI = bool(OPENAI_API_KEY and not OPENAI_API_KEY.startswith("sk-your"))
-
-if HAS_OPENAI:
-    import openai
-    client = openai.AsyncOpenAI(api_key=OPENAI_API_KEY)
-    logger.info("✅ OpenAI API configurada - modo IA real ativado")
-else:
-    client = None
-    logger.warning("⚠️  OpenAI API key não configurada - usando modo simulação")
-
-app = FastAPI(
-    title="FitScan API",
-    description="Backend do FitScan - Personal Trainer e Nutricionista de Bolso com IA.",
-    version="1.0.0",
-    docs_url="/docs" if APP_ENV == "development" else None,
-    redoc_url="/redoc" if APP_ENV == "development" else None,
-)
+# Folga para os campos de formulário e delimitadores do multipart
+MULTIPART_OVERHEAD = 64 * 1024
+DEFAULT_OPENAI_BASE_URL = "https://api.openai.com/v1"
 
-# ── Rate Limiting ─────────────────────────────
-rate_limit_store: dict[str, list[float]] = defaultdict(list)
+api = APIRouter()
+
+
+class Components:
+    """Configuração e componentes de uma aplicação (`app.state.components`).
+
+    Cada `create_app` monta os seus: duas aplicações no mesmo processo
+    (ex: testes) não compartilham cache, rate limiter nem fila de jobs.
+    """
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.rate_limiter = build_rate_limiter(
+            limit=settings.rate_limit_per_minute,
+            window=60,
+            algorithm=settings.rate_limit_algorithm,
+            backend=settings.rate_limit_backend,
+            sqlite_path=settings.rate_limit_sqlite_path,
+            redis_url=settings.rate_limit_redis_url,
+        )
+        # Tokens da OpenAI por cliente; esgotado o saldo, valem os fallbacks locais
+        self.token_budget: TokenBudget | None = (
+            build_token_budget(
+                limit=settings.token_budget,
+                window=settings.token_budget_window,
+                backend=settings.rate_limit_backend,
+                sqlite_path=settings.rate_limit_sqlite_path,
+                redis_url=settings.rate_limit_redis_url,
+            )
+            if settings.token_budget > 0
+            else None
+        )
+        self.result_cache = ResultCache(
+            max_entries=settings.result_cache_size,
+            ttl=settings.result_cache_ttl,
+            disk_path=settings.result_cache_path,
+            disk_max_entries=settings.result_cache_disk_max_entries,
+        )
+        # Fotos quase idênticas da mesma refeição (distância negativa desativa)
+        self.near_duplicates: NearDuplicateIndex | None = (
+            NearDuplicateIndex(
+                max_distance=settings.near_duplicate_distance,
+                max_entries=settings.near_duplicate_max_entries,
+                ttl=settings.near_duplicate_ttl,
+            )
+            if HAS_PIL and settings.near_duplicate_distance >= 0
+            else None
+        )
+        self.governor = Governor(
+            max_concurrency=settings.upstream_max_concurrency,
+            endpoint_concurrency=settings.upstream_endpoint_concurrency,
+            max_queue=settings.upstream_max_queue,
+            queue_timeout=settings.upstream_queue_timeout,
+            timeout=settings.upstream_timeout,
+            retries=settings.upstream_retries,
+            breaker=CircuitBreaker(settings.breaker_failure_threshold, settings.breaker_cooldown),
+        )
+        self.router = ModelRouter(
+            tiers=settings.model_tiers,
+            routes=settings.model_routes,
+            default_tier=settings.model_default_tier,
+            hedge_tier=settings.hedge_tier,
+            hedge_percentile=settings.hedge_percentile,
+            hedge_delay=settings.hedge_delay,
+        )
+        # Coalescência de chamadas idênticas à IA
+        self.single_flight = SingleFlight()
+        self.job_queue = JobQueue(
+            settings.job_db_path,
+            workers=settings.job_workers,
+            ttl=settings.job_ttl,
+            lease=settings.job_lease,
+            max_attempts=settings.job_max_attempts,
+        )
+        # O cliente que enfileirou o job paga os tokens da análise
+        self.job_queue.register(
+            "body",
+            lambda data, params: as_client(params.pop("client", None), body_analysis(self, data, **params)),
+        )
+        self.job_queue.register(
+            "meal",
+            lambda data, params: as_client(params.pop("client", None), meal_analysis(self, data, **params)),
+        )
+        self.image_pipeline = ImagePipeline(
+            max_side=settings.image_max_side,
+            image_format=settings.image_format,
+            quality=settings.image_quality,
+            workers=settings.image_workers,
+        )
+        self.workout_engine = WorkoutEngine.from_file(settings.workout_catalog_path)
+        # Treinos gerados pela IA por pedido canônico, com variantes (tamanho 0 desativa)
+        self.workout_cache: VariantCache | None = (
+            VariantCache(
+                max_entries=settings.workout_cache_size,
+                ttl=settings.workout_cache_ttl,
+                variants=settings.workout_cache_variants,
+            )
+            if settings.workout_cache_size > 0
+            else None
+        )
+        self.meal_parser = MealParser(FoodTable.from_file(settings.food_db_path))
+
+        # Cliente da OpenAI e pool HTTP: criados sob demanda ou no lifespan
+        self.client = None
+        self.http_client = None
+        self.http_transport: PooledTransport | None = None
+        self.ready = False
+
+    def get_http_client(self):
+        """Cliente HTTP compartilhado das chamadas à OpenAI (criado no primeiro uso)."""
+        if self.http_client is None:
+            settings = self.settings
+            self.http_client, self.http_transport = build_http_client(
+                max_connections=settings.openai_max_connections,
+                max_keepalive_connections=settings.openai_keepalive_connections,
+                keepalive_expiry=settings.openai_keepalive_expiry,
+                http2=settings.openai_http2,
+                timeout=settings.upstream_timeout,
+                connect_timeout=settings.openai_connect_timeout,
+            )
+        return self.http_client
+
+    async def get_client(self):
+        """Cliente da OpenAI; o SDK é importado (em thread) só na primeira chamada.
+
+        O import do SDK custa mais que o resto da aplicação e, no modo
+        simulação, nunca acontece.
+        """
+        if self.client is None:
+            openai = await asyncio.to_thread(importlib.import_module, "openai")
+            if self.client is None:
+                pool = self.get_http_client()
+                # Prazos e novas tentativas ficam a cargo do governor
+                self.client = openai.AsyncOpenAI(
+                    api_key=self.settings.openai_api_key, base_url=self.settings.openai_base_url,
+                    max_retries=0, http_client=pool, timeout=pool.timeout,
+                )
+        return self.client
+
+    def collect_metrics(self):
+        """Métricas dos componentes, lidas na hora da coleta (`/metrics`)."""
+        cache_stats = self.result_cache.stats()
+        flight = self.single_flight.stats()
+        upstream = self.governor.stats()
+        yield "fitscan_cache_hits_total", "counter", "Acertos do cache de resultados.", cache_stats["hits"]
+        yield "fitscan_cache_misses_total", "counter", "Faltas do cache de resultados.", cache_stats["misses"]
+        yield "fitscan_cache_evictions_total", "counter", "Despejos do cache de resultados.", cache_stats["evictions"]
+        yield "fitscan_coalesced_calls_total", "counter", "Chamadas coalescidas (single-flight).", flight["coalesced"]
+        yield "fitscan_upstream_in_flight", "gauge", "Chamadas à OpenAI em andamento.", upstream["global"]["in_flight"]
+        yield "fitscan_upstream_queue_depth", "gauge", "Chamadas aguardando vaga.", upstream["global"]["queue_depth"]
+        yield (
+            "fitscan_upstream_breaker_open", "gauge", "Circuit breaker aberto (1) ou não (0).",
+            int(upstream["breaker"]["state"] == "open"),
+        )
+        yield "fitscan_hedged_requests_total", "counter", "Chamadas de hedge disparadas.", self.router.hedges
+        yield (
+            "fitscan_hedge_wins_total", "counter", "Chamadas de hedge que venceram a principal.",
+            self.router.hedge_wins,
+        )
+        yield (
+            "fitscan_workout_rules_served_total", "counter", "Treinos servidos pelo motor de regras.",
+            self.workout_engine.served,
+        )
+        if self.workout_cache is not None:
+            yield (
+                "fitscan_workout_cache_hits_total", "counter",
+                "Treinos gerados servidos do cache (chamadas à OpenAI evitadas).", self.workout_cache.hits,
+            )
+        yield (
+            "fitscan_meal_text_requests_total", "counter", "Refeições descritas em texto.",
+            self.meal_parser.requests,
+        )
+        if self.http_transport is not None:
+            pool = self.http_transport.stats()
+            yield "fitscan_openai_pool_open_connections", "gauge", "Conexões abertas com a OpenAI.", pool["open_connections"]
+            yield "fitscan_openai_pool_saturated_total", "counter", "Requisições que esperaram vaga no pool.", pool["saturated"]
+            yield "fitscan_openai_new_connections_total", "counter", "Conexões novas abertas com a OpenAI.", pool["new_connections"]
+            yield "fitscan_openai_http_requests_total", "counter", "Requisições HTTP enviadas à OpenAI.", pool["requests"]
+
+
+def components_of(request: Request) -> Components:
+    return request.app.state.components
+
+
+@asynccontextmanager
+async def lifespan(application: FastAPI):
+    """Aquece as conexões com a OpenAI e sobe os workers da fila de jobs.
+
+    O uvicorn só aceita requisições depois que o aquecimento termina.
+    """
+    components: Components = application.state.components
+    settings = components.settings
+    if settings.has_openai and settings.openai_warm_connections > 0:
+        # Só httpx: o SDK da OpenAI continua sem ser importado
+        warmed = await warm_up(
+            components.get_http_client(), settings.openai_base_url or DEFAULT_OPENAI_BASE_URL,
+            settings.openai_warm_connections, http2=settings.openai_http2 and HAS_H2,
+        )
+        logger.info(f"🔌 {warmed} conexão(ões) com a OpenAI aquecida(s)")
+    components.job_queue.start()
+    components.ready = True
+    try:
+        yield
+    finally:
+        components.ready = False
+        await components.job_queue.stop()
+        if components.http_client is not None:
+            await components.http_client.aclose()
+        components.client = components.http_client = None
+        components.image_pipeline.shutdown()
 
 
-async def check_rate_limit(request: Request):
+# ── Rate Limiting ─────────────────────────────
+async def check_rate_limit(request: Request, cost: int = 1):
     """Verifica rate limiting por IP."""
     client_ip = request.client.host if request.client else "unknown"
-    now = time.time()
-    window = 60  # 1 minuto
+    # O mesmo cliente responde pelo orçamento de tokens das chamadas à IA
+    current_client.set(client_ip)
+    decision = await components_of(request).rate_limiter.hit(client_ip, cost)
+    # Os headers RateLimit-* são adicionados à resposta pelo middleware
+    request.state.rate_limit = decision
 
-    # Limpar entradas antigas
-    rate_limit_store[client_ip] = [
-        t for t in rate_limit_store[client_ip] if now - t < window
-    ]
-
-    if len(rate_limit_store[client_ip]) >= RATE_LIMIT_PER_MINUTE:
+    if not decision.allowed:
         raise HTTPException(
             status_code=429,
             detail="Muitas requisições. Tente novamente em 1 minuto.",
+            headers=decision.headers(),
         )
 
-    rate_limit_store[client_ip].append(now)
 
-
-# ── CORS ──────────────────────────────────────
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=ALLOWED_ORIGINS,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# ── Limite de tamanho do upload ───────────────
+async def limit_upload_size(request: Request, call_next):
+    """Rejeita com 413 pelo Content-Length, antes de ler o corpo."""
+    content_length = request.headers.get("content-length")
+    settings = components_of(request).settings
+    max_images = settings.max_batch_images if request.url.path == "/analyze-meals/" else 1
+    if (
+        content_length
+        and content_length.isdigit()
+        and int(content_length) > max_images * settings.max_upload_bytes + MULTIPART_OVERHEAD
+    ):
+        return JSONResponse(
+            status_code=413,
+            content={"detail": f"Imagem muito grande. Limite de {settings.max_upload_mb} MB."},
+        )
+    return await call_next(request)
 
 
 # ── Middleware de segurança ───────────────────
-@app.middleware("http")
 async def security_headers(request: Request, call_next):
     response = await call_next(request)
     response.headers["X-Content-Type-Options"] = "nosniff"
     response.headers["X-Frame-Options"] = "DENY"
     response.headers["X-XSS-Protection"] = "1; mode=block"
-    if APP_ENV == "production":
+    rate_limit = getattr(request.state, "rate_limit", None)
+    if rate_limit is not None:
+        response.headers.update(rate_limit.headers())
+    if components_of(request).settings.app_env == "production":
         response.headers["Strict-Transport-Security"] = (
             "max-age=31536000; includeSubDomains"
         )
     return response
 
 
+# ── Métricas e Server-Timing ──────────────────
+def static_paths(application: FastAPI) -> set[str]:
+    paths = getattr(application.state, "static_paths", None)
+    if paths is None:
+        paths = application.state.static_paths = {
+            r.path for r in application.routes if "{" not in r.path
+        }
+    return paths
+
+
+async def request_metrics(request: Request, call_next):
+    timings = []
+    request_timings.set(timings)
+    # Rotas com parâmetros (ex: /jobs/{job_id}) caem em "other", limitando a cardinalidade
+    path = request.url.path if request.url.path in static_paths(request.app) else "other"
+    IN_FLIGHT.inc(path)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        elapsed = time.perf_counter() - start
+        IN_FLIGHT.dec(path)
+        route = request.scope.get("route")
+        REQUEST_SECONDS.observe(
+            elapsed, getattr(route, "path", "unmatched"), request.method, status
+        )
+    response.headers["Server-Timing"] = server_timing(timings, elapsed)
+    return response
+
+
 # ── Exception handler global ─────────────────
-@app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     logger.error(f"Erro não tratado: {exc}", exc_info=True)
     return JSONResponse(
@@ -119,181 +362,311 @@ async def global_exception_handler(request: Request, exc: Exception):
 # ════════════════════════════════════════════════
 
 
-async def analyze_body_with_ai(
-    image_data: bytes, age: int, height: int, weight: int
-) -> dict:
-    """Análise corporal real usando OpenAI Vision API."""
-    base64_image = base64.b64encode(image_data).decode("utf-8")
-    bmi = round(weight / ((height / 100) ** 2), 1)
+async def reserve_tokens(token_budget: TokenBudget | None, endpoint: str, prompt: Prompt) -> bool:
+    """Desconta a estimativa do orçamento de tokens do cliente atual."""
+    client_key = current_client.get()
+    if token_budget is None or client_key is None:
+        return True
+    if await token_budget.reserve(client_key, prompt.budget_tokens):
+        return True
+    logger.warning(f"Orçamento de tokens esgotado para {client_key} ({endpoint}) - usando fallback")
+    return False
+
+
+async def settle_tokens(token_budget: TokenBudget | None, prompt: Prompt, used: int) -> None:
+    """Acerta o orçamento com o uso real (sem resposta, devolve a reserva)."""
+    client_key = current_client.get()
+    if token_budget is not None and client_key is not None:
+        await token_budget.settle(client_key, prompt.budget_tokens, used)
+
+
+def account_usage(endpoint: str, prompt: Prompt, usage) -> int:
+    """Registra o `usage` da resposta nas métricas e no template; devolve o total."""
+    record_usage(endpoint, usage)
+    return prompt.template.observe(prompt, usage)
 
-    prompt = f"""Você é um personal trainer e nutricionista profissional analisando a foto corporal de um cliente.
 
-Dados do cliente:
-- Idade: {age} anos
-- Altura: {height} cm
-- Peso: {weight} kg
-- IMC calculado: {bmi}
+async def as_client(client_key: str | None, analysis):
+    """Executa `analysis` cobrando o orçamento de `client_key` (jobs assíncronos)."""
+    token = current_client.set(client_key)
+    try:
+        return await analysis
+    finally:
+        current_client.reset(token)
 
-Analise a foto e retorne EXATAMENTE um JSON com esta estrutura (sem markdown, sem ```):
-{{
-  "estimated_fat_percentage": <número entre 8 e 45>,
-  "estimated_biotype": "<Ectomorfo, Mesomorfo ou Endomorfo>",
-  "suggested_goal": "<meta principal sugerida em português>",
-  "feedback": "<feedback detalhado e motivacional em português, 2-3 frases>"
-}}
 
-Seja preciso na estimativa do percentual de gordura baseado na imagem.
-O feedback deve ser profissional, motivacional e em português brasileiro."""
+async def analyze_body_with_ai(
+    components: Components, image_data: bytes, age: int, height: int, weight: int,
+    cache_key: str | None = None, mime_type: str = "image/jpeg",
+) -> dict:
+    """Análise corporal real usando OpenAI Vision API."""
+    with stage("body", "encode"):
+        image_url = encode_data_url(image_data, mime_type)
+    bmi = round(weight / ((height / 100) ** 2), 1)
+    prompt = BODY_PROMPT.render(image_url, age=age, height=height, weight=weight, bmi=bmi)
+
+    if not await reserve_tokens(components.token_budget, "body", prompt):
+        return await budget_fallback("body", simulate_body_analysis(age, height, weight, delay=0))
+    used = 0
+
+    async def request_analysis(model: str) -> dict:
+        nonlocal used
+        openai_client = await components.get_client()
+        response = await components.governor.call(
+            "body",
+            lambda: openai_client.chat.completions.create(
+                model=model,
+                messages=prompt.messages,
+                max_tokens=prompt.max_tokens,
+                temperature=0.3,
+                response_format=BODY_RESPONSE_FORMAT,
+            ),
+        )
+        used += account_usage("body", prompt, response.usage)
+        with stage("body", "parse"):
+            return parse_model(BodyAnalysis, response.choices[0].message.content)
 
     try:
-        response = await client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": prompt},
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/jpeg;base64,{base64_image}",
-                                "detail": "low",
-                            },
-                        },
-                    ],
-                }
-            ],
-            max_tokens=500,
-            temperature=0.3,
-        )
-
-        result_text = response.choices[0].message.content.strip()
-        # Limpar possível markdown
-        if result_text.startswith("```"):
-            result_text = result_text.split("\n", 1)[1]
-            result_text = result_text.rsplit("```", 1)[0]
-
-        return json.loads(result_text)
-
-    except json.JSONDecodeError as e:
+        with stage("body", "upstream"):
+            result = await components.router.run("body", request_analysis)
+        if cache_key:
+            await components.result_cache.set(cache_key, result)
+        return result
+
+    except ValidationError as e:
         logger.error(f"Erro ao parsear resposta da IA: {e}")
         # Fallback para análise baseada em IMC
-        return await simulate_body_analysis(age, height, weight)
+        return await fallback(
+            "body", "parse_error", simulate_body_analysis(age, height, weight, delay=0)
+        )
+    except UpstreamUnavailable as e:
+        logger.warning(f"OpenAI indisponível ({e}) - usando fallback")
+        return await fallback(
+            "body", "upstream_unavailable", simulate_body_analysis(age, height, weight, delay=0)
+        )
     except Exception as e:
         logger.error(f"Erro na OpenAI API: {e}")
-        return await simulate_body_analysis(age, height, weight)
+        return await fallback(
+            "body", "upstream_error", simulate_body_analysis(age, height, weight, delay=0)
+        )
+    finally:
+        await settle_tokens(components.token_budget, prompt, used)
 
 
-async def analyze_meal_with_ai(image_data: bytes) -> dict:
+async def analyze_meal_with_ai(
+    components: Components, image_data: bytes, cache_key: str | None = None,
+    image_hash: int | None = None, mime_type: str = "image/jpeg", profile: str = "",
+) -> dict:
     """Análise nutricional real usando OpenAI Vision API."""
-    base64_image = base64.b64encode(image_data).decode("utf-8")
-
-    prompt = """Você é um nutricionista profissional analisando a foto de uma refeição.
-
-Analise a refeição na imagem e retorne EXATAMENTE um JSON com esta estrutura (sem markdown, sem ```):
-{
-  "total_calories": <número estimado de calorias>,
-  "macros": {
-    "protein": <gramas de proteína>,
-    "carbs": <gramas de carboidratos>,
-    "fat": <gramas de gordura>
-  },
-  "feedback": "<feedback nutricional detalhado em português, 2-3 frases com dicas>",
-  "meal_type": "<tipo da refeição - ex: Almoço - Frango Grelhado com Arroz>"
-}
-
-Seja preciso nas estimativas baseado no que vê na imagem.
-O feedback deve incluir sugestões práticas em português brasileiro."""
+    with stage("meal", "encode"):
+        image_url = encode_data_url(image_data, mime_type)
+    prompt = MEAL_PROMPT.render(image_url)
+
+    if not await reserve_tokens(components.token_budget, "meal", prompt):
+        return await budget_fallback("meal", simulate_meal_analysis(delay=0))
+    used = 0
+
+    async def request_analysis(model: str) -> dict:
+        nonlocal used
+        openai_client = await components.get_client()
+        response = await components.governor.call(
+            "meal",
+            lambda: openai_client.chat.completions.create(
+                model=model,
+                messages=prompt.messages,
+                max_tokens=prompt.max_tokens,
+                temperature=0.3,
+                response_format=MEAL_RESPONSE_FORMAT,
+            ),
+        )
+        used += account_usage("meal", prompt, response.usage)
+        with stage("meal", "parse"):
+            return parse_model(MealAnalysis, response.choices[0].message.content)
 
     try:
-        response = await client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": prompt},
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/jpeg;base64,{base64_image}",
-                                "detail": "low",
-                            },
-                        },
-                    ],
-                }
-            ],
-            max_tokens=500,
-            temperature=0.3,
-        )
-
-        result_text = response.choices[0].message.content.strip()
-        if result_text.startswith("```"):
-            result_text = result_text.split("\n", 1)[1]
-            result_text = result_text.rsplit("```", 1)[0]
-
-        return json.loads(result_text)
-
-    except json.JSONDecodeError as e:
+        with stage("meal", "upstream"):
+            result = await components.router.run("meal", request_analysis, profile=profile)
+        if cache_key:
+            await components.result_cache.set(cache_key, result)
+        if image_hash is not None and components.near_duplicates is not None:
+            components.near_duplicates.add(image_hash, result)
+        return result
+
+    except ValidationError as e:
         logger.error(f"Erro ao parsear resposta da IA (meal): {e}")
-        return await simulate_meal_analysis()
+        return await fallback("meal", "parse_error", simulate_meal_analysis(delay=0))
+    except UpstreamUnavailable as e:
+        logger.warning(f"OpenAI indisponível ({e}) - usando fallback (meal)")
+        return await fallback("meal", "upstream_unavailable", simulate_meal_analysis(delay=0))
     except Exception as e:
         logger.error(f"Erro na OpenAI API (meal): {e}")
-        return await simulate_meal_analysis()
+        return await fallback("meal", "upstream_error", simulate_meal_analysis(delay=0))
+    finally:
+        await settle_tokens(components.token_budget, prompt, used)
 
 
-async def generate_workout_with_ai(
+def build_workout_prompt(
     training_location: str, limitations: str, user_context: str = ""
+) -> Prompt:
+    """Prompt de geração de treino (compartilhado com o modo streaming)."""
+    return WORKOUT_PROMPT.render(
+        location=training_location,
+        limitations=limitations or "Nenhuma informada",
+        context=f"\n- Contexto adicional: {user_context}" if user_context else "",
+    )
+
+
+async def generate_workout_with_ai(
+    components: Components, training_location: str, limitations: str, user_context: str = "",
+    cache_key: tuple | None = None,
 ) -> dict:
     """Geração de treino real usando OpenAI."""
+    prompt = build_workout_prompt(training_location, limitations, user_context)
 
-    prompt = f"""Você é um personal trainer profissional criando um treino personalizado.
-
-Informações do cliente:
-- Local de treino: {training_location}
-- Limitações/lesões: {limitations or 'Nenhuma informada'}
-{f'- Contexto adicional: {user_context}' if user_context else ''}
-
-Crie um plano de treino e retorne EXATAMENTE um JSON com esta estrutura (sem markdown, sem ```):
-{{
-  "title": "<nome do treino - ex: Treino A - Superiores>",
-  "focus": "<foco principal - ex: Força e Hipertrofia>",
-  "exercises": [
-    {{
-      "name": "<nome do exercício>",
-      "sets": <número de séries>,
-      "reps": "<repetições - ex: 8-12>",
-      "tips": "<dica de execução em português>"
-    }}
-  ],
-  "feedback": "<observações gerais sobre o treino, 2-3 frases em português>"
-}}
-
-Inclua 4-6 exercícios. Adapte ao local e respeite as limitações.
-Se treina em casa, use exercícios com peso corporal.
-As dicas devem ser práticas e em português brasileiro."""
+    if not await reserve_tokens(components.token_budget, "workout", prompt):
+        return await budget_fallback(
+            "workout",
+            simulate_workout_generation(
+                components.workout_engine, training_location, limitations, delay=0
+            ),
+        )
+    used = 0
+
+    async def request_plan(model: str) -> dict:
+        nonlocal used
+        openai_client = await components.get_client()
+        response = await components.governor.call(
+            "workout",
+            lambda: openai_client.chat.completions.create(
+                model=model,
+                messages=prompt.messages,
+                max_tokens=prompt.max_tokens,
+                temperature=0.5,
+                response_format=WORKOUT_RESPONSE_FORMAT,
+            ),
+        )
+        used += account_usage("workout", prompt, response.usage)
+        with stage("workout", "parse"):
+            return parse_model(WorkoutPlan, response.choices[0].message.content)
 
     try:
-        response = await client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=800,
-            temperature=0.5,
+        with stage("workout", "upstream"):
+            result = await components.router.run("workout", request_plan)
+        if cache_key is not None and components.workout_cache is not None:
+            components.workout_cache.add(cache_key, result)
+        return result
+
+    except ValidationError as e:
+        logger.error(f"Erro ao parsear resposta da IA (workout): {e}")
+        return await fallback(
+            "workout", "parse_error",
+            simulate_workout_generation(
+                components.workout_engine, training_location, limitations, delay=0
+            ),
+        )
+    except UpstreamUnavailable as e:
+        logger.warning(f"OpenAI indisponível ({e}) - usando fallback (workout)")
+        return await fallback(
+            "workout", "upstream_unavailable",
+            simulate_workout_generation(
+                components.workout_engine, training_location, limitations, delay=0
+            ),
+        )
+    except Exception as e:
+        logger.error(f"Erro na OpenAI API (workout): {e}")
+        return await fallback(
+            "workout", "upstream_error",
+            simulate_workout_generation(
+                components.workout_engine, training_location, limitations, delay=0
+            ),
         )
+    finally:
+        await settle_tokens(components.token_budget, prompt, used)
 
-        result_text = response.choices[0].message.content.strip()
-        if result_text.startswith("```"):
-            result_text = result_text.split("\n", 1)[1]
-            result_text = result_text.rsplit("```", 1)[0]
 
-        return json.loads(result_text)
+async def stream_workout_with_ai(
+    components: Components, training_location: str, limitations: str, user_context: str = "",
+    cache_key: tuple | None = None,
+):
+    """Geração de treino em streaming: emite cada exercício assim que fecha no JSON.
 
-    except json.JSONDecodeError as e:
-        logger.error(f"Erro ao parsear resposta da IA (workout): {e}")
-        return await simulate_workout_generation(training_location, limitations)
+    Produz tuplas ("exercise", dict) e, por último, ("plan", dict) com o
+    plano completo validado (ou o plano de fallback, em caso de erro).
+    """
+    prompt = build_workout_prompt(training_location, limitations, user_context)
+    parser = ExerciseStreamParser()
+
+    if not await reserve_tokens(components.token_budget, "workout", prompt):
+        yield "plan", await stream_fallback(components, "token_budget", training_location, limitations)
+        return
+    used = 0
+
+    try:
+        openai_client = await components.get_client()
+        async with components.governor.slot("workout"):
+            # Sem hedge: o primeiro exercício já sai antes da resposta completa
+            stream = await asyncio.wait_for(
+                openai_client.chat.completions.create(
+                    model=components.router.model_for("workout", "stream"),
+                    messages=prompt.messages,
+                    max_tokens=prompt.max_tokens,
+                    temperature=0.5,
+                    response_format=WORKOUT_RESPONSE_FORMAT,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                ),
+                components.governor.timeout,
+            )
+            async for chunk in stream:
+                if getattr(chunk, "usage", None):
+                    used += account_usage("workout", prompt, chunk.usage)
+                if not chunk.choices:
+                    continue
+                for exercise in parser.feed(chunk.choices[0].delta.content or ""):
+                    yield "exercise", exercise
+
+        plan = parse_model(WorkoutPlan, parser.text)
+        if cache_key is not None and components.workout_cache is not None:
+            components.workout_cache.add(cache_key, plan)
+        yield "plan", plan
+
+    # Mesmas causas do caminho sem streaming (`generate_workout_with_ai`)
+    except ValidationError as e:
+        logger.error(f"Erro ao parsear resposta da IA (workout, streaming): {e}")
+        yield "plan", await stream_fallback(components, "parse_error", training_location, limitations)
+    except UpstreamUnavailable as e:
+        logger.warning(f"OpenAI indisponível ({e}) - usando fallback (workout, streaming)")
+        yield "plan", await stream_fallback(components, "upstream_unavailable", training_location, limitations)
     except Exception as e:
-        logger.error(f"Erro na OpenAI API (workout): {e}")
-        return await simulate_workout_generation(training_location, limitations)
+        if isinstance(e, asyncio.TimeoutError):
+            components.governor.timeouts += 1
+        logger.error(f"Erro no streaming da OpenAI API (workout): {e!r}")
+        yield "plan", await stream_fallback(components, "upstream_error", training_location, limitations)
+    finally:
+        await settle_tokens(components.token_budget, prompt, used)
+
+
+async def stream_fallback(
+    components: Components, cause: str, training_location: str, limitations: str
+) -> dict:
+    """Plano de fallback do streaming, marcado para o cliente saber que não veio da IA."""
+    plan = await fallback(
+        "workout", cause,
+        simulate_workout_generation(components.workout_engine, training_location, limitations, delay=0),
+    )
+    return {**plan, "fallback": True}
+
+
+async def fallback(endpoint: str, cause: str, simulation) -> dict:
+    """Serve a resposta simulada, registrando a causa e o tempo do fallback."""
+    record_fallback(endpoint, cause)
+    with stage(endpoint, "fallback"):
+        return await simulation
+
+
+async def budget_fallback(endpoint: str, simulation) -> dict:
+    """Fallback por orçamento esgotado, marcado: o cliente não confunde com a análise da foto."""
+    return {**await fallback(endpoint, "token_budget", simulation), "fallback": True}
 
 
 # ════════════════════════════════════════════════
@@ -301,9 +674,14 @@ As dicas devem ser práticas e em português brasileiro."""
 # ════════════════════════════════════════════════
 
 
-async def simulate_body_analysis(age: int, height: int, weight: int) -> dict:
-    """Análise corporal simulada baseada em IMC."""
-    await asyncio.sleep(1.5)
+async def simulate_body_analysis(
+    age: int, height: int, weight: int, delay: float = 1.5
+) -> dict:
+    """Análise corporal simulada baseada em IMC.
+
+    `delay` imita a latência da IA no modo simulação; os fallbacks usam 0.
+    """
+    await asyncio.sleep(delay)
     bmi = round(weight / ((height / 100) ** 2), 1)
 
     if bmi < 18.5:
@@ -352,9 +730,9 @@ async def simulate_body_analysis(age: int, height: int, weight: int) -> dict:
         }
 
 
-async def simulate_meal_analysis() -> dict:
+async def simulate_meal_analysis(delay: float = 1.5) -> dict:
     """Análise nutricional simulada."""
-    await asyncio.sleep(1.5)
+    await asyncio.sleep(delay)
     options = [
         {
             "total_calories": 750,
@@ -382,58 +760,11 @@ async def simulate_meal_analysis() -> dict:
 
 
 async def simulate_workout_generation(
-    training_location: str, limitations: str
+    engine: WorkoutEngine, training_location: str, limitations: str, delay: float = 1.5
 ) -> dict:
-    """Geração de treino simulada."""
-    await asyncio.sleep(1.5)
-
-    is_home = "casa" in training_location.lower()
-    has_knee = "joelho" in (limitations or "").lower()
-    has_back = any(w in (limitations or "").lower() for w in ["lombar", "costas"])
-
-    if is_home:
-        exercises = [
-            {"name": "Agachamento Sumô", "sets": 3, "reps": "15-20",
-             "tips": "Pés afastados, pontas para fora."},
-            {"name": "Afundo", "sets": 3, "reps": "10-12 por perna",
-             "tips": "Tronco reto, joelho de trás quase no chão."},
-            {"name": "Elevação de Quadril", "sets": 3, "reps": "15-20",
-             "tips": "Contraia o glúteo na subida."},
-            {"name": "Flexão de Braço", "sets": 3, "reps": "10-15",
-             "tips": "Corpo alinhado, desça até o peito quase tocar o chão."},
-            {"name": "Prancha", "sets": 3, "reps": "30-60s",
-             "tips": "Corpo alinhado, sem deixar o quadril cair."},
-        ]
-    else:
-        exercises = [
-            {"name": "Agachamento Livre" if not has_knee else "Leg Press 45°",
-             "sets": 3, "reps": "8-12",
-             "tips": "Core ativado, coluna reta." if not has_knee else "Costas apoiadas, cuidado com os joelhos."},
-            {"name": "Leg Press" if not has_back else "Cadeira Extensora",
-             "sets": 3, "reps": "10-15",
-             "tips": "Não trave os joelhos." if not has_back else "Movimento controlado."},
-            {"name": "Cadeira Extensora", "sets": 3, "reps": "12-15",
-             "tips": "Controle o movimento, sem balançar."},
-            {"name": "Stiff", "sets": 3, "reps": "10-12",
-             "tips": "Joelhos levemente flexionados."},
-            {"name": "Prancha", "sets": 3, "reps": "30-60s",
-             "tips": "Corpo alinhado, sem deixar o quadril cair."},
-        ]
-
-    feedback = "Treino focado em fortalecer a parte inferior e core. "
-    if has_knee:
-        feedback += "Exercícios adaptados para proteger seus joelhos. "
-    if has_back:
-        feedback += "Exercícios adaptados para proteger sua lombar. "
-    if is_home:
-        feedback += "Adaptado para casa, usando peso corporal."
-
-    return {
-        "title": "Treino A - Inferiores e Core",
-        "focus": "Força e Estabilidade",
-        "exercises": exercises,
-        "feedback": feedback.strip(),
-    }
+    """Geração de treino simulada, montada pelo motor de regras do catálogo."""
+    await asyncio.sleep(delay)
+    return engine.build(training_location, limitations)
 
 
 # ════════════════════════════════════════════════
@@ -441,27 +772,127 @@ async def simulate_workout_generation(
 # ════════════════════════════════════════════════
 
 
-@app.get("/")
-def read_root():
+async def cached_analysis(
+    components: Components, cache_control: str | None, key: str, image_data: bytes, analyze,
+    near_duplicates_check: bool = False,
+) -> dict:
+    """Consulta o cache antes de chamar a IA; `Cache-Control: no-cache` ignora o cache.
+
+    Em caso de miss, a imagem é pré-processada e entregue a `analyze`
+    junto com a chave de cache. Com `near_duplicates_check`, também
+    procura fotos quase idênticas (hash perceptual) já analisadas.
+    """
+    result_cache, near_duplicates = components.result_cache, components.near_duplicates
+    skip_read, skip_write = should_bypass(cache_control)
+    if skip_read:
+        result_cache.bypasses += 1
+    else:
+        cached = await result_cache.get(key)
+        if cached is not None:
+            logger.info(f"Cache hit: {key[:20]}")
+            return cached
+
+    endpoint = key.split(":", 1)[0]
+
+    async def analyze_miss() -> dict:
+        with stage(endpoint, "preprocess"):
+            prepared = await components.image_pipeline.prepare(image_data)
+
+        if near_duplicates_check and not skip_read and near_duplicates is not None:
+            match = near_duplicates.lookup(prepared.dhash) if prepared.dhash is not None else None
+            if match is not None:
+                logger.info(f"Foto quase duplicada: {key[:20]}")
+                if not skip_write:
+                    await result_cache.set(key, match)
+                return match
+
+        return await analyze(prepared, None if skip_write else key)
+
+    # Uploads idênticos simultâneos (ex: reenvio do app) compartilham a chamada
+    return await components.single_flight.do(key, analyze_miss)
+
+
+def workout_key(components: Components, training_location: str, limitations: str) -> tuple:
+    """Chave canônica do pedido de treino (coalescência e cache de planos gerados).
+
+    "Em casa" / "casa" e "dor no joelho esquerdo" / "Joelho" coincidem:
+    local e limitações viram tags do catálogo, ordenadas.
+    """
+    return ("workout", *components.workout_engine.canonical_key(training_location, limitations))
+
+
+def cached_workout(components: Components, key: tuple) -> dict | None:
+    if components.workout_cache is None:
+        return None
+    with stage("workout", "cache"):
+        return components.workout_cache.get(key)
+
+
+def wants_async(request: Request) -> bool:
+    """Modo assíncrono opcional: `Prefer: respond-async` ou `?mode=async`."""
+    return (
+        request.query_params.get("mode") == "async"
+        or "respond-async" in request.headers.get("prefer", "")
+    )
+
+
+async def submit_job(request: Request, kind: str, image_data: bytes, params: dict) -> ORJSONResponse:
+    """Enfileira a análise e responde 202 com o id do job."""
+    job_queue = components_of(request).job_queue
+    job_id = await job_queue.submit(kind, image_data, {**params, "client": current_client.get()})
+    logger.info(f"Job enfileirado: {job_id} ({kind})")
+    return ORJSONResponse(
+        status_code=202,
+        content={"job_id": job_id, "status": "queued", "status_url": f"/jobs/{job_id}"},
+        headers={"Location": f"/jobs/{job_id}"},
+    )
+
+
+@api.get("/")
+def read_root(request: Request):
     """Endpoint raiz - verificar se a API está online."""
     return {
         "message": "FitScan API",
         "version": "1.0.0",
-        "ai_mode": "openai" if HAS_OPENAI else "simulation",
+        "ai_mode": "openai" if components_of(request).settings.has_openai else "simulation",
     }
 
 
-@app.get("/health")
-def health_check():
+@api.get("/health")
+def health_check(request: Request):
     """Health check para monitoramento."""
+    components = components_of(request)
     return {
-        "status": "ok",
-        "ai_available": HAS_OPENAI,
-        "environment": APP_ENV,
+        "status": "ok" if components.ready else "starting",
+        "ai_available": components.settings.has_openai,
+        "environment": components.settings.app_env,
+        "cache": components.result_cache.stats(),
+        "near_duplicates": components.near_duplicates.stats() if components.near_duplicates else None,
+        "image_pipeline": components.image_pipeline.stats(),
+        "rate_limit": components.rate_limiter.stats(),
+        "single_flight": components.single_flight.stats(),
+        "upstream": components.governor.stats(),
+        "routing": components.router.stats(),
+        "http_pool": components.http_transport.stats() if components.http_transport else None,
+        "jobs": components.job_queue.stats(),
+        "workout_rules": components.workout_engine.stats(),
+        "workout_cache": components.workout_cache.stats() if components.workout_cache else None,
+        "food_db": components.meal_parser.stats(),
+        "prompts": {template.name: template.stats() for template in TEMPLATES},
+        "token_budget": components.token_budget.stats() if components.token_budget else None,
     }
 
 
-@app.post("/analyze-body/")
+@api.get("/metrics")
+def metrics(request: Request):
+    """Métricas no formato texto do Prometheus."""
+    return PlainTextResponse(
+        REGISTRY.render(components_of(request).collect_metrics),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+@api.post("/analyze-body/")
 async def analyze_body(
     request: Request,
     age: Annotated[int, Form()],
@@ -484,17 +915,42 @@ async def analyze_body(
 
     logger.info(f"Análise corporal: Idade={age}, Altura={height}cm, Peso={weight}kg")
 
-    if HAS_OPENAI:
-        image_data = await image.read()
-        result = await analyze_body_with_ai(image_data, age, height, weight)
-    else:
-        result = await simulate_body_analysis(age, height, weight)
+    components = components_of(request)
+    with stage("body", "upload"):
+        image_data = await read_upload(image, components.settings.max_upload_bytes)
+    cache_control = request.headers.get("cache-control")
+    if wants_async(request):
+        return await submit_job(request, "body", image_data, {
+            "age": age, "height": height, "weight": weight, "cache_control": cache_control,
+        })
+
+    result = await body_analysis(components, image_data, age, height, weight, cache_control)
 
     logger.info(f"Análise concluída: {result.get('estimated_biotype', 'N/A')}")
     return result
 
 
-@app.post("/analyze-meal/")
+async def body_analysis(
+    components: Components, image_data: bytes, age: int, height: int, weight: int,
+    cache_control: str | None = None,
+) -> dict:
+    """Análise corporal a partir da imagem já lida (endpoint e jobs assíncronos)."""
+    if not components.settings.has_openai:
+        return await fallback("body", "simulation", simulate_body_analysis(age, height, weight))
+
+    return await cached_analysis(
+        components,
+        cache_control,
+        make_cache_key("body", image_data, age=age, height=height, weight=weight),
+        image_data,
+        lambda prepared, key: analyze_body_with_ai(
+            components, prepared.data, age, height, weight,
+            cache_key=key, mime_type=prepared.mime_type,
+        ),
+    )
+
+
+@api.post("/analyze-meal/")
 async def analyze_meal(
     request: Request,
     image: UploadFile = File(...),
@@ -507,17 +963,210 @@ async def analyze_meal(
 
     logger.info(f"Análise de refeição: {image.filename}")
 
-    if HAS_OPENAI:
-        image_data = await image.read()
-        result = await analyze_meal_with_ai(image_data)
-    else:
-        result = await simulate_meal_analysis()
+    if wants_async(request):
+        with stage("meal", "upload"):
+            image_data = await read_upload(image, components_of(request).settings.max_upload_bytes)
+        return await submit_job(
+            request, "meal", image_data, {"cache_control": request.headers.get("cache-control")}
+        )
+
+    result = await analyze_meal_image(request, image)
 
     logger.info(f"Análise concluída: {result.get('total_calories', 'N/A')} kcal")
     return result
 
 
-@app.post("/generate-workout/")
+@api.post("/analyze-meal-text/")
+async def analyze_meal_text(
+    request: Request,
+    description: Annotated[str, Form()],
+):
+    """Refeição descrita em texto ("arroz, feijão e frango 150g"), pela tabela local.
+
+    Sem IA e sem custo: cada item é buscado na tabela de alimentos e a
+    resposta tem o mesmo formato de `/analyze-meal/`, mais os itens.
+    """
+    await check_rate_limit(request)
+
+    components = components_of(request)
+    max_chars = components.settings.max_meal_text_chars
+    if not description.strip():
+        raise HTTPException(status_code=422, detail="Descreva a refeição.")
+    if len(description) > max_chars:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Descrição deve ter no máximo {max_chars} caracteres.",
+        )
+
+    with stage("meal_text", "lookup"):
+        result = components.meal_parser.parse(description)
+    if not result["items"]:
+        raise HTTPException(
+            status_code=422,
+            detail="Nenhum alimento reconhecido. Ex: \"arroz, feijão e 150g de frango\".",
+        )
+
+    logger.info(f"Refeição em texto: {len(result['items'])} itens, {result['total_calories']} kcal")
+    return result
+
+
+def score_roster(data: bytes, as_csv: bool, max_rows: int):
+    """Lê e estima o lote inteiro de uma vez; devolve o iterador da resposta.
+
+    Roda no pool de threads. O NumPy (~100 ms de importação) só é
+    carregado no primeiro lote, fora da partida a frio.
+    """
+    bodycomp = importlib.import_module("bodycomp")
+    try:
+        with stage("body_batch", "estimate"):
+            result = bodycomp.estimate(bodycomp.parse_columns(data, max_rows))
+    except bodycomp.BatchError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    logger.info(f"Composição corporal em lote: {len(result['id'])} linhas")
+    return bodycomp.iter_csv(result) if as_csv else bodycomp.iter_ndjson(result)
+
+
+@api.post("/analyze-body/batch")
+async def analyze_body_batch(
+    request: Request,
+    file: UploadFile = File(...),
+):
+    """Composição corporal de uma lista de alunos (CSV ou JSON colunar), em NDJSON ou CSV."""
+    await check_rate_limit(request)
+
+    settings = components_of(request).settings
+    data = await read_upload(file, settings.max_upload_bytes)
+    as_csv = (
+        request.query_params.get("format") == "csv"
+        or "text/csv" in request.headers.get("accept", "")
+    )
+    # Cálculo e serialização são CPU: thread para o cálculo, e o iterador
+    # síncrono é consumido pelo StreamingResponse no pool de threads
+    chunks = await asyncio.to_thread(score_roster, bytes(data), as_csv, settings.max_batch_rows)
+    return StreamingResponse(
+        chunks,
+        media_type="text/csv; charset=utf-8" if as_csv else "application/x-ndjson",
+    )
+
+
+async def analyze_meal_image(request: Request, image: UploadFile, profile: str = "") -> dict:
+    """Análise de uma foto de refeição (compartilhada com o endpoint em lote).
+
+    `profile` escolhe a rota de modelo (ex: "batch" → `MODEL_ROUTES` `meal:batch`).
+    """
+    components = components_of(request)
+    if not components.settings.has_openai:
+        return await fallback("meal", "simulation", simulate_meal_analysis())
+
+    with stage("meal", "upload"):
+        image_data = await read_upload(image, components.settings.max_upload_bytes)
+    return await meal_analysis(components, image_data, request.headers.get("cache-control"), profile)
+
+
+async def meal_analysis(
+    components: Components, image_data: bytes, cache_control: str | None = None, profile: str = ""
+) -> dict:
+    """Análise nutricional a partir da imagem já lida (endpoint, lote e jobs assíncronos)."""
+    if not components.settings.has_openai:
+        return await fallback("meal", "simulation", simulate_meal_analysis())
+
+    return await cached_analysis(
+        components,
+        cache_control,
+        make_cache_key("meal", image_data),
+        image_data,
+        lambda prepared, key: analyze_meal_with_ai(
+            components, prepared.data, cache_key=key, image_hash=prepared.dhash,
+            mime_type=prepared.mime_type, profile=profile,
+        ),
+        near_duplicates_check=True,
+    )
+
+
+def sum_meal_totals(results: list[dict]) -> dict:
+    """Soma calorias e macros de um conjunto de análises de refeição."""
+    totals = {"total_calories": 0, "macros": {"protein": 0, "carbs": 0, "fat": 0}}
+    for result in results:
+        totals["total_calories"] += result.get("total_calories") or 0
+        macros = result.get("macros") or {}
+        for name in totals["macros"]:
+            totals["macros"][name] += macros.get(name) or 0
+    return totals
+
+
+async def meal_batch_stream(request: Request, images: list[UploadFile], daily_total: bool):
+    """NDJSON: uma linha por imagem, na ordem em que terminam, e um resumo final."""
+    semaphore = asyncio.Semaphore(components_of(request).settings.batch_concurrency)
+
+    async def analyze_item(index: int, image: UploadFile) -> dict:
+        item = {"index": index, "filename": image.filename}
+        async with semaphore:
+            try:
+                if image.content_type and not image.content_type.startswith("image/"):
+                    raise HTTPException(status_code=422, detail="O arquivo enviado deve ser uma imagem.")
+                item["result"] = await analyze_meal_image(request, image, profile="batch")
+            except HTTPException as e:
+                item["error"] = e.detail
+            except Exception as e:
+                logger.error(f"Erro na análise em lote ({image.filename}): {e}")
+                item["error"] = "Erro ao analisar a imagem."
+        return item
+
+    tasks = [asyncio.ensure_future(analyze_item(i, image)) for i, image in enumerate(images)]
+    results = []
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            item = await next_done
+            if "result" in item:
+                results.append(item["result"])
+            yield orjson.dumps(item) + b"\n"
+    finally:
+        # Cliente desconectou: não deixar análises órfãs
+        for task in tasks:
+            task.cancel()
+
+    summary = {"count": len(images), "succeeded": len(results), "failed": len(images) - len(results)}
+    if daily_total:
+        summary["daily_total"] = sum_meal_totals(results)
+    logger.info(f"Lote concluído: {summary['succeeded']}/{summary['count']} imagens")
+    yield orjson.dumps({"summary": summary}) + b"\n"
+
+
+@api.post("/analyze-meals/")
+async def analyze_meals(
+    request: Request,
+    images: Annotated[list[UploadFile], File()],
+    daily_total: Annotated[bool, Form()] = False,
+):
+    """Análise nutricional em lote; resultados em NDJSON conforme cada imagem termina."""
+    max_images = components_of(request).settings.max_batch_images
+    if len(images) > max_images:
+        raise HTTPException(
+            status_code=422, detail=f"Envie no máximo {max_images} imagens por vez."
+        )
+    # Uma cobrança de rate limit por imagem, como nas requisições individuais
+    await check_rate_limit(request, cost=len(images))
+
+    logger.info(f"Análise de refeições em lote: {len(images)} imagens")
+    return StreamingResponse(
+        meal_batch_stream(request, images, daily_total),
+        media_type="application/x-ndjson",
+    )
+
+
+@api.get("/jobs/{job_id}")
+async def get_job(request: Request, job_id: str, wait: float = 0):
+    """Estado e resultado de uma análise assíncrona; `wait` faz long-poll (segundos)."""
+    components = components_of(request)
+    job = await components.job_queue.get(
+        job_id, wait=min(max(wait, 0), components.settings.job_max_wait)
+    )
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado ou expirado.")
+    return job
+
+
+@api.post("/generate-workout/")
 async def generate_workout(
     request: Request,
     training_location: Annotated[str, Form()],
@@ -529,12 +1178,162 @@ async def generate_workout(
     if not training_location.strip():
         raise HTTPException(status_code=422, detail="Informe o local de treino.")
 
+    components = components_of(request)
+    if "text/event-stream" in request.headers.get("accept", ""):
+        logger.info(f"Gerando treino (streaming): Local='{training_location}', Limitações='{limitations}'")
+        return workout_streaming_response(components, training_location, limitations)
+
     logger.info(f"Gerando treino: Local='{training_location}', Limitações='{limitations}'")
 
-    if HAS_OPENAI:
-        result = await generate_workout_with_ai(training_location, limitations)
+    result = rules_workout(components, training_location, limitations)
+    if result is not None:
+        logger.info(f"Plano gerado pelas regras: {result['title']}")
+        return result
+
+    if components.settings.has_openai:
+        key = workout_key(components, training_location, limitations)
+        result = cached_workout(components, key)
+        if result is not None:
+            logger.info(f"Plano gerado servido do cache: {result['title']}")
+            return result
+        result = await components.single_flight.do(
+            key,
+            lambda: generate_workout_with_ai(components, training_location, limitations, cache_key=key),
+        )
     else:
-        result = await simulate_workout_generation(training_location, limitations)
+        result = await fallback(
+            "workout", "simulation",
+            simulate_workout_generation(components.workout_engine, training_location, limitations),
+        )
 
     logger.info(f"Plano gerado: {result.get('title', 'N/A')}")
     return result
+
+
+def rules_workout(components: Components, training_location: str, limitations: str) -> dict | None:
+    """Plano do motor de regras para pedidos comuns; None deixa o pedido para a IA."""
+    if not components.settings.workout_rules:
+        return None
+    with stage("workout", "rules"):
+        return components.workout_engine.plan(training_location, limitations)
+
+
+def sse_event(event: str, data: dict) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+async def workout_event_stream(components: Components, training_location: str, limitations: str):
+    """Eventos SSE: um `exercise` por exercício e um `plan` final com o plano completo."""
+    plan = rules_workout(components, training_location, limitations)
+    if plan is not None:
+        events = plan_events(plan)
+    elif components.settings.has_openai:
+        key = workout_key(components, training_location, limitations)
+        plan = cached_workout(components, key)
+        if plan is not None:
+            events = plan_events(plan)
+        else:
+            events = stream_workout_with_ai(components, training_location, limitations, cache_key=key)
+    else:
+        events = simulated_workout_events(components.workout_engine, training_location, limitations)
+
+    async for event, data in events:
+        if event == "plan":
+            logger.info(f"Plano gerado (streaming): {data.get('title', 'N/A')}")
+        yield sse_event(event, data)
+
+
+async def simulated_workout_events(engine: WorkoutEngine, training_location: str, limitations: str):
+    plan = await fallback(
+        "workout", "simulation", simulate_workout_generation(engine, training_location, limitations)
+    )
+    async for event in plan_events(plan):
+        yield event
+
+
+async def plan_events(plan: dict):
+    for exercise in plan["exercises"]:
+        yield "exercise", exercise
+    yield "plan", plan
+
+
+def workout_streaming_response(
+    components: Components, training_location: str, limitations: str
+) -> StreamingResponse:
+    return StreamingResponse(
+        workout_event_stream(components, training_location, limitations),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@api.post("/generate-workout/stream")
+async def generate_workout_stream(
+    request: Request,
+    training_location: Annotated[str, Form()],
+    limitations: Annotated[str, Form()] = "",
+):
+    """Gera plano de treino em streaming (Server-Sent Events)."""
+    await check_rate_limit(request)
+
+    if not training_location.strip():
+        raise HTTPException(status_code=422, detail="Informe o local de treino.")
+
+    logger.info(f"Gerando treino (streaming): Local='{training_location}', Limitações='{limitations}'")
+    return workout_streaming_response(components_of(request), training_location, limitations)
+
+
+# ════════════════════════════════════════════════
+# APLICAÇÃO
+# ════════════════════════════════════════════════
+
+
+def create_app(app_settings: Settings | None = None) -> FastAPI:
+    """Monta a aplicação: componentes, middlewares e rotas.
+
+    Sem `app_settings`, a configuração vem do ambiente (`.env`). Os
+    componentes ficam em `app.state.components`, um conjunto por aplicação.
+    O cliente da OpenAI não é criado aqui: o SDK só é importado na primeira
+    chamada à IA (`Components.get_client`), e conexões e workers sobem no lifespan.
+    """
+    settings = app_settings or Settings.from_env()
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    if settings.has_openai:
+        logger.info("✅ OpenAI API configurada - modo IA real ativado")
+    else:
+        logger.warning("⚠️  OpenAI API key não configurada - usando modo simulação")
+
+    application = FastAPI(
+        title="FitScan API",
+        description="Backend do FitScan - Personal Trainer e Nutricionista de Bolso com IA.",
+        version="1.0.0",
+        docs_url="/docs" if settings.app_env == "development" else None,
+        redoc_url="/redoc" if settings.app_env == "development" else None,
+        default_response_class=ORJSONResponse,
+        lifespan=lifespan,
+    )
+    application.state.components = Components(settings)
+    application.add_middleware(
+        CORSMiddleware,
+        allow_origins=list(settings.allowed_origins),
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    application.middleware("http")(limit_upload_size)
+    application.middleware("http")(security_headers)
+    application.middleware("http")(request_metrics)
+    application.add_exception_handler(Exception, global_exception_handler)
+    application.include_router(api)
+    return application
+
+
+def __getattr__(name: str):
+    # `uvicorn main:app` continua funcionando: a aplicação padrão é criada no primeiro acesso
+    if name == "app":
+        application = globals()["app"] = create_app()
+        return application
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
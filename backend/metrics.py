@@ -0,0 +1,195 @@
+"""
+Métricas no formato texto do Prometheus, sem dependências externas.
+
+Contadores, gauges e histogramas guardam valores em dicionários simples
+indexados pela tupla de labels: sem locks, já que o event loop é
+single-thread e uma eventual corrida com o pool de threads custaria no
+máximo um incremento perdido. Cada requisição acumula também o tempo por
+etapa para o header `Server-Timing`.
+"""
+
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterable
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Tempos por etapa da requisição atual: lista de (etapa, segundos)
+request_timings: ContextVar[list | None] = ContextVar("request_timings", default=None)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+            for labels, value in self._values.items()
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+    def set(self, *labels, value: float) -> None:
+        self._values[labels] = value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, help_text: str, labelnames: Iterable[str] = (),
+        buckets: tuple = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [contagem por bucket..., +Inf, soma]
+        self._series: dict[tuple, list[float]] = {}
+
+    def observe(self, value: float, *labels) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> list[str]:
+        lines = []
+        for labels, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+                )
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {series[-1]}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list = []
+
+    def counter(self, *args, **kwargs) -> Counter:
+        return self._add(Counter(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs) -> Gauge:
+        return self._add(Gauge(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        return self._add(Histogram(*args, **kwargs))
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self, *collectors: Callable[[], Iterable[tuple]]) -> str:
+        """Texto do Prometheus.
+
+        Métricas de estado (caches, filas...) vêm de `collectors` da aplicação,
+        que produzem (nome, tipo, ajuda, valor) lidos na hora da coleta.
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        for collector in collectors:
+            for name, kind, help_text, value in collector():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+# ── Métricas do FitScan ───────────────────────
+
+REGISTRY = Registry()
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "fitscan_request_duration_seconds", "Latência das requisições HTTP.",
+    ["path", "method", "status"],
+)
+STAGE_SECONDS = REGISTRY.histogram(
+    "fitscan_stage_duration_seconds", "Latência por etapa do processamento.",
+    ["endpoint", "stage"],
+)
+IN_FLIGHT = REGISTRY.gauge(
+    "fitscan_requests_in_flight", "Requisições em andamento.", ["path"]
+)
+FALLBACKS = REGISTRY.counter(
+    "fitscan_fallbacks_total", "Respostas servidas pelo fallback local, por causa.",
+    ["endpoint", "cause"],
+)
+TOKENS = REGISTRY.counter(
+    "fitscan_openai_tokens_total", "Tokens consumidos na OpenAI.", ["endpoint", "kind"]
+)
+
+
+@contextmanager
+def stage(endpoint: str, name: str):
+    """Mede uma etapa: histograma por endpoint e entrada no `Server-Timing`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, endpoint, name)
+        timings = request_timings.get()
+        if timings is not None:
+            timings.append((name, elapsed))
+
+
+def record_fallback(endpoint: str, cause: str) -> None:
+    FALLBACKS.inc(endpoint, cause)
+
+
+def record_usage(endpoint: str, usage) -> None:
+    """Contabiliza `response.usage` da OpenAI (quando presente)."""
+    if usage is None:
+        return
+    TOKENS.inc(endpoint, "prompt", amount=getattr(usage, "prompt_tokens", 0) or 0)
+    TOKENS.inc(endpoint, "completion", amount=getattr(usage, "completion_tokens", 0) or 0)
+    # Parte da entrada servida pelo cache de prefixo da OpenAI
+    details = getattr(usage, "prompt_tokens_details", None)
+    TOKENS.inc(endpoint, "cached", amount=getattr(details, "cached_tokens", 0) or 0)
+
+
+def server_timing(timings: list, total: float) -> str:
+    entries = [f"{name};dur={elapsed * 1000:.1f}" for name, elapsed in timings]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
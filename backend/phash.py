@@ -0,0 +1,148 @@
+"""
+Detecção de fotos quase duplicadas de refeições.
+
+dHash de 64 bits calculado sobre a imagem reduzida em tons de cinza e
+índice LSH por bandas: com distância máxima `d` o hash é dividido em
+`d + 1` bandas, e pelo princípio da casa dos pombos qualquer hash a
+distância <= d compartilha ao menos uma banda idêntica com a consulta.
+
+Fotos lisas, escuras ou em branco quase não têm gradiente e caem todas
+perto de 0x0 (ou de todos os bits em 1): esses hashes não identificam a
+refeição e ficam fora do índice.
+"""
+
+import time
+from collections import OrderedDict
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow é opcional: sem ele a deduplicação fica desativada
+    Image = None
+
+HASH_BITS = 64
+# Hashes com até tantos bits em 1 (ou em 0) não dizem nada sobre a foto
+MIN_INFORMATIVE_BITS = 8
+
+HAS_PIL = Image is not None
+
+
+def dhash(image: "Image.Image") -> int:
+    """dHash de 64 bits: compara pixels vizinhos de uma miniatura 9x8.
+
+    Recebe a imagem já decodificada: o único caminho de decodificação é
+    `ImagePipeline` (imaging.py), que calcula o hash junto com a redução.
+    """
+    small = image.convert("L").resize((9, 8), Image.Resampling.BILINEAR)
+    pixels = small.tobytes()
+    value = 0
+    for row in range(8):
+        offset = row * 9
+        for col in range(8):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def informative(value: int) -> bool:
+    """False para hashes de baixa entropia (foto lisa, escura ou em branco)."""
+    return MIN_INFORMATIVE_BITS < value.bit_count() < HASH_BITS - MIN_INFORMATIVE_BITS
+
+
+def _band_layout(bands: int) -> list[tuple[int, int]]:
+    """Divide os 64 bits em `bands` faixas (deslocamento, máscara)."""
+    base, extra = divmod(HASH_BITS, bands)
+    layout, shift = [], 0
+    for i in range(bands):
+        width = base + (1 if i < extra else 0)
+        layout.append((shift, (1 << width) - 1))
+        shift += width
+    return layout
+
+
+class NearDuplicateIndex:
+    """Índice limitado (LRU + TTL) de hashes perceptuais recentes."""
+
+    def __init__(self, max_distance: int = 4, max_entries: int = 10000, ttl: float = 600):
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._layout = _band_layout(max_distance + 1)
+        self._buckets: list[dict[int, set[int]]] = [{} for _ in self._layout]
+        self._entries: OrderedDict[int, tuple[int, float, dict]] = OrderedDict()
+        self._next_id = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.skipped = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _bands(self, value: int):
+        for band, (shift, mask) in enumerate(self._layout):
+            yield band, (value >> shift) & mask
+
+    def _remove(self, entry_id: int) -> None:
+        value, _, _ = self._entries.pop(entry_id)
+        for band, key in self._bands(value):
+            bucket = self._buckets[band]
+            ids = bucket[key]
+            ids.discard(entry_id)
+            if not ids:
+                del bucket[key]
+
+    def add(self, value: int, result: dict) -> None:
+        if not informative(value):
+            return
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = (value, time.monotonic() + self.ttl, result)
+        for band, key in self._bands(value):
+            self._buckets[band].setdefault(key, set()).add(entry_id)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def lookup(self, value: int) -> dict | None:
+        """Retorna o resultado mais próximo dentro da distância máxima."""
+        if not informative(value):
+            self.skipped += 1
+            return None
+        now = time.monotonic()
+        best_id, best_distance = None, self.max_distance + 1
+        expired = []
+        seen = set()
+        for band, key in self._bands(value):
+            for entry_id in self._buckets[band].get(key, ()):
+                if entry_id in seen:
+                    continue
+                seen.add(entry_id)
+                other, expires_at, _ = self._entries[entry_id]
+                if expires_at <= now:
+                    expired.append(entry_id)
+                    continue
+                distance = hamming(value, other)
+                if distance < best_distance:
+                    best_id, best_distance = entry_id, distance
+        for entry_id in expired:
+            self._remove(entry_id)
+
+        if best_id is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(best_id)
+        return self._entries[best_id][2]
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_distance": self.max_distance,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "skipped": self.skipped,
+        }
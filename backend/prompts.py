@@ -0,0 +1,177 @@
+"""
+Templates de prompt com prefixo estável.
+
+A OpenAI reaproveita automaticamente o processamento do início do prompt
+quando ele se repete entre chamadas (cache de prefixo: a partir de 1024
+tokens, em blocos de 128, com os tokens reaproveitados informados em
+`usage.prompt_tokens_details.cached_tokens`). Para o prefixo se repetir,
+cada template separa:
+
+- instruções: papel, regras e formato da resposta, idênticos em toda
+  chamada; viram a mensagem de sistema, montada uma única vez
+- dados: idade, local, limitações... formatados no fim, na mensagem do
+  usuário, seguida da imagem quando houver
+
+Os tokens de cada chamada são estimados antes do envio (caracteres / 4,
+mais o custo fixo da imagem e o teto da resposta) para descontar o
+orçamento do cliente; o uso real é acumulado por template.
+"""
+
+from dataclasses import dataclass
+
+# Estimativa sem tokenizador: ~4 caracteres por token em português e JSON
+CHARS_PER_TOKEN = 4
+# Papel e delimitadores de cada mensagem
+MESSAGE_TOKENS = 4
+# Custo fixo de uma imagem com detail="low"
+LOW_DETAIL_IMAGE_TOKENS = 85
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+@dataclass
+class Prompt:
+    template: "PromptTemplate"
+    messages: list[dict]
+    # Estimativa da entrada; o orçamento reserva também o teto da resposta
+    prompt_tokens: int
+
+    @property
+    def max_tokens(self) -> int:
+        return self.template.max_tokens
+
+    @property
+    def budget_tokens(self) -> int:
+        return self.prompt_tokens + self.template.max_tokens
+
+
+class PromptTemplate:
+    def __init__(self, name: str, instructions: str, data: str, max_tokens: int, image: bool = False):
+        self.name = name
+        self.data = data
+        self.max_tokens = max_tokens
+        self.image = image
+        # Mesmo objeto em todas as chamadas: o prefixo não muda nem por um caractere
+        self.system = {"role": "system", "content": instructions}
+        self.prefix_tokens = estimate_tokens(instructions) + MESSAGE_TOKENS
+        self.calls = 0
+        self.estimated_tokens = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+
+    def render(self, image_url: str | None = None, **fields) -> Prompt:
+        text = self.data.format(**fields)
+        tokens = self.prefix_tokens + estimate_tokens(text) + MESSAGE_TOKENS
+        if self.image:
+            content = [
+                {"type": "text", "text": text},
+                {"type": "image_url", "image_url": {"url": image_url, "detail": "low"}},
+            ]
+            tokens += LOW_DETAIL_IMAGE_TOKENS
+        else:
+            content = text
+        return Prompt(self, [self.system, {"role": "user", "content": content}], tokens)
+
+    def observe(self, prompt: Prompt, usage) -> int:
+        """Acumula o `usage` de uma resposta; devolve o total de tokens (entrada + saída)."""
+        if usage is None:
+            return 0
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        details = getattr(usage, "prompt_tokens_details", None)
+        self.calls += 1
+        self.estimated_tokens += prompt.prompt_tokens
+        self.prompt_tokens += prompt_tokens
+        self.cached_tokens += getattr(details, "cached_tokens", 0) or 0
+        return prompt_tokens + (getattr(usage, "completion_tokens", 0) or 0)
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "prefix_tokens": self.prefix_tokens,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "cached_ratio": round(self.cached_tokens / self.prompt_tokens, 3) if self.prompt_tokens else None,
+            # Estimado / real: acima de 1, a estimativa reserva mais do que o gasto
+            "estimate_ratio": round(self.estimated_tokens / self.prompt_tokens, 2) if self.prompt_tokens else None,
+        }
+
+
+BODY_PROMPT = PromptTemplate(
+    "body",
+    """Você é um personal trainer e nutricionista profissional analisando a foto corporal de um cliente.
+Os dados do cliente e a foto vêm na mensagem seguinte.
+
+Analise a foto e retorne EXATAMENTE um JSON com esta estrutura (sem markdown, sem ```):
+{
+  "estimated_fat_percentage": <número entre 8 e 45>,
+  "estimated_biotype": "<Ectomorfo, Mesomorfo ou Endomorfo>",
+  "suggested_goal": "<meta principal sugerida em português>",
+  "feedback": "<feedback detalhado e motivacional em português, 2-3 frases>"
+}
+
+Seja preciso na estimativa do percentual de gordura baseado na imagem.
+O feedback deve ser profissional, motivacional e em português brasileiro.""",
+    """Dados do cliente:
+- Idade: {age} anos
+- Altura: {height} cm
+- Peso: {weight} kg
+- IMC calculado: {bmi}""",
+    max_tokens=300,
+    image=True,
+)
+
+MEAL_PROMPT = PromptTemplate(
+    "meal",
+    """Você é um nutricionista profissional analisando a foto de uma refeição.
+
+Analise a refeição na imagem e retorne EXATAMENTE um JSON com esta estrutura (sem markdown, sem ```):
+{
+  "total_calories": <número estimado de calorias>,
+  "macros": {
+    "protein": <gramas de proteína>,
+    "carbs": <gramas de carboidratos>,
+    "fat": <gramas de gordura>
+  },
+  "feedback": "<feedback nutricional detalhado em português, 2-3 frases com dicas>",
+  "meal_type": "<tipo da refeição - ex: Almoço - Frango Grelhado com Arroz>"
+}
+
+Seja preciso nas estimativas baseado no que vê na imagem.
+O feedback deve incluir sugestões práticas em português brasileiro.""",
+    "Foto da refeição:",
+    max_tokens=300,
+    image=True,
+)
+
+WORKOUT_PROMPT = PromptTemplate(
+    "workout",
+    """Você é um personal trainer profissional criando um treino personalizado.
+As informações do cliente vêm na mensagem seguinte.
+
+Crie um plano de treino e retorne EXATAMENTE um JSON com esta estrutura (sem markdown, sem ```):
+{
+  "title": "<nome do treino - ex: Treino A - Superiores>",
+  "focus": "<foco principal - ex: Força e Hipertrofia>",
+  "exercises": [
+    {
+      "name": "<nome do exercício>",
+      "sets": <número de séries>,
+      "reps": "<repetições - ex: 8-12>",
+      "tips": "<dica de execução em português>"
+    }
+  ],
+  "feedback": "<observações gerais sobre o treino, 2-3 frases em português>"
+}
+
+Inclua 4-6 exercícios. Adapte ao local e respeite as limitações.
+Se treina em casa, use exercícios com peso corporal.
+As dicas devem ser práticas e em português brasileiro.""",
+    """Informações do cliente:
+- Local de treino: {location}
+- Limitações/lesões: {limitations}{context}""",
+    max_tokens=600,
+)
+
+TEMPLATES = (BODY_PROMPT, MEAL_PROMPT, WORKOUT_PROMPT)
@@ -0,0 +1,361 @@
+"""
+Rate limiting com estado de tamanho fixo por chave.
+
+Dois algoritmos (token bucket e janela deslizante por contadores), ambos
+O(1) em memória e tempo por verificação, e três backends de estado:
+
+- `MemoryStore`: dicionário local com despejo periódico de chaves ociosas
+- `SQLiteStore`: arquivo compartilhado entre workers do uvicorn
+- `RedisStore`: servidor compatível com Redis (requer o pacote `redis`)
+
+`TokenBudget` usa o mesmo token bucket para limitar os tokens da OpenAI
+consumidos por cliente em vez do número de requisições.
+"""
+
+import asyncio
+import math
+import sqlite3
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable
+
+State = tuple[float, float, float]
+
+# Cliente (IP) da requisição atual, definido na verificação do rate limit
+current_client: ContextVar[str | None] = ContextVar("current_client", default=None)
+
+
+@dataclass
+class Decision:
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_after: float
+    retry_after: float = 0.0
+
+    def headers(self) -> dict[str, str]:
+        headers = {
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(self.remaining),
+            "RateLimit-Reset": str(math.ceil(self.reset_after)),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+
+# ── Algoritmos ────────────────────────────────
+
+
+class TokenBucket:
+    """Balde com `limit` fichas, reabastecido continuamente ao longo da janela.
+
+    Estado: (fichas, instante da última atualização, não usado).
+    """
+
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+        self.rate = limit / window
+
+    def apply(self, state: State | None, now: float, cost: int) -> tuple[State, Decision]:
+        tokens, updated_at = (state[0], state[1]) if state else (float(self.limit), now)
+        tokens = min(self.limit, tokens + (now - updated_at) * self.rate)
+
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        missing = self.limit - tokens
+        decision = Decision(
+            allowed=allowed,
+            limit=self.limit,
+            remaining=int(tokens),
+            reset_after=missing / self.rate,
+            retry_after=0.0 if allowed else (cost - tokens) / self.rate,
+        )
+        return (tokens, now, 0.0), decision
+
+
+class SlidingWindowCounter:
+    """Janela deslizante aproximada pela ponderação da janela anterior.
+
+    Estado: (início da janela atual, contagem atual, contagem anterior).
+    """
+
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+
+    def apply(self, state: State | None, now: float, cost: int) -> tuple[State, Decision]:
+        window_start = now - (now % self.window)
+        current, previous = 0.0, 0.0
+        if state:
+            if state[0] == window_start:
+                current, previous = state[1], state[2]
+            elif state[0] == window_start - self.window:
+                previous = state[1]
+
+        elapsed = now - window_start
+        weight = 1 - elapsed / self.window
+        estimated = previous * weight + current
+
+        allowed = estimated + cost <= self.limit
+        if allowed:
+            current += cost
+            estimated += cost
+
+        retry_after = 0.0
+        if not allowed:
+            if previous > 0 and current + cost <= self.limit:
+                # Espera o peso da janela anterior cair o suficiente
+                needed_weight = (self.limit - current - cost) / previous
+                retry_after = max(0.0, (1 - needed_weight) * self.window - elapsed)
+            else:
+                retry_after = self.window - elapsed
+        decision = Decision(
+            allowed=allowed,
+            limit=self.limit,
+            remaining=max(0, int(self.limit - estimated)),
+            reset_after=self.window - elapsed,
+            retry_after=retry_after,
+        )
+        return (window_start, current, previous), decision
+
+
+ALGORITHMS = {"token_bucket": TokenBucket, "sliding_window": SlidingWindowCounter}
+
+Apply = Callable[[State | None, float, int], tuple[State, Decision]]
+
+
+# ── Backends de estado ────────────────────────
+
+
+class MemoryStore:
+    """Estado local ao processo, com despejo periódico de chaves ociosas."""
+
+    def __init__(self, idle_after: float, sweep_interval: float = 60):
+        self.idle_after = idle_after
+        self.sweep_interval = sweep_interval
+        self._states: dict[str, tuple[State, float]] = {}
+        self._last_sweep = time.monotonic()
+        self.evictions = 0
+
+    async def update(self, key: str, apply: Apply, now: float, cost: int) -> Decision:
+        entry = self._states.get(key)
+        state, decision = apply(entry[0] if entry else None, now, cost)
+        self._states[key] = (state, now)
+        if time.monotonic() - self._last_sweep >= self.sweep_interval:
+            self.sweep(now)
+        return decision
+
+    def sweep(self, now: float) -> int:
+        idle = [k for k, (_, seen) in self._states.items() if now - seen > self.idle_after]
+        for key in idle:
+            del self._states[key]
+        self.evictions += len(idle)
+        self._last_sweep = time.monotonic()
+        return len(idle)
+
+    def stats(self) -> dict:
+        return {"backend": "memory", "keys": len(self._states), "evictions": self.evictions}
+
+
+class SQLiteStore:
+    """Estado em um arquivo SQLite compartilhado entre workers."""
+
+    def __init__(
+        self, path: str, idle_after: float, sweep_interval: float = 60, table: str = "rate_limits"
+    ):
+        self.idle_after = idle_after
+        self.sweep_interval = sweep_interval
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            " key TEXT PRIMARY KEY, a REAL, b REAL, c REAL, seen REAL NOT NULL)"
+        )
+        self._last_sweep = time.monotonic()
+        self.evictions = 0
+
+    def _update(self, key: str, apply: Apply, now: float, cost: int) -> Decision:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    f"SELECT a, b, c FROM {self.table} WHERE key = ?", (key,)
+                ).fetchone()
+                state, decision = apply(tuple(row) if row else None, now, cost)
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (key, a, b, c, seen) VALUES (?, ?, ?, ?, ?)",
+                    (key, *state, now),
+                )
+                if time.monotonic() - self._last_sweep >= self.sweep_interval:
+                    cursor = self._conn.execute(
+                        f"DELETE FROM {self.table} WHERE seen < ?", (now - self.idle_after,)
+                    )
+                    self.evictions += cursor.rowcount
+                    self._last_sweep = time.monotonic()
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return decision
+
+    async def update(self, key: str, apply: Apply, now: float, cost: int) -> Decision:
+        return await asyncio.to_thread(self._update, key, apply, now, cost)
+
+    def stats(self) -> dict:
+        with self._lock:
+            keys = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        return {"backend": "sqlite", "keys": keys, "evictions": self.evictions}
+
+
+class RedisStore:
+    """Estado em Redis com transação otimista (WATCH/MULTI) e expiração nativa."""
+
+    def __init__(self, url: str, idle_after: float, prefix: str = "fitscan:rl:"):
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url)
+        self._watch_error = redis.WatchError
+        self.idle_after = idle_after
+        self.prefix = prefix
+
+    async def update(self, key: str, apply: Apply, now: float, cost: int) -> Decision:
+        name = self.prefix + key
+        async with self._redis.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(name)
+                    raw = await pipe.get(name)
+                    state = tuple(map(float, raw.split(b","))) if raw else None
+                    state, decision = apply(state, now, cost)
+                    pipe.multi()
+                    pipe.set(
+                        name,
+                        ",".join(repr(v) for v in state),
+                        px=int(self.idle_after * 1000),
+                    )
+                    await pipe.execute()
+                    return decision
+                except self._watch_error:
+                    continue
+
+    def stats(self) -> dict:
+        return {"backend": "redis"}
+
+
+# ── Limitador ─────────────────────────────────
+
+
+class RateLimiter:
+    def __init__(self, algorithm, store):
+        self.algorithm = algorithm
+        self.store = store
+        self.allowed = 0
+        self.rejected = 0
+
+    async def hit(self, key: str, cost: int = 1) -> Decision:
+        decision = await self.store.update(key, self.algorithm.apply, time.time(), cost)
+        if decision.allowed:
+            self.allowed += 1
+        else:
+            self.rejected += 1
+        return decision
+
+    def stats(self) -> dict:
+        return {
+            "algorithm": type(self.algorithm).__name__,
+            "limit": self.algorithm.limit,
+            "window": self.algorithm.window,
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            **self.store.stats(),
+        }
+
+
+class TokenBudget:
+    """Orçamento de tokens da OpenAI por cliente, reabastecido ao longo da janela.
+
+    `reserve` desconta a estimativa da chamada (entrada + teto da resposta)
+    e recusa quando não há saldo; `settle` devolve ou cobra a diferença
+    para o uso real informado pela OpenAI. Uma cobrança acima do saldo é
+    ignorada pelo token bucket: o acerto é de melhor esforço.
+    """
+
+    def __init__(self, limit: int, window: float, store):
+        self.algorithm = TokenBucket(limit, window)
+        self.store = store
+        self.reserved = 0
+        self.exhausted = 0
+        self.tokens = 0
+
+    async def reserve(self, key: str, tokens: int) -> bool:
+        decision = await self.store.update(key, self.algorithm.apply, time.time(), tokens)
+        if decision.allowed:
+            self.reserved += 1
+        else:
+            self.exhausted += 1
+        return decision.allowed
+
+    async def settle(self, key: str, reserved: int, used: int) -> None:
+        self.tokens += used
+        if used != reserved:
+            await self.store.update(key, self.algorithm.apply, time.time(), used - reserved)
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.algorithm.limit,
+            "window": self.algorithm.window,
+            "reserved": self.reserved,
+            "exhausted": self.exhausted,
+            "tokens": self.tokens,
+            **self.store.stats(),
+        }
+
+
+def build_store(
+    window: float, backend: str, sqlite_path: str, redis_url: str, namespace: str = "rate_limits"
+):
+    # Após duas janelas sem uso, o estado equivale ao de uma chave nova
+    idle_after = 2 * window
+    if backend == "sqlite":
+        return SQLiteStore(sqlite_path, idle_after, table=namespace)
+    if backend == "redis":
+        prefix = "fitscan:rl:" if namespace == "rate_limits" else f"fitscan:{namespace}:"
+        return RedisStore(redis_url, idle_after, prefix=prefix)
+    if backend == "memory":
+        return MemoryStore(idle_after)
+    raise ValueError(f"Backend de rate limit desconhecido: {backend}")
+
+
+def build_rate_limiter(
+    limit: int,
+    window: float = 60,
+    algorithm: str = "sliding_window",
+    backend: str = "memory",
+    sqlite_path: str = "ratelimit.db",
+    redis_url: str = "",
+) -> RateLimiter:
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"Algoritmo de rate limit desconhecido: {algorithm}")
+    store = build_store(window, backend, sqlite_path, redis_url)
+    return RateLimiter(ALGORITHMS[algorithm](limit, window), store)
+
+
+def build_token_budget(
+    limit: int,
+    window: float = 86400,
+    backend: str = "memory",
+    sqlite_path: str = "ratelimit.db",
+    redis_url: str = "",
+) -> TokenBudget:
+    # Tabela/prefixo próprios: a limpeza de chaves ociosas do rate limit
+    # (janela de um minuto) não apaga saldos de tokens
+    store = build_store(window, backend, sqlite_path, redis_url, namespace="token_budget")
+    return TokenBudget(limit, window, store)
@@ -0,0 +1,203 @@
+"""
+Roteamento de modelos por camada (tier) e requisições com hedge.
+
+- Cada endpoint (e, opcionalmente, um perfil de requisição como
+  `meal:batch` ou `workout:stream`) é mapeado para uma camada de modelo
+  configurável (ex: `fast=gpt-4o-mini`, `quality=gpt-4o`)
+- Hedge: se a chamada principal não responder dentro do percentil
+  configurado da sua latência recente, uma segunda chamada sai para a
+  camada rápida; vale a primeira resposta válida e a outra é cancelada
+- Latência, vitórias e erros por camada alimentam o atraso do hedge
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, TypeVar
+
+T = TypeVar("T")
+
+# Amostras mínimas antes de trocar o atraso inicial pelo percentil medido
+MIN_SAMPLES = 20
+
+
+def parse_mapping(text: str) -> dict[str, str]:
+    """Converte "a=b,c=d" em {"a": "b", "c": "d"} (ignora itens vazios)."""
+    mapping = {}
+    for item in text.split(","):
+        name, _, value = item.partition("=")
+        if name.strip() and value.strip():
+            mapping[name.strip()] = value.strip()
+    return mapping
+
+
+class LatencyWindow:
+    """Janela das últimas latências para estimar percentis."""
+
+    def __init__(self, size: int = 200):
+        self._samples: deque[float] = deque(maxlen=size)
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, p: float) -> float:
+        if not self._samples:
+            return 0.0
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+
+class TierStats:
+    def __init__(self, model: str):
+        self.model = model
+        self.calls = 0
+        self.errors = 0
+        self.cancelled = 0
+        self.races = 0
+        self.wins = 0
+        self.latency = LatencyWindow()
+
+    def stats(self) -> dict:
+        return {
+            "model": self.model,
+            "calls": self.calls,
+            "errors": self.errors,
+            "cancelled": self.cancelled,
+            "win_rate": round(self.wins / self.races, 3) if self.races else None,
+            "p50_ms": round(self.latency.percentile(50) * 1000, 1),
+            "p95_ms": round(self.latency.percentile(95) * 1000, 1),
+        }
+
+
+class ModelRouter:
+    def __init__(
+        self,
+        tiers: dict[str, str],
+        routes: dict[str, str],
+        default_tier: str,
+        hedge_tier: str = "",
+        hedge_percentile: float = 95,
+        hedge_delay: float = 2.0,
+        min_hedge_delay: float = 0.2,
+    ):
+        unknown = {tier for tier in (*routes.values(), default_tier) if tier not in tiers}
+        if unknown or (hedge_tier and hedge_tier not in tiers):
+            raise ValueError(f"Camada de modelo desconhecida: {unknown or hedge_tier}")
+        self.tiers = tiers
+        self.routes = routes
+        self.default_tier = default_tier
+        self.hedge_tier = hedge_tier
+        self.hedge_percentile = hedge_percentile
+        self.initial_hedge_delay = hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        # Latência por (endpoint, camada): imagem e texto têm perfis diferentes
+        self._latency: dict[tuple[str, str], LatencyWindow] = {}
+        self._tiers = {name: TierStats(model) for name, model in tiers.items()}
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def tier_for(self, endpoint: str, profile: str = "") -> str:
+        if profile and f"{endpoint}:{profile}" in self.routes:
+            return self.routes[f"{endpoint}:{profile}"]
+        return self.routes.get(endpoint, self.default_tier)
+
+    def model_for(self, endpoint: str, profile: str = "") -> str:
+        return self.tiers[self.tier_for(endpoint, profile)]
+
+    def _window(self, endpoint: str, tier: str) -> LatencyWindow:
+        window = self._latency.get((endpoint, tier))
+        if window is None:
+            window = self._latency[(endpoint, tier)] = LatencyWindow()
+        return window
+
+    def hedge_delay(self, endpoint: str, tier: str) -> float:
+        """Atraso antes do hedge: percentil da latência recente da camada principal."""
+        window = self._window(endpoint, tier)
+        if len(window) < MIN_SAMPLES:
+            return self.initial_hedge_delay
+        return max(self.min_hedge_delay, window.percentile(self.hedge_percentile))
+
+    async def _attempt(
+        self, endpoint: str, tier: str, fn: Callable[[str], Awaitable[T]]
+    ) -> T:
+        stats = self._tiers[tier]
+        stats.calls += 1
+        start = time.monotonic()
+        try:
+            result = await fn(self.tiers[tier])
+        except asyncio.CancelledError:
+            # Perdedor do hedge: a latência real é no mínimo o tempo decorrido,
+            # registrado para não enviesar o percentil para baixo
+            stats.cancelled += 1
+            self._window(endpoint, tier).add(time.monotonic() - start)
+            raise
+        except Exception:
+            stats.errors += 1
+            raise
+        elapsed = time.monotonic() - start
+        stats.latency.add(elapsed)
+        self._window(endpoint, tier).add(elapsed)
+        return result
+
+    async def run(
+        self, endpoint: str, fn: Callable[[str], Awaitable[T]], profile: str = "", hedge: bool = True
+    ) -> T:
+        """Executa `fn(model)` na camada da rota, com hedge para a camada rápida.
+
+        `fn` deve levantar exceção para respostas inválidas: só uma resposta
+        válida encerra a disputa. Se todas falharem, propaga o erro da principal.
+        """
+        tier = self.tier_for(endpoint, profile)
+        if not hedge or not self.hedge_tier or self.hedge_tier == tier:
+            return await self._attempt(endpoint, tier, fn)
+
+        primary = asyncio.ensure_future(self._attempt(endpoint, tier, fn))
+        tasks = {primary: tier}
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=self.hedge_delay(endpoint, tier))
+            if not done:
+                self.hedges += 1
+                hedged = asyncio.ensure_future(self._attempt(endpoint, self.hedge_tier, fn))
+                tasks[hedged] = self.hedge_tier
+
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if len(tasks) > 1:
+                            self._record_race(tasks, winner=tasks[task])
+                        return task.result()
+            if len(tasks) > 1:
+                self._record_race(tasks, winner=None)
+            raise primary.exception()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def _record_race(self, tasks: dict, winner: str | None) -> None:
+        for tier in tasks.values():
+            self._tiers[tier].races += 1
+        if winner is not None:
+            self._tiers[winner].wins += 1
+            if winner == self.hedge_tier:
+                self.hedge_wins += 1
+
+    def stats(self) -> dict:
+        return {
+            "routes": {**self.routes, "default": self.default_tier},
+            "hedge_tier": self.hedge_tier or None,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedge_delay_ms": {
+                f"{endpoint}:{tier}": round(self.hedge_delay(endpoint, tier) * 1000, 1)
+                for endpoint, tier in self._latency
+                if tier != self.hedge_tier
+            },
+            "tiers": {name: stats.stats() for name, stats in self._tiers.items()},
+        }
@@ -0,0 +1,100 @@
+"""
+Modelos tipados das respostas da IA e formatos de saída estruturada.
+
+Os mesmos modelos geram o JSON Schema enviado à OpenAI
+(`response_format` com `strict: true`) e validam a resposta uma única
+vez com o parser do pydantic-core.
+"""
+
+from typing import Literal
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class StrictModel(BaseModel):
+    # Saída estruturada estrita exige additionalProperties: false
+    model_config = ConfigDict(extra="forbid")
+
+
+class BodyAnalysis(StrictModel):
+    estimated_fat_percentage: int = Field(description="Percentual de gordura estimado, entre 8 e 45")
+    estimated_biotype: Literal["Ectomorfo", "Mesomorfo", "Endomorfo"]
+    suggested_goal: str = Field(description="Meta principal sugerida em português")
+    feedback: str = Field(description="Feedback detalhado e motivacional em português, 2-3 frases")
+
+
+class Macros(StrictModel):
+    protein: int = Field(description="Gramas de proteína")
+    carbs: int = Field(description="Gramas de carboidratos")
+    fat: int = Field(description="Gramas de gordura")
+
+
+class MealAnalysis(StrictModel):
+    total_calories: int = Field(description="Calorias estimadas")
+    macros: Macros
+    feedback: str = Field(description="Feedback nutricional em português, 2-3 frases com dicas")
+    meal_type: str = Field(description="Tipo da refeição - ex: Almoço - Frango Grelhado com Arroz")
+
+
+class Exercise(StrictModel):
+    name: str
+    sets: int
+    reps: str = Field(description="Repetições - ex: 8-12")
+    tips: str = Field(description="Dica de execução em português")
+
+
+class WorkoutPlan(StrictModel):
+    title: str = Field(description="Nome do treino - ex: Treino A - Superiores")
+    focus: str = Field(description="Foco principal - ex: Força e Hipertrofia")
+    exercises: list[Exercise] = Field(min_length=1)
+    feedback: str = Field(description="Observações gerais sobre o treino, 2-3 frases em português")
+
+
+UNSUPPORTED_KEYWORDS = ("minItems", "maxItems", "title")
+
+
+def _strict_schema(schema):
+    """Remove palavras-chave que a saída estruturada estrita não aceita."""
+    if isinstance(schema, list):
+        return [_strict_schema(item) for item in schema]
+    if not isinstance(schema, dict):
+        return schema
+    cleaned = {}
+    for key, value in schema.items():
+        if key in UNSUPPORTED_KEYWORDS:
+            continue
+        if key in ("properties", "$defs"):
+            # Nomes de campos/definições não são palavras-chave
+            cleaned[key] = {name: _strict_schema(sub) for name, sub in value.items()}
+        else:
+            cleaned[key] = _strict_schema(value)
+    return cleaned
+
+
+def response_format(model: type[BaseModel], name: str) -> dict:
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": name,
+            "strict": True,
+            "schema": _strict_schema(model.model_json_schema()),
+        },
+    }
+
+
+# Calculados uma única vez na importação
+BODY_RESPONSE_FORMAT = response_format(BodyAnalysis, "body_analysis")
+MEAL_RESPONSE_FORMAT = response_format(MealAnalysis, "meal_analysis")
+WORKOUT_RESPONSE_FORMAT = response_format(WorkoutPlan, "workout_plan")
+
+
+def parse_model(model: type[BaseModel], text: str) -> dict:
+    """Valida a resposta da IA e devolve o dicionário normalizado.
+
+    Levanta `pydantic.ValidationError` se o JSON for inválido ou incompleto.
+    """
+    text = text.strip()
+    if text.startswith("```"):
+        # Tolerância para servidores compatíveis sem saída estruturada
+        text = text.split("\n", 1)[1].rsplit("```", 1)[0]
+    return model.model_validate_json(text).model_dump()
@@ -0,0 +1,177 @@
+"""
+Configuração tipada do backend.
+
+`Settings.from_env()` lê as variáveis de ambiente (e o `.env`); testes e
+aplicações embarcadas podem construir `Settings(...)` diretamente e
+passá-lo para `main.create_app`.
+"""
+
+import os
+from dataclasses import dataclass, field
+from typing import Mapping
+
+from catalog import CATALOG_PATH
+from foods import FOODS_PATH
+from routing import parse_mapping
+
+DEFAULT_MODEL_TIERS = "fast=gpt-4o-mini,quality=gpt-4o"
+DEFAULT_MODEL_ROUTES = "body=quality,meal=quality,workout=fast"
+
+
+@dataclass(frozen=True)
+class Settings:
+    openai_api_key: str = ""
+    # Servidor compatível alternativo (ex: benchmarks/fake_openai.py); None = API oficial
+    openai_base_url: str | None = None
+    app_env: str = "development"
+    allowed_origins: tuple[str, ...] = ("*",)
+    rate_limit_per_minute: int = 30
+    rate_limit_algorithm: str = "sliding_window"
+    rate_limit_backend: str = "memory"
+    rate_limit_sqlite_path: str = "ratelimit.db"
+    rate_limit_redis_url: str = "redis://localhost:6379/0"
+    result_cache_size: int = 512
+    result_cache_ttl: int = 3600
+    result_cache_path: str = ""
+    result_cache_disk_max_entries: int = 100000
+    near_duplicate_distance: int = 4
+    near_duplicate_max_entries: int = 10000
+    near_duplicate_ttl: int = 600
+    image_max_side: int = 512
+    image_format: str = "JPEG"
+    image_quality: int = 80
+    image_workers: int | None = None
+    max_upload_mb: int = 10
+    max_batch_images: int = 20
+    max_batch_rows: int = 100000
+    batch_concurrency: int = 4
+    upstream_max_concurrency: int = 16
+    upstream_endpoint_concurrency: int = 8
+    upstream_max_queue: int = 32
+    upstream_queue_timeout: float = 5
+    upstream_timeout: float = 30
+    upstream_retries: int = 2
+    breaker_failure_threshold: int = 5
+    breaker_cooldown: float = 30
+    model_tiers: dict[str, str] = field(default_factory=lambda: parse_mapping(DEFAULT_MODEL_TIERS))
+    model_routes: dict[str, str] = field(default_factory=lambda: parse_mapping(DEFAULT_MODEL_ROUTES))
+    model_default_tier: str = "quality"
+    hedge_tier: str = "fast"
+    hedge_percentile: float = 95
+    hedge_delay: float = 4
+    # None = mesmo valor de upstream_max_concurrency / openai_max_connections
+    openai_max_connections: int | None = None
+    openai_keepalive_connections: int | None = None
+    openai_keepalive_expiry: float = 60
+    openai_http2: bool = True
+    openai_connect_timeout: float = 5
+    openai_warm_connections: int = 4
+    job_db_path: str = "jobs.db"
+    job_workers: int = 4
+    job_ttl: int = 3600
+    job_lease: float = 300
+    job_max_attempts: int = 3
+    job_max_wait: float = 30
+    # Motor de regras para pedidos de treino comuns (sem chamar a IA)
+    workout_rules: bool = True
+    workout_catalog_path: str = str(CATALOG_PATH)
+    # Treinos gerados pela IA, por pedido canônico (tamanho 0 desativa)
+    workout_cache_size: int = 1024
+    workout_cache_ttl: float = 86400
+    workout_cache_variants: int = 3
+    # Tabela local de alimentos para refeições descritas em texto
+    food_db_path: str = str(FOODS_PATH)
+    max_meal_text_chars: int = 1000
+    # Tokens da OpenAI por cliente (IP) a cada janela; 0 desativa
+    token_budget: int = 0
+    token_budget_window: float = 86400
+
+    def __post_init__(self):
+        if self.openai_max_connections is None:
+            object.__setattr__(self, "openai_max_connections", self.upstream_max_concurrency)
+        if self.openai_keepalive_connections is None:
+            object.__setattr__(self, "openai_keepalive_connections", self.openai_max_connections)
+
+    @property
+    def has_openai(self) -> bool:
+        return bool(self.openai_api_key and not self.openai_api_key.startswith("sk-your"))
+
+    @property
+    def max_upload_bytes(self) -> int:
+        return self.max_upload_mb * 1024 * 1024
+
+    @classmethod
+    def from_env(cls, environ: Mapping[str, str] | None = None) -> "Settings":
+        """Lê a configuração do ambiente; sem `environ`, carrega antes o `.env`."""
+        if environ is None:
+            from dotenv import load_dotenv
+
+            load_dotenv()
+            environ = os.environ
+        env = environ.get
+
+        def optional_int(name: str) -> int | None:
+            value = env(name, "")
+            return int(value) if value else None
+
+        return cls(
+            openai_api_key=env("OPENAI_API_KEY", ""),
+            openai_base_url=env("OPENAI_BASE_URL", "") or None,
+            app_env=env("APP_ENV", "development"),
+            allowed_origins=tuple(env("ALLOWED_ORIGINS", "*").split(",")),
+            rate_limit_per_minute=int(env("RATE_LIMIT_PER_MINUTE", "30")),
+            rate_limit_algorithm=env("RATE_LIMIT_ALGORITHM", "sliding_window"),
+            rate_limit_backend=env("RATE_LIMIT_BACKEND", "memory"),
+            rate_limit_sqlite_path=env("RATE_LIMIT_SQLITE_PATH", "ratelimit.db"),
+            rate_limit_redis_url=env("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0"),
+            result_cache_size=int(env("RESULT_CACHE_SIZE", "512")),
+            result_cache_ttl=int(env("RESULT_CACHE_TTL", "3600")),
+            result_cache_path=env("RESULT_CACHE_PATH", ""),
+            result_cache_disk_max_entries=int(env("RESULT_CACHE_DISK_MAX_ENTRIES", "100000")),
+            near_duplicate_distance=int(env("NEAR_DUPLICATE_DISTANCE", "4")),
+            near_duplicate_max_entries=int(env("NEAR_DUPLICATE_MAX_ENTRIES", "10000")),
+            near_duplicate_ttl=int(env("NEAR_DUPLICATE_TTL", "600")),
+            image_max_side=int(env("IMAGE_MAX_SIDE", "512")),
+            image_format=env("IMAGE_FORMAT", "JPEG"),
+            image_quality=int(env("IMAGE_QUALITY", "80")),
+            image_workers=int(env("IMAGE_WORKERS", "0")) or None,
+            max_upload_mb=int(env("MAX_UPLOAD_MB", "10")),
+            max_batch_images=int(env("MAX_BATCH_IMAGES", "20")),
+            max_batch_rows=int(env("MAX_BATCH_ROWS", "100000")),
+            batch_concurrency=int(env("BATCH_CONCURRENCY", "4")),
+            upstream_max_concurrency=int(env("UPSTREAM_MAX_CONCURRENCY", "16")),
+            upstream_endpoint_concurrency=int(env("UPSTREAM_ENDPOINT_CONCURRENCY", "8")),
+            upstream_max_queue=int(env("UPSTREAM_MAX_QUEUE", "32")),
+            upstream_queue_timeout=float(env("UPSTREAM_QUEUE_TIMEOUT", "5")),
+            upstream_timeout=float(env("UPSTREAM_TIMEOUT", "30")),
+            upstream_retries=int(env("UPSTREAM_RETRIES", "2")),
+            breaker_failure_threshold=int(env("BREAKER_FAILURE_THRESHOLD", "5")),
+            breaker_cooldown=float(env("BREAKER_COOLDOWN", "30")),
+            model_tiers=parse_mapping(env("MODEL_TIERS", DEFAULT_MODEL_TIERS)),
+            model_routes=parse_mapping(env("MODEL_ROUTES", DEFAULT_MODEL_ROUTES)),
+            model_default_tier=env("MODEL_DEFAULT_TIER", "quality"),
+            hedge_tier=env("HEDGE_TIER", "fast"),
+            hedge_percentile=float(env("HEDGE_PERCENTILE", "95")),
+            hedge_delay=float(env("HEDGE_DELAY", "4")),
+            openai_max_connections=optional_int("OPENAI_MAX_CONNECTIONS"),
+            openai_keepalive_connections=optional_int("OPENAI_KEEPALIVE_CONNECTIONS"),
+            openai_keepalive_expiry=float(env("OPENAI_KEEPALIVE_EXPIRY", "60")),
+            openai_http2=env("OPENAI_HTTP2", "true").lower() == "true",
+            openai_connect_timeout=float(env("OPENAI_CONNECT_TIMEOUT", "5")),
+            openai_warm_connections=int(env("OPENAI_WARM_CONNECTIONS", "4")),
+            job_db_path=env("JOB_DB_PATH", "jobs.db"),
+            job_workers=int(env("JOB_WORKERS", "4")),
+            job_ttl=int(env("JOB_TTL", "3600")),
+            job_lease=float(env("JOB_LEASE", "300")),
+            job_max_attempts=int(env("JOB_MAX_ATTEMPTS", "3")),
+            job_max_wait=float(env("JOB_MAX_WAIT", "30")),
+            workout_rules=env("WORKOUT_RULES", "true").lower() == "true",
+            workout_catalog_path=env("WORKOUT_CATALOG_PATH", "") or str(CATALOG_PATH),
+            workout_cache_size=int(env("WORKOUT_CACHE_SIZE", "1024")),
+            workout_cache_ttl=float(env("WORKOUT_CACHE_TTL", "86400")),
+            workout_cache_variants=int(env("WORKOUT_CACHE_VARIANTS", "3")),
+            food_db_path=env("FOOD_DB_PATH", "") or str(FOODS_PATH),
+            max_meal_text_chars=int(env("MAX_MEAL_TEXT_CHARS", "1000")),
+            token_budget=int(env("TOKEN_BUDGET", "0")),
+            token_budget_window=float(env("TOKEN_BUDGET_WINDOW", "86400")),
+        )
@@ -0,0 +1,64 @@
+"""
+Coalescência de chamadas idênticas em andamento (single-flight).
+
+Requisições concorrentes com a mesma chave aguardam uma única tarefa
+upstream em vez de abrir uma chamada cada. A tarefa compartilhada é
+protegida com `asyncio.shield`: o cancelamento de um cliente não afeta os
+demais, e ela só é cancelada quando todos os interessados desistem.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls: dict[Hashable, _Call] = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.cancelled = 0
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Executa `fn` uma única vez por chave entre chamadores concorrentes."""
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Ninguém mais aguarda o resultado
+                call.task.cancel()
+                self._forget(key, call)
+                self.cancelled += 1
+
+    def stats(self) -> dict:
+        calls = self.leaders + self.coalesced
+        return {
+            "calls": calls,
+            "upstream": self.leaders,
+            "coalesced": self.coalesced,
+            "coalescing_ratio": round(self.coalesced / calls, 3) if calls else 0.0,
+            "cancelled": self.cancelled,
+            "in_flight": len(self._calls),
+        }
@@ -0,0 +1,68 @@
+"""
+Parser JSON incremental para o streaming do plano de treino.
+
+Recebe os pedaços de texto do modelo conforme chegam e devolve cada
+objeto do array `exercises` assim que ele fecha, sem esperar o JSON
+completo. Cercas de markdown e texto antes do primeiro `{` são ignorados.
+"""
+
+import json
+
+
+class ExerciseStreamParser:
+    def __init__(self, array_key: str = "exercises"):
+        self.array_key = array_key
+        self.text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_key = None
+        self._array_depth = None
+        self._item_start = None
+
+    def feed(self, chunk: str) -> list[dict]:
+        """Acrescenta texto e retorna os exercícios completados neste pedaço."""
+        self.text += chunk
+        completed = []
+        text = self.text
+        for i in range(self._pos, len(text)):
+            char = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_key = text[self._string_start:i]
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = i + 1
+            elif char in "{[":
+                if (
+                    char == "["
+                    and self._depth == 1
+                    and self._array_depth is None
+                    and self._last_key == self.array_key
+                ):
+                    self._array_depth = self._depth + 1
+                elif char == "{" and self._depth == self._array_depth:
+                    self._item_start = i
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if char == "}" and self._item_start is not None and self._depth == self._array_depth:
+                    try:
+                        completed.append(json.loads(text[self._item_start:i + 1]))
+                    except json.JSONDecodeError:
+                        pass
+                    self._item_start = None
+                elif char == "]" and self._depth == 1 and self._array_depth == 2:
+                    self._array_depth = -1  # array encerrado
+        self._pos = len(text)
+        return completed
@@ -0,0 +1,71 @@
+from fastapi.testclient import TestClient
+
+from main import create_app
+from settings import Settings
+
+MEAL = {"description": "arroz, feijão e frango 150g"}
+
+
+def make_client(tmp_path, name: str, **overrides) -> TestClient:
+    settings = Settings(job_db_path=str(tmp_path / f"{name}.db"), **overrides)
+    return TestClient(create_app(settings))
+
+
+def test_apps_keep_their_own_settings_and_components(tmp_path):
+    development = make_client(tmp_path, "dev", app_env="development", rate_limit_per_minute=1)
+    production = make_client(tmp_path, "prod", app_env="production", rate_limit_per_minute=100)
+    with development, production:
+        assert development.post("/analyze-meal-text/", data=MEAL).status_code == 200
+        assert development.post("/analyze-meal-text/", data=MEAL).status_code == 429
+        # O limite de 1 do desenvolvimento não vale para a outra aplicação
+        for _ in range(3):
+            response = production.post("/analyze-meal-text/", data=MEAL)
+            assert response.status_code == 200
+        assert "Strict-Transport-Security" in response.headers
+
+        assert "Strict-Transport-Security" not in development.get("/").headers
+        assert development.get("/docs").status_code == 200
+        assert production.get("/docs").status_code == 404
+
+        assert development.get("/health").json()["food_db"]["requests"] == 1
+        assert production.get("/health").json()["food_db"]["requests"] == 3
+        assert "fitscan_meal_text_requests_total 3" in production.get("/metrics").text
+
+
+def test_lifespan_is_per_app(tmp_path):
+    first = make_client(tmp_path, "first")
+    second = make_client(tmp_path, "second")
+    with first:
+        assert first.get("/health").json()["status"] == "ok"
+        # A segunda aplicação ainda não subiu
+        assert second.get("/health").json()["status"] == "starting"
+    with second:
+        assert second.get("/health").json()["status"] == "ok"
+
+
+def test_app_survives_a_second_lifespan(tmp_path):
+    client = make_client(tmp_path, "restart")
+    for _ in range(2):
+        with client:
+            assert client.get("/health").json()["status"] == "ok"
+            # Job assíncrono: a fila e os workers voltam a funcionar após reiniciar
+            response = client.post(
+                "/analyze-meal/?mode=async",
+                files={"image": ("meal.jpg", b"\xff\xd8fake", "image/jpeg")},
+            )
+            assert response.status_code == 202
+            job = client.get(f"/jobs/{response.json()['job_id']}", params={"wait": 10}).json()
+            assert job["status"] == "done"
+            assert job["result"]["total_calories"] > 0
+
+
+def test_token_budget_is_opt_in_and_marks_its_fallbacks(tmp_path):
+    assert Settings().token_budget == 0
+    client = make_client(
+        tmp_path, "budget", openai_api_key="sk-test", openai_base_url="http://127.0.0.1:9/v1",
+        openai_warm_connections=0, token_budget=1,
+    )
+    with client:
+        response = client.post("/generate-workout/", data={"training_location": "piscina"})
+    assert response.status_code == 200
+    assert response.json()["fallback"] is True
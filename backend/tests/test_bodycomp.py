@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+import bodycomp
+
+ROSTER = "id,age,sex,height,weight,waist,neck,hip\n"
+
+
+def estimate_csv(body: str) -> dict:
+    return bodycomp.estimate(bodycomp.parse_columns((ROSTER + body).encode(), 1000))
+
+
+@pytest.mark.parametrize("sex, male", [
+    ("Mulher", False), ("Homem", True), ("Feminino", False), ("masculino", True),
+    ("F", False), ("m", True), ("0", False), ("1", True), (" fem ", False),
+])
+def test_sex_tokens(sex, male):
+    result = estimate_csv(f"a,30,{sex},165,70,,,\n")
+    expected = 1.20 * (70 / 1.65 ** 2) + 0.23 * 30 - 10.8 * male - 5.4
+    assert result["fat_deurenberg"][0] == pytest.approx(round(expected, 1))
+
+
+def test_woman_gets_female_formula():
+    women = estimate_csv("a,30,Mulher,165,70,80,34,100\nb,30,Feminino,165,70,80,34,100\n")
+    man = estimate_csv("c,30,Homem,165,70,80,34,100\n")
+    assert women["fat_navy"][0] == women["fat_navy"][1]
+    assert women["fat_navy"][0] > man["fat_navy"][0]
+
+
+@pytest.mark.parametrize("sex", ["x", "", "masc.fem", "mulheres"])
+def test_unknown_sex_marks_only_its_row(sex):
+    result = estimate_csv(f"a,30,M,170,70,,,\nb,30,{sex},170,70,,,\nc,30,F,170,70,,,\n")
+    assert result["error"][0] == result["error"][2] == ""
+    assert result["error"][1].startswith("Sexo inválido")
+    assert np.isnan(result["bmi"][1]) and result["estimated_biotype"][1] == ""
+    assert bodycomp.summarize(result)["invalid"] == 1
+
+
+def test_json_sex_values():
+    data = b'{"age": [30, 30], "sex": ["Mulher", 1], "height": [170, 170], "weight": [70, 70]}'
+    result = bodycomp.estimate(bodycomp.parse_columns(data, 10))
+    assert result["fat_deurenberg"][0] > result["fat_deurenberg"][1]
+
+
+def test_csv_header_on_empty_result():
+    result = estimate_csv("")
+    assert b"".join(bodycomp.iter_csv(result)) == (",".join(bodycomp.OUTPUT_COLUMNS) + "\n").encode()
+
+
+def test_csv_rows_follow_header():
+    lines = b"".join(bodycomp.iter_csv(estimate_csv("a,30,F,165,70,,,\n"))).decode().splitlines()
+    assert lines[0].split(",") == list(bodycomp.OUTPUT_COLUMNS)
+    assert lines[1].startswith("a,")
+
+
+def test_invalid_rows_keep_error_without_rejecting():
+    result = estimate_csv("a,5,F,165,70,,,\nb,30,F,165,70,,,\n")
+    assert result["error"].tolist() == ["Idade deve estar entre 10 e 120 anos.", ""]
+    assert np.isnan(result["bmi"][0])
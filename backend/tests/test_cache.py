@@ -0,0 +1,53 @@
+import asyncio
+
+from cache import ResultCache, SQLiteTier, VariantCache
+
+
+def test_disk_tier_purges_expired_rows(tmp_path):
+    tier = SQLiteTier(str(tmp_path / "cache.db"), ttl=-1, purge_every=10)
+    for i in range(25):
+        tier.set(f"k{i}", {"i": i})
+    # Duas limpezas (10ª e 20ª gravação); sobram as 5 últimas
+    assert tier.count() == 5
+    assert tier.expirations == 20
+
+
+def test_disk_tier_caps_row_count(tmp_path):
+    tier = SQLiteTier(str(tmp_path / "cache.db"), ttl=3600, max_entries=50, purge_every=10)
+    for i in range(200):
+        tier.set(f"k{i}", {"i": i})
+    assert tier.count() == 50
+    assert tier.evictions == 150
+    # As mais recentes ficam
+    assert tier.get("k199")[0] == {"i": 199}
+    assert tier.get("k0") is None
+
+
+def test_disk_tier_purges_on_open(tmp_path):
+    path = str(tmp_path / "cache.db")
+    SQLiteTier(path, ttl=-1).set("old", {"x": 1})
+    assert SQLiteTier(path, ttl=3600).count() == 0
+
+
+def test_result_cache_reports_disk_evictions(tmp_path):
+    cache = ResultCache(max_entries=10, ttl=3600, disk_path=str(tmp_path / "cache.db"), disk_max_entries=5)
+    cache.disk.purge_every = 1
+
+    async def fill():
+        for i in range(8):
+            await cache.set(f"k{i}", {"i": i})
+
+    asyncio.run(fill())
+    stats = cache.stats()
+    assert stats["disk_evictions"] == 3
+    assert stats["evictions"] == 3
+
+
+def test_variant_cache_rotates_after_filling():
+    cache = VariantCache(max_entries=10, ttl=60, variants=2)
+    assert cache.get("k") is None
+    cache.add("k", {"v": 1})
+    assert cache.get("k") is None
+    cache.add("k", {"v": 2})
+    assert [cache.get("k")["v"] for _ in range(4)] == [1, 2, 1, 2]
+    assert cache.stats()["upstream_calls_saved"] == 4
@@ -0,0 +1,59 @@
+import pytest
+
+from foods import MAX_ITEM_GRAMS, FoodTable, MealParser
+
+
+@pytest.fixture(scope="module")
+def parser():
+    return MealParser(FoodTable.from_file())
+
+
+def test_meal_totals(parser):
+    result = parser.parse("arroz, feijão e frango 150g")
+    assert [item["food"] for item in result["items"]] == [
+        "Arroz branco cozido", "Feijão carioca cozido", "Peito de frango grelhado",
+    ]
+    assert result["items"][2]["grams"] == 150
+    # Totais somam valores não arredondados
+    assert abs(result["total_calories"] - sum(item["calories"] for item in result["items"])) <= 1
+    assert result["unmatched"] == []
+
+
+def test_decimal_comma_is_not_a_separator(parser):
+    result = parser.parse("1,5 kg de melancia")
+    assert result["items"][0]["grams"] == 1500
+
+
+@pytest.mark.parametrize("text, food, grams", [
+    ("uma fatia de pão", "Pão francês", 50),
+    ("uma concha de feijão", "Feijão carioca cozido", 140),
+    ("duas colheres de azeite", "Azeite de oliva", 30),
+    ("uma xícara de arroz", "Arroz branco cozido", 160),
+])
+def test_number_words_are_whole_words(parser, text, food, grams):
+    result = parser.parse(text)
+    assert [(item["food"], item["grams"]) for item in result["items"]] == [(food, grams)]
+    assert result["unmatched"] == []
+
+
+@pytest.mark.parametrize("text", [
+    "arroz " + "9" * 400,
+    "1/0 abacate",
+    "0 g de arroz",
+    "arroz 999999 g",
+    "100 kg de frango",
+])
+def test_invalid_quantity_is_unmatched(parser, text):
+    result = parser.parse(f"{text}, feijão")
+    assert [item["food"] for item in result["items"]] == ["Feijão carioca cozido"]
+    assert len(result["unmatched"]) == 1
+
+
+def test_quantity_cap_allows_large_realistic_items(parser):
+    result = parser.parse("2 l de leite")
+    assert result["items"][0]["grams"] == 2000 <= MAX_ITEM_GRAMS
+
+
+def test_unknown_food_is_unmatched(parser):
+    result = parser.parse("lasanha")
+    assert result["items"] == [] and result["unmatched"] == ["lasanha"]
@@ -0,0 +1,140 @@
+import asyncio
+import time
+
+import pytest
+
+from governor import CircuitBreaker, Governor, UpstreamUnavailable, is_retryable
+
+
+class StatusError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def fast_governor(**overrides) -> Governor:
+    options = {"timeout": 0.05, "retries": 2, "backoff_base": 0.001, "backoff_cap": 0.002}
+    return Governor(**{**options, **overrides})
+
+
+def test_retryable_errors():
+    assert is_retryable(asyncio.TimeoutError())
+    assert is_retryable(StatusError(429)) and is_retryable(StatusError(503))
+    assert not is_retryable(StatusError(400))
+    assert not is_retryable(ValueError("json"))
+
+
+def test_deadline_retries_then_raises():
+    governor = fast_governor()
+    attempts = []
+
+    async def slow():
+        attempts.append(1)
+        await asyncio.sleep(1)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(governor.call("meal", slow))
+    assert len(attempts) == 3
+    assert governor.timeouts == 3 and governor.retried == 2
+
+
+def test_transient_error_is_retried_until_success():
+    governor = fast_governor()
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise StatusError(503)
+        return "ok"
+
+    assert asyncio.run(governor.call("meal", flaky)) == "ok"
+    assert governor.retried == 2
+    assert governor.breaker.failures == 0
+
+
+def test_permanent_error_is_not_retried():
+    governor = fast_governor()
+    attempts = []
+
+    async def bad_request():
+        attempts.append(1)
+        raise StatusError(400)
+
+    with pytest.raises(StatusError):
+        asyncio.run(governor.call("meal", bad_request))
+    assert len(attempts) == 1
+    # Erro do pedido, não do serviço: o circuito não conta a falha
+    assert governor.breaker.failures == 0
+
+
+def test_backoff_has_full_jitter_under_the_cap():
+    governor = Governor(backoff_base=0.5, backoff_cap=4)
+    delays = [governor.backoff(attempt) for attempt in range(6) for _ in range(50)]
+    assert all(0 <= delay <= 4 for delay in delays)
+    assert len(set(delays)) > 1
+    assert max(governor.backoff(0) for _ in range(50)) <= 0.5
+
+
+def test_breaker_opens_and_short_circuits():
+    governor = fast_governor(retries=0, breaker=CircuitBreaker(failure_threshold=2, cooldown=60))
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        raise StatusError(503)
+
+    async def scenario():
+        for _ in range(2):
+            with pytest.raises(StatusError):
+                await governor.call("meal", failing)
+        with pytest.raises(UpstreamUnavailable):
+            await governor.call("meal", failing)
+
+    asyncio.run(scenario())
+    assert governor.breaker.state == "open"
+    assert len(calls) == 2 and governor.short_circuited == 1
+
+
+def test_half_open_allows_a_single_probe():
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=0.01)
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+    time.sleep(0.02)
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    # Enquanto a chamada de teste não termina, as demais são recusadas
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_failed_probe_reopens_the_breaker():
+    breaker = CircuitBreaker(failure_threshold=3, cooldown=0.01)
+    for _ in range(3):
+        breaker.record_failure()
+    time.sleep(0.02)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.times_opened == 2
+
+
+def test_full_queue_is_rejected():
+    governor = Governor(max_concurrency=1, endpoint_concurrency=1, max_queue=0, queue_timeout=1)
+    release = asyncio.Event()
+
+    async def blocked():
+        await release.wait()
+        return "done"
+
+    async def scenario():
+        first = asyncio.create_task(governor.call("meal", blocked))
+        await asyncio.sleep(0)
+        with pytest.raises(UpstreamUnavailable):
+            await governor.call("meal", blocked)
+        release.set()
+        return await first
+
+    assert asyncio.run(scenario()) == "done"
+    assert governor.stats()["endpoints"]["meal"]["rejected"] == 1
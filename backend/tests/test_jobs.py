@@ -0,0 +1,36 @@
+import asyncio
+import sqlite3
+
+from jobs import DONE, JobQueue
+
+
+async def echo(payload: bytes, params: dict) -> dict:
+    return {"size": len(payload), **params}
+
+
+def test_worker_survives_a_failed_claim(tmp_path):
+    async def scenario():
+        queue = JobQueue(str(tmp_path / "jobs.db"), workers=1, poll_interval=0.01)
+        queue.register("echo", echo)
+        claim = queue.store.claim
+        failures = []
+
+        def flaky_claim(*args):
+            if not failures:
+                failures.append(1)
+                raise sqlite3.OperationalError("database is locked")
+            return claim(*args)
+
+        queue.store.claim = flaky_claim
+        queue.start()
+        try:
+            job_id = await queue.submit("echo", b"abc", {"n": 1})
+            job = await queue.get(job_id, wait=2)
+        finally:
+            await queue.stop()
+        return queue, job
+
+    queue, job = asyncio.run(scenario())
+    assert job["status"] == DONE
+    assert job["result"] == {"size": 3, "n": 1}
+    assert queue.errors == 1
@@ -0,0 +1,63 @@
+import io
+import random
+
+import pytest
+
+from phash import HAS_PIL, NearDuplicateIndex, dhash, informative
+
+pytestmark = pytest.mark.skipif(not HAS_PIL, reason="Pillow não instalado")
+
+if HAS_PIL:
+    from PIL import Image, ImageDraw
+
+
+def dark_photo(seed: int) -> "Image.Image":
+    """Foto subexposta: quase preta, com um objeto diferente por semente."""
+    rng = random.Random(seed)
+    image = Image.new("RGB", (640, 480), (3, 3, 3))
+    draw = ImageDraw.Draw(image)
+    x, y = rng.randint(0, 400), rng.randint(0, 300)
+    draw.ellipse((x, y, x + 200, y + 150), fill=(5, 4, 4))
+    return image
+
+
+def meal_photo(seed: int) -> "Image.Image":
+    rng = random.Random(seed)
+    image = Image.new("RGB", (640, 480), (240, 240, 235))
+    draw = ImageDraw.Draw(image)
+    for _ in range(12):
+        x, y = rng.randint(0, 560), rng.randint(0, 400)
+        color = tuple(rng.randint(0, 255) for _ in range(3))
+        draw.ellipse((x, y, x + rng.randint(30, 120), y + rng.randint(30, 120)), fill=color)
+    return image
+
+
+def test_dark_photos_do_not_match_each_other():
+    first, second = dhash(dark_photo(1)), dhash(dark_photo(2))
+    assert not informative(first) and not informative(second)
+
+    index = NearDuplicateIndex(max_distance=4)
+    index.add(first, {"meal": "primeira"})
+    assert len(index) == 0
+    assert index.lookup(second) is None
+    assert index.stats()["skipped"] == 1
+
+
+def test_blank_and_saturated_hashes_are_skipped():
+    index = NearDuplicateIndex()
+    index.add(0, {"meal": "x"})
+    index.add((1 << 64) - 1, {"meal": "y"})
+    assert len(index) == 0
+    assert index.lookup(0b101) is None
+
+
+def test_recompressed_photo_still_matches():
+    photo = meal_photo(7)
+    buffer = io.BytesIO()
+    photo.save(buffer, "JPEG", quality=40)
+    recompressed = Image.open(io.BytesIO(buffer.getvalue()))
+
+    index = NearDuplicateIndex(max_distance=4)
+    index.add(dhash(photo), {"meal": "almoço"})
+    assert index.lookup(dhash(recompressed)) == {"meal": "almoço"}
+    assert index.lookup(dhash(meal_photo(8))) is None
@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+from ratelimit import MemoryStore, SlidingWindowCounter, TokenBucket, build_rate_limiter
+
+
+def run(algorithm, hits: list[float], cost: int = 1) -> list:
+    state, decisions = None, []
+    for now in hits:
+        state, decision = algorithm.apply(state, now, cost)
+        decisions.append(decision)
+    return decisions
+
+
+def test_token_bucket_allows_burst_then_refills():
+    bucket = TokenBucket(limit=3, window=3)
+    decisions = run(bucket, [0, 0, 0, 0, 1])
+    assert [d.allowed for d in decisions] == [True, True, True, False, True]
+    assert [d.remaining for d in decisions[:3]] == [2, 1, 0]
+    # Uma ficha por segundo: falta 1 s para a próxima
+    assert decisions[3].retry_after == pytest.approx(1)
+    assert decisions[3].headers()["Retry-After"] == "1"
+
+
+def test_token_bucket_never_exceeds_limit():
+    bucket = TokenBucket(limit=3, window=3)
+    state, _ = bucket.apply(None, 0, 1)
+    state, decision = bucket.apply(state, 1000, 1)
+    assert decision.remaining == 2
+
+
+def test_sliding_window_limits_within_window():
+    window = SlidingWindowCounter(limit=10, window=60)
+    decisions = run(window, [1] * 11)
+    assert [d.allowed for d in decisions].count(True) == 10
+    assert not decisions[-1].allowed
+    assert decisions[-1].retry_after == pytest.approx(59)
+
+
+def test_sliding_window_weighs_previous_window():
+    window = SlidingWindowCounter(limit=10, window=60)
+    state = None
+    for _ in range(10):
+        state, _ = window.apply(state, 1, 1)
+    # Meio da janela seguinte: a anterior pesa 0,5 → restam 5
+    allowed = 0
+    for _ in range(10):
+        state, decision = window.apply(state, 90, 1)
+        allowed += decision.allowed
+    assert allowed == 5
+    assert decision.retry_after > 0
+
+
+def test_sliding_window_forgets_old_windows():
+    window = SlidingWindowCounter(limit=2, window=60)
+    decisions = run(window, [0, 0, 0, 180])
+    assert [d.allowed for d in decisions] == [True, True, False, True]
+
+
+@pytest.mark.parametrize("algorithm", ["token_bucket", "sliding_window"])
+def test_limiter_tracks_keys_separately(algorithm):
+    limiter = build_rate_limiter(limit=1, algorithm=algorithm)
+
+    async def hits():
+        return [(await limiter.hit(key)).allowed for key in ("a", "a", "b")]
+
+    assert asyncio.run(hits()) == [True, False, True]
+    assert limiter.stats()["rejected"] == 1
+
+
+def test_sqlite_backend_is_shared_between_limiters(tmp_path):
+    path = str(tmp_path / "ratelimit.db")
+    first = build_rate_limiter(limit=2, backend="sqlite", sqlite_path=path)
+    second = build_rate_limiter(limit=2, backend="sqlite", sqlite_path=path)
+
+    async def hits():
+        return [(await limiter.hit("ip")).allowed for limiter in (first, second, first)]
+
+    # Dois workers com o mesmo arquivo dividem a cota do cliente
+    assert asyncio.run(hits()) == [True, True, False]
+
+
+def test_memory_store_sweeps_idle_keys():
+    store = MemoryStore(idle_after=60)
+    bucket = TokenBucket(limit=1, window=1)
+    asyncio.run(store.update("old", bucket.apply, 0, 1))
+    asyncio.run(store.update("new", bucket.apply, 100, 1))
+    assert store.sweep(100) == 1
+    assert store.stats()["keys"] == 1
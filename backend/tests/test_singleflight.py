@@ -0,0 +1,107 @@
+import asyncio
+
+from singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_upstream():
+    async def scenario():
+        flight, calls = SingleFlight(), []
+
+        async def upstream():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"ok": True}
+
+        results = await asyncio.gather(*(flight.do("k", upstream) for _ in range(5)))
+        return flight, calls, results
+
+    flight, calls, results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert results == [{"ok": True}] * 5
+    assert flight.stats()["coalesced"] == 4
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_cancelled_waiter_does_not_cancel_the_others():
+    async def scenario():
+        flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def upstream():
+            await release.wait()
+            return "result"
+
+        leader = asyncio.create_task(flight.do("k", upstream))
+        follower = asyncio.create_task(flight.do("k", upstream))
+        await asyncio.sleep(0)
+        # O primeiro cliente desiste; a chamada continua para o segundo
+        leader.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        return flight, await follower, leader
+
+    flight, result, leader = asyncio.run(scenario())
+    assert result == "result"
+    assert leader.cancelled()
+    assert flight.cancelled == 0
+
+
+def test_upstream_is_cancelled_when_every_waiter_gives_up():
+    async def scenario():
+        flight = SingleFlight()
+        started, cancelled = asyncio.Event(), asyncio.Event()
+
+        async def upstream():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        waiters = [asyncio.create_task(flight.do("k", upstream)) for _ in range(2)]
+        await started.wait()
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.wait_for(cancelled.wait(), 1)
+        return flight
+
+    flight = asyncio.run(scenario())
+    assert flight.cancelled == 1
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_errors_reach_every_waiter_and_key_is_released():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream")
+
+        async def ok():
+            return "again"
+
+        results = await asyncio.gather(
+            *(flight.do("k", failing) for _ in range(3)), return_exceptions=True
+        )
+        # Depois do erro, a próxima chamada com a mesma chave vai ao upstream de novo
+        return results, await flight.do("k", ok)
+
+    results, again = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert again == "again"
+
+
+def test_different_keys_do_not_coalesce():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def upstream():
+            await asyncio.sleep(0.01)
+            return 1
+
+        await asyncio.gather(*(flight.do(key, upstream) for key in ("a", "b")))
+        return flight
+
+    assert asyncio.run(scenario()).stats()["upstream"] == 2
@@ -0,0 +1,70 @@
+"""
+Leitura de uploads com limite de tamanho e codificação base64 com poucas cópias.
+
+O upload é lido em blocos para um único buffer (pré-alocado quando o
+tamanho é conhecido) e rejeitado com 413 assim que passa do limite. A
+data URL é montada em um buffer pré-alocado (prefixo + base64), evitando
+as cópias intermediárias de `b64encode(...).decode()` + f-string.
+"""
+
+import binascii
+
+from fastapi import HTTPException, UploadFile
+
+CHUNK_SIZE = 256 * 1024
+# Múltiplo de 3: cada bloco codifica sem padding intermediário
+ENCODE_CHUNK = 3 * 64 * 1024
+
+
+def too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"Imagem muito grande. Limite de {max_bytes // (1024 * 1024)} MB.",
+    )
+
+
+async def read_upload(upload: UploadFile, max_bytes: int) -> bytearray:
+    """Lê o upload em blocos, sem ultrapassar `max_bytes`."""
+    size = upload.size
+    if size is not None:
+        if size > max_bytes:
+            raise too_large(max_bytes)
+        buffer = bytearray(size)
+        view = memoryview(buffer)
+        offset = 0
+        while offset < size:
+            chunk = await upload.read(min(CHUNK_SIZE, size - offset))
+            if not chunk:
+                break
+            view[offset:offset + len(chunk)] = chunk
+            offset += len(chunk)
+        view.release()
+        if offset < size:
+            del buffer[offset:]
+        return buffer
+
+    buffer = bytearray()
+    while chunk := await upload.read(CHUNK_SIZE):
+        if len(buffer) + len(chunk) > max_bytes:
+            raise too_large(max_bytes)
+        buffer += chunk
+    return buffer
+
+
+def encode_data_url(data: bytes | bytearray, mime_type: str = "image/jpeg") -> str:
+    """Monta `data:<mime>;base64,<...>` com um único buffer de saída."""
+    prefix = f"data:{mime_type};base64,".encode("ascii")
+    encoded_size = 4 * ((len(data) + 2) // 3)
+    output = bytearray(len(prefix) + encoded_size)
+    output[: len(prefix)] = prefix
+
+    source = memoryview(data)
+    target = memoryview(output)
+    offset = len(prefix)
+    for start in range(0, len(data), ENCODE_CHUNK):
+        encoded = binascii.b2a_base64(source[start:start + ENCODE_CHUNK], newline=False)
+        target[offset:offset + len(encoded)] = encoded
+        offset += len(encoded)
+    source.release()
+    target.release()
+    return output.decode("ascii")